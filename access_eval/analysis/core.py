@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import json
 import logging
 import re
 from dataclasses import dataclass
@@ -12,14 +11,16 @@ import numpy as np
 import pandas as pd
 from dataclasses_json import dataclass_json
 from scipy import stats as sci_stats
-from selenium import webdriver
 from selenium.common.exceptions import WebDriverException
-from selenium.webdriver import FirefoxOptions
 from textstat import flesch_reading_ease
 from tqdm import tqdm
 
-from ..constants import AGGREGATE_AXE_RESULTS_FILENAME, SINGLE_PAGE_AXE_RESULTS_FILENAME
-from ..utils import clean_url
+from ..block_policy import TEXT_ONLY_POLICY
+from ..constants import AGGREGATE_AXE_RESULTS_FILENAME
+from ..driver_pool import create_driver
+from ..result_store import find_result_store, iter_page_results
+from ..storage import find_axe_results, read_axe_summary
+from ..utils import clean_url, count_axe_nodes
 from .constants import (
     ACCESS_EVAL_2021_DATASET,
     ComputedField,
@@ -72,9 +73,8 @@ class CompiledMetrics:
 
 def _process_page_words(url: str) -> Optional[WordMetric]:
     # Spawn webdriver process
-    opts = FirefoxOptions()
-    opts.add_argument("--headless")
-    driver = webdriver.Firefox(firefox_options=opts)
+    # Only the page text is needed so skip images, media, fonts, and trackers
+    driver = create_driver(block_policy=TEXT_ONLY_POLICY)
 
     # Load site
     metric: Optional[WordMetric]
@@ -104,6 +104,32 @@ def _process_page_words(url: str) -> Optional[WordMetric]:
     return metric
 
 
+def _add_page_axe_results(
+    page_results: Dict[str, Any],
+    metrics: RunningMetrics,
+) -> RunningMetrics:
+    # Increment pages
+    metrics.pages += 1
+
+    # Sum different violation levels for this page
+    for violation in page_results["violations"]:
+        impact = violation["impact"]
+        metric_storage_target = f"{impact}_violations"
+        current_count = getattr(metrics, metric_storage_target)
+        setattr(
+            metrics,
+            metric_storage_target,
+            current_count + count_axe_nodes(violation),
+        )
+
+    # Calc page word metrics
+    url = page_results["url"]
+    if metrics.word_metrics is not None:
+        metrics.word_metrics[url] = _process_page_words(url)
+
+    return metrics
+
+
 def _recurse_axe_results(
     axe_results_dir: Path,
     metrics: RunningMetrics,
@@ -114,32 +140,10 @@ def _recurse_axe_results(
             metrics = _recurse_axe_results(child, metrics=metrics)
 
     # Get this dirs result file
-    this_dir_results = axe_results_dir / SINGLE_PAGE_AXE_RESULTS_FILENAME
-    if this_dir_results.exists():
-        with open(this_dir_results, "r") as open_f:
-            this_dir_loaded_results = json.load(open_f)
-
-        # Increment pages
-        metrics.pages += 1
-
-        # Sum different violation levels for this page
-        for violation in this_dir_loaded_results["violations"]:
-            impact = violation["impact"]
-            metric_storage_target = f"{impact}_violations"
-            current_count = getattr(metrics, metric_storage_target)
-            setattr(
-                metrics,
-                metric_storage_target,
-                current_count
-                + len(
-                    violation["nodes"],
-                ),
-            )
-
-        # Calc page word metrics
-        url = this_dir_loaded_results["url"]
-        if metrics.word_metrics is not None:
-            metrics.word_metrics[url] = _process_page_words(url)
+    # (in whichever format it was stored)
+    this_dir_results = find_axe_results(axe_results_dir)
+    if this_dir_results is not None:
+        metrics = _add_page_axe_results(read_axe_summary(this_dir_results), metrics)
 
     return metrics
 
@@ -181,9 +185,14 @@ def process_axe_evaluations_and_extras(
         word_metrics = None
 
     # Process
-    parsed_metrics = _recurse_axe_results(
-        axe_results_dir, RunningMetrics(word_metrics=word_metrics)
-    )
+    # Runs stored in a result store are read with an indexed lookup of the pages
+    # under the directory instead of walking it
+    parsed_metrics = RunningMetrics(word_metrics=word_metrics)
+    if find_result_store(axe_results_dir) is not None:
+        for _, page_results in iter_page_results(axe_results_dir, summary=True):
+            parsed_metrics = _add_page_axe_results(page_results, parsed_metrics)
+    else:
+        parsed_metrics = _recurse_axe_results(axe_results_dir, parsed_metrics)
 
     # Any post-processing of metrics to get to compiled state
     words = 0
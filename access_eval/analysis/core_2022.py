@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import json
 import logging
 import re
 from dataclasses import dataclass
@@ -18,8 +17,8 @@ from scipy import stats as sci_stats
 from textstat import flesch_reading_ease
 from tqdm import tqdm
 
-from ..constants import SINGLE_PAGE_AXE_RESULTS_FILENAME
-from ..utils import clean_url
+from ..storage import find_axe_results, read_axe_summary
+from ..utils import clean_url, count_axe_nodes
 from .constants_2022_axe_score import (
     ACCESS_EVAL_2022_DATASET,
     ComputedField,
@@ -65,10 +64,10 @@ def process_axe_evaluations_and_extras(
         raise NotADirectoryError(axe_results_dir)
     
     # Get this dirs result file
-    this_dir_results = axe_results_dir / SINGLE_PAGE_AXE_RESULTS_FILENAME
-    if this_dir_results.exists():
-        with open(this_dir_results, "r") as open_f:
-            this_dir_loaded_results = json.load(open_f)
+    # (in whichever format it was stored)
+    this_dir_results = find_axe_results(axe_results_dir)
+    if this_dir_results is not None:
+        this_dir_loaded_results = read_axe_summary(this_dir_results)
 
         # create dict that contains all info
         needed = ["incomplete", "passes", "violations"]
@@ -77,7 +76,7 @@ def process_axe_evaluations_and_extras(
             if key in needed:
                 for i in range(0,len(this_dir_loaded_results[key])):
                     test_id = this_dir_loaded_results[key][i]['id']
-                    occurance = len(this_dir_loaded_results[key][i]['nodes'])
+                    occurance = count_axe_nodes(this_dir_loaded_results[key][i])
                     data_dict[key][test_id] = occurance
         # get the weight (1/size)
         unique_keys = set()
@@ -2,14 +2,19 @@
 # -*- coding: utf-8 -*-
 
 import json
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
-from typing import Union
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Tuple, Union
 
 import pandas as pd
 from dataclasses_json import dataclass_json
 
 from .. import constants
+from ..result_store import iter_page_result_loaders
+from ..utils import count_axe_nodes
 
 ###############################################################################
 # Axe look up tables and constants
@@ -57,102 +62,283 @@ class AggregateAxeViolation:
 ###############################################################################
 
 
-def generate_high_level_statistics(head_dir: Union[str, Path]) -> None:
+def simplify_axe_violations(
+    violations: List[Dict[str, Any]]
+) -> List[SimplifiedAxeViolation]:
     """
-    Recursive glob of all directories for axe results and generate high level
-    statistics both for single page and whole website.
+    Simplify the aXe violations of a single page.
+    """
+    return [
+        SimplifiedAxeViolation(
+            id=violation["id"],
+            impact=violation["impact"],
+            impact_score=AXE_IMPACT_SCORE_LUT[violation["impact"]],
+            reason=violation["help"],
+            number_of_elements_in_violation=count_axe_nodes(violation),
+            help_url=violation["helpUrl"],
+        )
+        for violation in violations
+    ]
 
-    Parameters
-    ----------
-    head_dir: Union[str, Path]
-        The directory to start the recursive glob for axe results in.
+
+def write_page_violations_summary(
+    simplified_violations: List[SimplifiedAxeViolation],
+    page_results_dir: Union[str, Path],
+) -> Path:
     """
-    # Get all individual page axe results to consolidate
-    if isinstance(head_dir, str):
-        head_dir = Path(head_dir)
+    Store the simplified violations of a single page to the page's results
+    directory as CSV, sorted by the number of elements and severity.
+    """
+    page_results_dir = Path(page_results_dir)
 
-    # Resolve
-    head_dir = head_dir.resolve(strict=True)
-    if head_dir.is_file():
-        raise NotADirectoryError(str(head_dir))
+    # Compile simplified violations to table and
+    # sort by the number of elements and severity
+    compiled_simplified_violations = pd.DataFrame(
+        [v.to_dict() for v in simplified_violations],  # type: ignore
+        columns=[
+            "id",
+            "impact",
+            "impact_score",
+            "reason",
+            "number_of_elements_in_violation",
+            "help_url",
+        ],
+    )
+    compiled_simplified_violations = compiled_simplified_violations.sort_values(
+        by=["number_of_elements_in_violation", "impact_score"], ascending=False
+    )
+    page_results_dir.mkdir(exist_ok=True, parents=True)
+    path = page_results_dir / constants.SINGLE_PAGE_SIMPLIFIED_AXE_RESULTS_FILENAME
+    compiled_simplified_violations.to_csv(path, index=False)
 
-    # Iter results and combine
-    overall_stats = {}
-    for axe_result_file in head_dir.glob(
-        f"**/{constants.SINGLE_PAGE_AXE_RESULTS_FILENAME}"
-    ):
-        simplified_violations = []
-        # Open result file
-        with open(axe_result_file, "r") as open_f:
-            single_page_axe_results = json.load(open_f)
-
-        # Parse and simplify
-        for violation in single_page_axe_results["violations"]:
-            # Add to this pages violations
-            simplified_violations.append(
-                SimplifiedAxeViolation(
-                    id=violation["id"],
-                    impact=violation["impact"],
-                    impact_score=AXE_IMPACT_SCORE_LUT[violation["impact"]],
-                    reason=violation["help"],
-                    number_of_elements_in_violation=len(violation["nodes"]),
-                    help_url=violation["helpUrl"],
-                )
-            )
+    return path
+
+
+class AxeViolationAggregator:
+    """
+    Running aggregate of the aXe results of the pages of a website: per rule pages
+    affected and element counts, elements in violation per impact level, and the
+    number of passed and incomplete rules.
+
+    Pages can be added as they are audited (see AxeAggregationPipeline) or read
+    back from stored results (see generate_high_level_statistics).
+    """
+
+    def __init__(self) -> None:
+        self.violations: Dict[str, AggregateAxeViolation] = {}
+        self.pages = 0
+        self.passed_rules = 0
+        self.incomplete_rules = 0
+        self.elements_in_violation_by_impact = {
+            impact: 0 for impact in AXE_IMPACT_SCORE_LUT
+        }
+
+    def add_page(
+        self,
+        violations: List[Dict[str, Any]],
+        n_passes: int = 0,
+        n_incomplete: int = 0,
+    ) -> List[SimplifiedAxeViolation]:
+        """
+        Add the results of a page to the aggregate.
+
+        Parameters
+        ----------
+        violations: List[Dict[str, Any]]
+            The aXe violations found on the page.
+        n_passes: int
+            The number of rules the page passed.
+            Default: 0
+        n_incomplete: int
+            The number of rules aXe could not decide for the page.
+            Default: 0
+
+        Returns
+        -------
+        simplified_violations: List[SimplifiedAxeViolation]
+            The simplified violations of the page.
+        """
+        simplified_violations = simplify_axe_violations(violations)
+        self.add_simplified_page(simplified_violations, n_passes, n_incomplete)
+        return simplified_violations
+
+    def add_simplified_page(
+        self,
+        simplified_violations: List[SimplifiedAxeViolation],
+        n_passes: int = 0,
+        n_incomplete: int = 0,
+    ) -> None:
+        """
+        Add the already simplified results of a page to the aggregate
+        (see `add_page`).
+        """
+        self.pages += 1
+        self.passed_rules += n_passes
+        self.incomplete_rules += n_incomplete
+        for violation in simplified_violations:
+            n_nodes = violation.number_of_elements_in_violation
+            self.elements_in_violation_by_impact[violation.impact] += n_nodes
 
             # Set or update the overall stats
-            if violation["id"] not in overall_stats:
-                overall_stats[violation["id"]] = AggregateAxeViolation(
-                    id=violation["id"],
-                    impact=violation["impact"],
-                    impact_score=AXE_IMPACT_SCORE_LUT[violation["impact"]],
-                    reason=violation["help"],
+            if violation.id not in self.violations:
+                self.violations[violation.id] = AggregateAxeViolation(
+                    id=violation.id,
+                    impact=violation.impact,
+                    impact_score=violation.impact_score,
+                    reason=violation.reason,
                     number_of_pages_affected=1,
-                    number_of_elements_in_violation=len(violation["nodes"]),
-                    help_url=violation["helpUrl"],
+                    number_of_elements_in_violation=n_nodes,
+                    help_url=violation.help_url,
                 )
 
             else:
-                overall_stats[violation["id"]].number_of_pages_affected += 1
-                overall_stats[violation["id"]].number_of_elements_in_violation += len(
-                    violation["nodes"]
-                )
+                aggregate = self.violations[violation.id]
+                aggregate.number_of_pages_affected += 1
+                aggregate.number_of_elements_in_violation += n_nodes
+
+    def totals(self) -> Dict[str, Any]:
+        return {
+            "pages": self.pages,
+            "passed_rules": self.passed_rules,
+            "incomplete_rules": self.incomplete_rules,
+            "elements_in_violation_by_impact": self.elements_in_violation_by_impact,
+        }
 
-        # Compile simplified violations to table and
-        # sort by the number of elements and severity
-        compiled_simplified_violations = pd.DataFrame(
-            [v.to_dict() for v in simplified_violations],  # type: ignore
+    def write(self, head_dir: Union[str, Path]) -> Path:
+        """
+        Store the aggregated violations of the website to its results directory as
+        CSV (and the totals as JSON next to it).
+
+        Returns
+        -------
+        path: Path
+            The path the aggregated violations were stored to.
+        """
+        head_dir = Path(head_dir)
+        head_dir.mkdir(exist_ok=True, parents=True)
+
+        # Compile overall stats
+        overall_simplified_violations = pd.DataFrame(
+            [v.to_dict() for v in self.violations.values()],  # type: ignore
             columns=[
                 "id",
                 "impact",
                 "impact_score",
                 "reason",
+                "number_of_pages_affected",
                 "number_of_elements_in_violation",
                 "help_url",
             ],
         )
-        compiled_simplified_violations = compiled_simplified_violations.sort_values(
-            by=["number_of_elements_in_violation", "impact_score"], ascending=False
-        )
-        compiled_simplified_violations.to_csv(
-            axe_result_file.parent
-            / constants.SINGLE_PAGE_SIMPLIFIED_AXE_RESULTS_FILENAME,
-            index=False,
+        overall_simplified_violations = overall_simplified_violations.sort_values(
+            by=[
+                "number_of_elements_in_violation",
+                "impact_score",
+                "number_of_pages_affected",
+            ],
+            ascending=False,
         )
+        path = head_dir / constants.AGGREGATE_AXE_RESULTS_FILENAME
+        overall_simplified_violations.to_csv(path, index=False)
 
-    # Compile overall stats
-    overall_simplified_violations = pd.DataFrame(
-        [v.to_dict() for v in overall_stats.values()]  # type: ignore
-    )
-    overall_simplified_violations = overall_simplified_violations.sort_values(
-        by=[
-            "number_of_elements_in_violation",
-            "impact_score",
-            "number_of_pages_affected",
-        ],
-        ascending=False,
+        with open(
+            head_dir / constants.AGGREGATE_AXE_TOTALS_FILENAME, "w", encoding="utf8"
+        ) as open_f:
+            json.dump(self.totals(), open_f, indent=4)
+
+        return path
+
+
+def _summarize_page(
+    task: Tuple[Path, Callable[[], Dict[str, Any]]]
+) -> Tuple[List[SimplifiedAxeViolation], int, int]:
+    # Runs in worker processes so only the compact summary is sent back
+    page_results_dir, load = task
+    single_page_axe_results = load()
+    simplified_violations = simplify_axe_violations(
+        single_page_axe_results["violations"]
     )
-    overall_simplified_violations.to_csv(
-        head_dir / constants.AGGREGATE_AXE_RESULTS_FILENAME,
-        index=False,
+    write_page_violations_summary(simplified_violations, page_results_dir)
+
+    return (
+        simplified_violations,
+        len(single_page_axe_results.get("passes", [])),
+        len(single_page_axe_results.get("incomplete", [])),
     )
+
+
+def _summarize_pages(
+    tasks: List[Tuple[Path, Callable[[], Dict[str, Any]]]]
+) -> List[Tuple[List[SimplifiedAxeViolation], int, int]]:
+    return [_summarize_page(task) for task in tasks]
+
+
+def _summarize_pages_in_pool(
+    executor: ProcessPoolExecutor,
+    tasks: Iterable[Tuple[Path, Callable[[], Dict[str, Any]]]],
+    chunk_size: int,
+    max_pending_chunks: int,
+) -> Iterator[Tuple[List[SimplifiedAxeViolation], int, int]]:
+    # Executor.map submits every task up front, which would hold every page's
+    # stored results in memory, so only a few chunks are ever in flight
+    tasks = iter(tasks)
+    pending: Deque[Future] = deque()
+    while True:
+        chunk = list(islice(tasks, chunk_size))
+        if len(chunk) > 0:
+            pending.append(executor.submit(_summarize_pages, chunk))
+
+        # Results are returned in submission order
+        if len(pending) > 0 and (len(chunk) == 0 or len(pending) >= max_pending_chunks):
+            yield from pending.popleft().result()
+        elif len(chunk) == 0:
+            return
+
+
+def generate_high_level_statistics(
+    head_dir: Union[str, Path],
+    workers: int = 1,
+) -> None:
+    """
+    Recursive glob of all directories for axe results (or lookup of the pages
+    under the directory in the run's result store) and generate high level
+    statistics both for single page and whole website.
+
+    Crawls with the AxeAggregationPipeline enabled already produce the same
+    files, so this is only needed for results of other crawls.
+
+    Parameters
+    ----------
+    head_dir: Union[str, Path]
+        The directory to start the recursive glob for axe results in.
+    workers: int
+        The number of processes to read, simplify, and summarize pages with.
+        Page summaries are merged in the same order either way so the output does
+        not depend on the number of workers.
+        Default: 1 (summarize every page in this process)
+    """
+    # Get all individual page axe results to consolidate
+    if isinstance(head_dir, str):
+        head_dir = Path(head_dir)
+
+    # Resolve
+    head_dir = head_dir.resolve(strict=True)
+    if head_dir.is_file():
+        raise NotADirectoryError(str(head_dir))
+
+    # Iter results and combine
+    # (from the run's result store or the result file of each page's directory)
+    aggregator = AxeViolationAggregator()
+    tasks = iter_page_result_loaders(head_dir, summary=True)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for summary in _summarize_pages_in_pool(
+                executor, tasks, chunk_size=16, max_pending_chunks=2 * workers
+            ):
+                aggregator.add_simplified_page(*summary)
+    else:
+        for summary in map(_summarize_page, tasks):
+            aggregator.add_simplified_page(*summary)
+
+    # Compile overall stats
+    aggregator.write(head_dir)
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from weakref import WeakSet
+
+import axe_selenium_python
+from selenium.common.exceptions import WebDriverException
+
+from .constants import (
+    AXE_RESULTS_REUSED_FROM_KEY,
+    AXE_RUN_OPTIONS_KEY,
+    AXE_SOURCE_VERSION_KEY,
+)
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+###############################################################################
+
+# The axe-core build shipped with axe_selenium_python
+BUNDLED_AXE_SCRIPT_PATH = (
+    Path(axe_selenium_python.__file__).parent
+    / "node_modules"
+    / "axe-core"
+    / "axe.min.js"
+)
+
+# Matches the version in both the license header and the `axe.version` assignment
+_AXE_VERSION_PATTERN = re.compile(r"""(?:axe v|\.version=")(\d+\.\d+\.\d+)""")
+
+# Runs aXe with the provided options and replaces the nodes of every rule of the
+# count only result types with their count before serializing the results back
+# A rejected run calls back with its error right away (see _AXE_ERROR_KEY) rather
+# than leaving the driver to wait out its script timeout
+_RUN_AXE_SCRIPT = """
+var options = arguments[0];
+var countOnlyResultTypes = arguments[1];
+var callback = arguments[arguments.length - 1];
+axe.run(document, options).then(function (results) {
+    countOnlyResultTypes.forEach(function (resultType) {
+        (results[resultType] || []).forEach(function (rule) {
+            rule.nodeCount = rule.nodes.length;
+            rule.nodes = [];
+        });
+    });
+    callback(results);
+}).catch(function (error) {
+    callback({accessEvalAxeError: String((error && error.stack) || error)});
+});
+"""
+
+# The key a failed aXe run's error is called back under
+_AXE_ERROR_KEY = "accessEvalAxeError"
+
+# Serializes the rendered DOM to its structural skeleton
+# (tag names and attribute names, optionally text) in document order
+_DOM_SKELETON_SCRIPT = """
+var includeText = arguments[0];
+var parts = [];
+function walk(node, depth) {
+    if (node.nodeType === Node.ELEMENT_NODE) {
+        var attrs = Array.from(node.attributes).map(function (a) {
+            return a.name;
+        }).sort();
+        parts.push(depth + "<" + node.tagName + " " + attrs.join(" ") + ">");
+    } else if (includeText && node.nodeType === Node.TEXT_NODE) {
+        var text = node.textContent.trim();
+        if (text.length > 0) {
+            parts.push(depth + "#" + text);
+        }
+    }
+    for (var i = 0; i < node.childNodes.length; i++) {
+        walk(node.childNodes[i], depth + 1);
+    }
+}
+walk(document.documentElement, 0);
+return parts.join("\\n");
+"""
+
+###############################################################################
+
+
+@dataclass(frozen=True)
+class AxeRunOptions:
+    """
+    Which rules aXe runs and how much detail it serializes back for each result.
+
+    Parameters
+    ----------
+    run_only_tags: Tuple[str, ...]
+        Only run the rules with these tags (i.e. "wcag2a", "wcag2aa").
+        Default: () (run every rule)
+    result_types: Tuple[str, ...]
+        Passed to aXe as `resultTypes`. Rules of result types not listed are
+        reported with at most one node, so their node counts are lost.
+        Default: () (full detail for every result type)
+    count_only_result_types: Tuple[str, ...]
+        Result types (i.e. "passes", "inapplicable") whose rules are stored with
+        only their node count (under "nodeCount") instead of every node.
+        Default: () (keep every node)
+    """
+
+    run_only_tags: Tuple[str, ...] = ()
+    result_types: Tuple[str, ...] = ()
+    count_only_result_types: Tuple[str, ...] = ()
+
+    def to_axe_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {}
+        if len(self.run_only_tags) > 0:
+            options["runOnly"] = {"type": "tag", "values": list(self.run_only_tags)}
+        if len(self.result_types) > 0:
+            options["resultTypes"] = list(self.result_types)
+
+        return options
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {
+            "runOnlyTags": list(self.run_only_tags),
+            "resultTypes": list(self.result_types),
+            "countOnlyResultTypes": list(self.count_only_result_types),
+        }
+
+
+DEFAULT_AXE_RUN_OPTIONS = AxeRunOptions()
+
+
+class AxeScript:
+    """
+    The axe-core source, read from disk once and injected into pages from memory.
+
+    Where the driver supports it (Chromium's DevTools protocol) the source is also
+    registered as a preload script so every page the driver navigates to
+    afterwards already has aXe loaded and the source is not sent again.
+
+    Parameters
+    ----------
+    path: Optional[Union[str, Path]]
+        The axe-core script to use.
+        Default: None (the build bundled with axe_selenium_python)
+    version: Optional[str]
+        The axe-core version the script must be.
+        Default: None (any version)
+
+    Raises
+    ------
+    ValueError
+        The script is not the pinned version.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        version: Optional[str] = None,
+    ):
+        self.path = Path(path) if path is not None else BUNDLED_AXE_SCRIPT_PATH
+        with open(self.path, "r", encoding="utf8") as open_f:
+            self.source = open_f.read()
+
+        # Check pin
+        match = _AXE_VERSION_PATTERN.search(self.source)
+        self.version = match.group(1) if match is not None else None
+        if version is not None and version != self.version:
+            raise ValueError(
+                f"axe-core script at '{self.path}' is version '{self.version}', "
+                f"expected pinned version '{version}'."
+            )
+
+        self._preloaded: "WeakSet[WebDriver]" = WeakSet()
+        self._lock = threading.Lock()
+
+    def _preload(self, driver: "WebDriver") -> None:
+        # Only Chromium drivers expose the DevTools protocol in Selenium 3
+        if not hasattr(driver, "execute_cdp_cmd"):
+            return
+
+        driver.execute_cdp_cmd(
+            "Page.addScriptToEvaluateOnNewDocument", {"source": self.source}
+        )
+        with self._lock:
+            self._preloaded.add(driver)
+
+    def inject(self, driver: "WebDriver") -> None:
+        """Make aXe available in the page currently loaded by the driver."""
+        with self._lock:
+            preloaded = driver in self._preloaded
+        if preloaded and driver.execute_script("return typeof axe !== 'undefined';"):
+            return
+
+        driver.execute_script(self.source)
+        if not preloaded:
+            self._preload(driver)
+
+    def run(
+        self,
+        driver: "WebDriver",
+        options: AxeRunOptions = DEFAULT_AXE_RUN_OPTIONS,
+        timings: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Inject aXe into the page currently loaded by the driver and run the checks
+        selected by the options.
+
+        The results have the version of the injected axe-core script and the
+        options used stored under the AXE_SOURCE_VERSION_KEY and
+        AXE_RUN_OPTIONS_KEY keys. If a timings dict is provided the seconds spent
+        injecting and running aXe are stored to it ("axe_inject" and "axe_run").
+
+        Raises
+        ------
+        WebDriverException
+            aXe failed to run on the page (like a script timeout would).
+        """
+        start = time.perf_counter()
+        self.inject(driver)
+        injected = time.perf_counter()
+        results = driver.execute_async_script(
+            _RUN_AXE_SCRIPT,
+            options.to_axe_options(),
+            list(options.count_only_result_types),
+        )
+        if _AXE_ERROR_KEY in results:
+            raise WebDriverException(f"aXe run failed: {results[_AXE_ERROR_KEY]}")
+
+        if timings is not None:
+            timings["axe_inject"] = injected - start
+            timings["axe_run"] = time.perf_counter() - injected
+        results[AXE_SOURCE_VERSION_KEY] = self.version
+        results[AXE_RUN_OPTIONS_KEY] = options.to_dict()
+        return results
+
+
+@lru_cache(maxsize=None)
+def get_axe_script(
+    path: Optional[str] = None,
+    version: Optional[str] = None,
+) -> AxeScript:
+    """
+    Get the axe-core script for the provided path and version pin, loaded once
+    per process (see `AxeScript`).
+    """
+    return AxeScript(path=path, version=version)
+
+
+def run_axe(
+    driver: "WebDriver",
+    axe_script: Optional[AxeScript] = None,
+    options: AxeRunOptions = DEFAULT_AXE_RUN_OPTIONS,
+    timings: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Inject aXe into the page currently loaded by the driver and run the checks
+    selected by the options.
+
+    Parameters
+    ----------
+    driver: WebDriver
+        The driver which has already navigated to (and rendered) the page to audit.
+    axe_script: Optional[AxeScript]
+        The axe-core script to inject.
+        Default: None (the bundled axe-core build)
+    options: AxeRunOptions
+        The rules to run and detail to keep.
+        Default: every rule with full detail
+    timings: Optional[Dict[str, float]]
+        A dict to store the seconds spent injecting and running aXe to.
+        Default: None (do not record timings)
+
+    Returns
+    -------
+    results: Dict[str, Any]
+        The full aXe results for the page.
+    """
+    if axe_script is None:
+        axe_script = get_axe_script()
+
+    return axe_script.run(driver, options=options, timings=timings)
+
+
+def dom_fingerprint(driver: "WebDriver", include_text: bool = False) -> str:
+    """
+    Hash the structure of the DOM currently rendered by the driver.
+
+    Parameters
+    ----------
+    driver: WebDriver
+        The driver which has already navigated to (and rendered) the page.
+    include_text: bool
+        Should text content be part of the fingerprint.
+        Default: False (only tag and attribute names)
+
+    Returns
+    -------
+    fingerprint: str
+        The hex digest of the page's DOM skeleton.
+    """
+    skeleton = driver.execute_script(_DOM_SKELETON_SCRIPT, include_text)
+    return hashlib.sha1(skeleton.encode("utf-8")).hexdigest()
+
+
+class TemplateResultsCache:
+    """
+    A bounded, thread safe, per site cache of aXe results keyed by DOM fingerprint.
+
+    Parameters
+    ----------
+    include_text: bool
+        Should text content be part of each page's fingerprint.
+        Default: False (pages differing only in text share results)
+    max_entries: int
+        The number of fingerprints to keep results for before evicting the least
+        recently used.
+        Default: 256
+    """
+
+    def __init__(self, include_text: bool = False, max_entries: int = 256):
+        self.include_text = include_text
+        self.max_entries = max_entries
+        self._results: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, site: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            results = self._results.get((site, fingerprint))
+            if results is not None:
+                self._results.move_to_end((site, fingerprint))
+            return results
+
+    def put(self, site: str, fingerprint: str, results: Dict[str, Any]) -> None:
+        with self._lock:
+            self._results[(site, fingerprint)] = results
+            if len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+
+def audit_page(
+    driver: "WebDriver",
+    site: str,
+    cache: Optional[TemplateResultsCache] = None,
+    axe_script: Optional[AxeScript] = None,
+    options: AxeRunOptions = DEFAULT_AXE_RUN_OPTIONS,
+    timings: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Run aXe on the page currently loaded by the driver, reusing the results of an
+    already audited page of the same site with an identical DOM structure if a cache
+    is provided.
+
+    Parameters
+    ----------
+    driver: WebDriver
+        The driver which has already navigated to (and rendered) the page to audit.
+    site: str
+        The site the page belongs to. Results are only ever reused within a site.
+    cache: Optional[TemplateResultsCache]
+        The cache of already audited page templates.
+        Default: None (always run aXe)
+    axe_script: Optional[AxeScript]
+        The axe-core script to inject.
+        Default: None (the bundled axe-core build)
+    options: AxeRunOptions
+        The rules to run and detail to keep.
+        Default: every rule with full detail
+    timings: Optional[Dict[str, float]]
+        A dict to store the seconds spent injecting and running aXe to
+        (nothing is stored for reused results).
+        Default: None (do not record timings)
+
+    Returns
+    -------
+    results: Dict[str, Any]
+        The full aXe results for the page. Reused results have their "url" set to
+        this page and the URL of the page they were produced from stored under the
+        AXE_RESULTS_REUSED_FROM_KEY key.
+    """
+    if cache is None:
+        return run_axe(driver, axe_script=axe_script, options=options, timings=timings)
+
+    # Check for an already audited page with the same structure
+    fingerprint = dom_fingerprint(driver, include_text=cache.include_text)
+    cached = cache.get(site, fingerprint)
+    if cached is not None:
+        return {
+            **cached,
+            "url": driver.current_url,
+            AXE_RESULTS_REUSED_FROM_KEY: cached["url"],
+        }
+
+    # Audit and store
+    results = run_axe(driver, axe_script=axe_script, options=options, timings=timings)
+    cache.put(site, fingerprint, results)
+    return results
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+import sys
+import traceback
+from pathlib import Path
+from typing import Dict, Optional
+
+from access_eval.shards import (
+    SHARD_MANIFEST_FILENAME,
+    load_shard_manifest,
+    plan_shards,
+    requeue_running_shards,
+    run_shards,
+)
+from access_eval.utils import read_url_list, read_url_records
+
+###############################################################################
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(levelname)4s: %(module)s:%(lineno)4s %(asctime)s] %(message)s",
+)
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class Args(argparse.Namespace):
+    def __init__(self) -> None:
+        self.__parse()
+
+    def __parse(self) -> None:
+        p = argparse.ArgumentParser(
+            prog="crawl-access-eval-sites",
+            description=(
+                "Split a list of websites into shards and crawl them with one "
+                "crawler process per core. Run again on another machine pointed at "
+                "the same (shared) shard directory to help crawl the remaining shards."
+            ),
+        )
+        p.add_argument(
+            "shard_dir",
+            type=str,
+            help=(
+                "The directory to store (or that already stores) the shard manifest "
+                "and shard files."
+            ),
+        )
+        p.add_argument(
+            "-f",
+            "--urls_file",
+            type=str,
+            default=None,
+            help=(
+                "A CSV or JSONL file of websites to plan shards from. "
+                "Only required the first time a shard directory is used."
+            ),
+        )
+        p.add_argument(
+            "-c",
+            "--url_column",
+            type=str,
+            default=None,
+            help=(
+                "The column name in the urls file which contains the website URLs. "
+                "Default: detected (i.e. 'campaign_website_url' or 'Website')."
+            ),
+        )
+        p.add_argument(
+            "--cost_column",
+            type=str,
+            default=None,
+            help=(
+                "An optional column (or JSONL key) with the expected cost of each site "
+                "(i.e. number of pages in a prior crawl). "
+                "Larger sites are crawled first."
+            ),
+        )
+        p.add_argument(
+            "--sites_per_shard",
+            type=int,
+            default=10,
+            help=(
+                "The maximum number of websites crawled per shard. Sites expected "
+                "to cost more than the typical site get smaller shards."
+            ),
+        )
+        p.add_argument(
+            "-o",
+            "--results_dir",
+            type=str,
+            default=".",
+            help="The results root directory all crawlers write to.",
+        )
+        p.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=None,
+            help="The number of crawler processes to run. Default: one per core.",
+        )
+        p.add_argument(
+            "-b",
+            "--browsers_per_worker",
+            type=int,
+            default=1,
+            help="The size of the browser pool of each crawler process.",
+        )
+        p.add_argument(
+            "--requeue_running",
+            action="store_true",
+            help=(
+                "Move shards left running by a crashed run back to pending before "
+                "starting. Only use when no other machine is working on the shards."
+            ),
+        )
+        p.parse_args(namespace=self)
+
+
+###############################################################################
+
+
+def _read_expected_costs(
+    urls_file: str,
+    url_column: Optional[str],
+    cost_column: Optional[str],
+) -> Optional[Dict[str, float]]:
+    if cost_column is None:
+        return None
+
+    # Read with the same reader (CSV or JSONL) as the URLs
+    costs = {}
+    for url, record in read_url_records(urls_file, url_column=url_column):
+        cost = record.get(cost_column)
+        if len(url) > 0 and cost is not None and cost != "":
+            costs[url] = float(cost)
+
+    return costs
+
+
+def main() -> None:
+    try:
+        args = Args()
+        shard_dir = Path(args.shard_dir)
+
+        # Plan shards on first use of the shard dir
+        if not (shard_dir / SHARD_MANIFEST_FILENAME).exists():
+            if args.urls_file is None:
+                raise ValueError(
+                    f"No shard manifest found in '{shard_dir}', "
+                    f"provide a urls file to plan shards from."
+                )
+            manifest = plan_shards(
+                read_url_list(args.urls_file, url_column=args.url_column),
+                shard_dir,
+                sites_per_shard=args.sites_per_shard,
+                expected_costs=_read_expected_costs(
+                    args.urls_file, args.url_column, args.cost_column
+                ),
+            )
+        else:
+            manifest = load_shard_manifest(shard_dir)
+        log.info(
+            f"Shard manifest contains {len(manifest.shards)} shards "
+            f"covering {manifest.total_sites} sites."
+        )
+
+        # Optionally recover shards from a crashed run
+        if args.requeue_running:
+            log.info(f"Requeued {requeue_running_shards(shard_dir)} running shards.")
+
+        # Crawl
+        n_crawled = run_shards(
+            shard_dir,
+            results_dir=args.results_dir,
+            workers=args.workers,
+            browsers_per_worker=args.browsers_per_worker,
+        )
+        log.info(f"Crawled {n_crawled} shards on this machine.")
+
+    except Exception as e:
+        log.error("=============================================")
+        log.error("\n\n" + traceback.format_exc())
+        log.error("=============================================")
+        log.error("\n\n" + str(e) + "\n")
+        log.error("=============================================")
+        sys.exit(1)
+
+
+###############################################################################
+# Allow caller to directly run this module (usually in development scenarios)
+
+if __name__ == "__main__":
+    main()
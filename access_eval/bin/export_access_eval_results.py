@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import logging
+import sys
+import traceback
+from pathlib import Path
+
+from access_eval.result_store import ResultStore
+
+###############################################################################
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(levelname)4s: %(module)s:%(lineno)4s %(asctime)s] %(message)s",
+)
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+
+class Args(argparse.Namespace):
+    def __init__(self) -> None:
+        self.__parse()
+
+    def __parse(self) -> None:
+        p = argparse.ArgumentParser(
+            prog="export_access_eval_results",
+            description=(
+                "Export the results of an access evaluation run stored in a result "
+                "store (AXE_RESULTS_BACKEND = 'sqlite') to one directory per page."
+            ),
+        )
+        p.add_argument(
+            "store",
+            type=str,
+            help="The path to the run's result store database.",
+        )
+        p.add_argument(
+            "dest_dir",
+            type=str,
+            help="The directory to create the page directories in.",
+        )
+        p.add_argument(
+            "--format",
+            dest="fmt",
+            type=str,
+            default="json",
+            help=(
+                "The storage format to write each page's results in "
+                "('json', 'json.gz', 'json.zst', or 'msgpack'). Default: 'json'"
+            ),
+        )
+        p.add_argument(
+            "--site",
+            type=str,
+            default=None,
+            help="Only export the pages of this site. Default: every site",
+        )
+        p.parse_args(namespace=self)
+
+
+###############################################################################
+
+
+def main() -> None:
+    try:
+        args = Args()
+
+        # Opening a mistyped path would create (and export) an empty store
+        store_path = Path(args.store).resolve(strict=True)
+        if not store_path.is_file():
+            raise IsADirectoryError(f"Not a result store database: '{store_path}'")
+
+        with ResultStore(store_path) as store:
+            n_pages = store.export_legacy_layout(
+                args.dest_dir, fmt=args.fmt, site=args.site
+            )
+        log.info(f"Exported results of {n_pages} pages to: '{args.dest_dir}'")
+    except Exception as e:
+        log.error("=============================================")
+        log.error("\n\n" + traceback.format_exc())
+        log.error("=============================================")
+        log.error("\n\n" + str(e) + "\n")
+        log.error("=============================================")
+        sys.exit(1)
+
+
+###############################################################################
+# Allow caller to directly run this module (usually in development scenarios)
+
+if __name__ == "__main__":
+    main()
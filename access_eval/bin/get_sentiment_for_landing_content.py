@@ -4,19 +4,20 @@
 import argparse
 import logging
 import sys
-import time
 import traceback
 from functools import partial
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver import FirefoxOptions
 from selenium.webdriver.common.by import By
 from textblob import TextBlob
 from tqdm import tqdm
 
+from access_eval.block_policy import TEXT_ONLY_POLICY
+from access_eval.driver_pool import create_driver
+from access_eval.readiness import wait_for_page_ready
+
 ###############################################################################
 
 logging.basicConfig(
@@ -65,16 +66,15 @@ class Args(argparse.Namespace):
 def _process_url(row: pd.Series, url_column: str) -> float:
     try:
         # Create new firefox headless browser
-        opts = FirefoxOptions()
-        opts.add_argument("--headless")
+        # Only the page text is needed so skip images, media, fonts, and trackers
         url = row[url_column]
-        with webdriver.Firefox(firefox_options=opts) as driver:
+        with create_driver(block_policy=TEXT_ONLY_POLICY) as driver:
             log.debug(f"Starting page load for: '{url}'.")
             # Start page load
             driver.get(url)
-            log.debug("Sleeping for 2 seconds.")
             # Wait for all page content
-            time.sleep(2)
+            waited = wait_for_page_ready(driver)
+            log.debug(f"Page settled after {waited:.2f} seconds.")
 
             # Get all text
             log.debug("Getting all page text.")
@@ -42,6 +42,15 @@ class Args(argparse.Namespace):
                 "from a provided string."
             ),
         )
+        p.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "The number of processes to parse and summarize page results with. "
+                "Default: 1"
+            ),
+        )
         p.parse_args(namespace=self)
 
 
@@ -52,7 +61,7 @@ def main() -> None:
     try:
         args = Args()
         cleaned_url = clean_url(args.head_dir)
-        generate_high_level_statistics(head_dir=cleaned_url)
+        generate_high_level_statistics(head_dir=cleaned_url, workers=args.workers)
         generate_email_text(head_dir=cleaned_url)
 
     except Exception as e:
@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Tuple
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    from selenium.webdriver import FirefoxOptions
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+###############################################################################
+# Host lists
+# Subdomains of each host are blocked as well
+
+TRACKER_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "analytics.twitter.com",
+    "static.ads-twitter.com",
+    "snap.licdn.com",
+    "hotjar.com",
+    "segment.io",
+    "cdn.segment.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+    "stats.wp.com",
+)
+
+VIDEO_EMBED_HOSTS = (
+    "youtube.com",
+    "youtube-nocookie.com",
+    "ytimg.com",
+    "vimeo.com",
+    "vimeocdn.com",
+)
+
+DONATION_WIDGET_HOSTS = (
+    "actblue.com",
+    "secure.actblue.com",
+    "anedot.com",
+    "winred.com",
+    "secure.ngpvan.com",
+)
+
+###############################################################################
+
+# Estimates the resources the policy prevented from loading from the rendered DOM
+# (elements whose source is blocked and any web fonts which never loaded)
+# Requests made by scripts or stylesheets which left no element behind are missed
+_ESTIMATE_BLOCKED_SCRIPT = """
+var blockedHosts = arguments[0];
+var blockImages = arguments[1];
+var blockMedia = arguments[2];
+var blockFonts = arguments[3];
+function hostBlocked(src) {
+    try {
+        var host = new URL(src, document.baseURI).hostname;
+    } catch (e) {
+        return false;
+    }
+    return blockedHosts.some(function (d) {
+        return host === d || host.endsWith("." + d);
+    });
+}
+var count = 0;
+document.querySelectorAll("[src]").forEach(function (el) {
+    var tag = el.tagName;
+    if (hostBlocked(el.getAttribute("src"))) {
+        count++;
+    } else if (blockImages && tag === "IMG") {
+        count++;
+    } else if (blockMedia && ["VIDEO", "AUDIO", "SOURCE"].includes(tag)) {
+        count++;
+    }
+});
+if (blockFonts && document.fonts) {
+    document.fonts.forEach(function (font) {
+        if (font.status !== "loaded") {
+            count++;
+        }
+    });
+}
+return count;
+"""
+
+# Requests a URL and calls back with whether it loaded (with any response)
+_LOADS_SCRIPT = """
+var callback = arguments[arguments.length - 1];
+fetch(arguments[0], {mode: "no-cors", cache: "no-store"}).then(
+    function () { callback(true); },
+    function () { callback(false); }
+);
+"""
+
+
+@dataclass(frozen=True)
+class BlockPolicy:
+    """
+    A set of resources to prevent the browser from loading.
+
+    Parameters
+    ----------
+    name: str
+        The name of the policy.
+    block_images: bool
+        Do not load images.
+    block_media: bool
+        Do not autoplay or preload audio and video.
+    block_fonts: bool
+        Do not download web fonts.
+    blocked_hosts: Tuple[str, ...]
+        Hosts (and their subdomains) to refuse all requests to.
+    """
+
+    name: str
+    block_images: bool = False
+    block_media: bool = False
+    block_fonts: bool = False
+    blocked_hosts: Tuple[str, ...] = ()
+
+    @property
+    def blocks_anything(self) -> bool:
+        return (
+            self.block_images
+            or self.block_media
+            or self.block_fonts
+            or len(self.blocked_hosts) > 0
+        )
+
+    def _proxy_autoconfig(self) -> str:
+        # Requests to blocked hosts are routed to a closed local port and fail fast
+        pac = (
+            "function FindProxyForURL(url, host) {"
+            f"var blocked = {list(self.blocked_hosts)!r};"
+            "for (var i = 0; i < blocked.length; i++) {"
+            "if (host === blocked[i] || dnsDomainIs(host, '.' + blocked[i])) {"
+            "return 'PROXY 127.0.0.1:9';"
+            "}"
+            "}"
+            "return 'DIRECT';"
+            "}"
+        )
+        return f"data:text/javascript,{quote(pac)}"
+
+    def apply(self, opts: "FirefoxOptions") -> "FirefoxOptions":
+        """
+        Set the Firefox preferences which enforce this policy.
+
+        Parameters
+        ----------
+        opts: FirefoxOptions
+            The options to set the preferences on.
+
+        Returns
+        -------
+        opts: FirefoxOptions
+            The same options with the preferences set.
+        """
+        if self.block_images:
+            opts.set_preference("permissions.default.image", 2)
+
+        if self.block_media:
+            opts.set_preference("media.autoplay.default", 5)
+            opts.set_preference("media.preload.default", 0)
+            opts.set_preference("media.preload.auto", 0)
+
+        if self.block_fonts:
+            opts.set_preference("gfx.downloadable_fonts.enabled", False)
+            opts.set_preference("browser.display.use_document_fonts", 0)
+
+        if len(self.blocked_hosts) > 0:
+            opts.set_preference("privacy.trackingprotection.enabled", True)
+            opts.set_preference("network.proxy.type", 2)
+            opts.set_preference(
+                "network.proxy.autoconfig_url", self._proxy_autoconfig()
+            )
+
+        return opts
+
+    def estimate_blocked(self, driver: "WebDriver") -> int:
+        """
+        Estimate the number of resources this policy blocked for the page currently
+        loaded by the driver from the elements of its rendered DOM.
+
+        This is not a count of blocked requests, requests which left no element
+        behind (i.e. tracker beacons sent by scripts) are not included.
+        """
+        if not self.blocks_anything:
+            return 0
+
+        return driver.execute_script(
+            _ESTIMATE_BLOCKED_SCRIPT,
+            list(self.blocked_hosts),
+            self.block_images,
+            self.block_media,
+            self.block_fonts,
+        )
+
+    def verify(self, driver: "WebDriver") -> bool:
+        """
+        Check that requests to blocked hosts actually fail in the driver's browser
+        by requesting the first blocked host.
+
+        Returns
+        -------
+        enforced: bool
+            False if the blocked host loaded (the browser ignored the policy's
+            proxy configuration), True otherwise.
+        """
+        if len(self.blocked_hosts) == 0:
+            return True
+
+        return not driver.execute_async_script(
+            _LOADS_SCRIPT, f"https://{self.blocked_hosts[0]}/"
+        )
+
+
+###############################################################################
+# Presets
+
+NO_BLOCKING = BlockPolicy(name="none")
+
+# Media, fonts, video embeds and trackers do not change which aXe rules apply
+# Images (alt text, contrast over images) and donation forms do so they are kept
+AUDIT_POLICY = BlockPolicy(
+    name="audit",
+    block_media=True,
+    block_fonts=True,
+    blocked_hosts=TRACKER_HOSTS + VIDEO_EMBED_HOSTS,
+)
+
+# Only the page text is needed for word metrics and sentiment
+TEXT_ONLY_POLICY = BlockPolicy(
+    name="text-only",
+    block_images=True,
+    block_media=True,
+    block_fonts=True,
+    blocked_hosts=TRACKER_HOSTS + VIDEO_EMBED_HOSTS + DONATION_WIDGET_HOSTS,
+)
+
+BLOCK_POLICIES = {
+    policy.name: policy for policy in (NO_BLOCKING, AUDIT_POLICY, TEXT_ONLY_POLICY)
+}
+
+
+def get_block_policy(name: str) -> BlockPolicy:
+    """
+    Get a block policy preset by name ("none", "audit", or "text-only").
+    """
+    if name not in BLOCK_POLICIES:
+        raise ValueError(
+            f"Unknown block policy: '{name}'. "
+            f"Available policies: {list(BLOCK_POLICIES.keys())}"
+        )
+
+    return BLOCK_POLICIES[name]
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import re
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.statscollectors import StatsCollector
+
+###############################################################################
+
+# Paginated listing pages (i.e. blog archives) are crawled last
+PAGINATION_PATTERN = re.compile(
+    r"(/page/\d+)|([?&](page|paged|pg|p|offset|start)=\d+)",
+    re.IGNORECASE,
+)
+
+NAVIGATION_PRIORITY = 100
+PAGINATION_PRIORITY = -100
+
+###############################################################################
+
+
+def link_priority(url: str, depth: int, navigation: bool = False) -> int:
+    """
+    Score a link for the scheduler, higher scores are crawled first.
+
+    Links from a page's navigation (`<nav>` or `<header>`) come first, then pages
+    closer to the start page and with shorter paths, and paginated listing pages
+    come last.
+
+    Parameters
+    ----------
+    url: str
+        The URL of the linked page.
+    depth: int
+        The crawl depth the linked page would be requested at.
+    navigation: bool
+        Was the link found in the navigation of the page.
+        Default: False
+
+    Returns
+    -------
+    priority: int
+        The scrapy request priority for the link.
+
+    Examples
+    --------
+    >>> link_priority("https://example.com/issues", depth=1, navigation=True)
+    89
+    >>> link_priority("https://example.com/blog/page/7", depth=1)
+    -113
+    """
+    priority = -10 * depth
+    if navigation:
+        priority += NAVIGATION_PRIORITY
+
+    parts = urlsplit(url)
+    if PAGINATION_PATTERN.search(f"{parts.path}?{parts.query}"):
+        priority += PAGINATION_PRIORITY
+
+    # Shallower paths are usually more important pages
+    priority -= len([segment for segment in parts.path.split("/") if segment])
+
+    return priority
+
+
+class SiteBudget:
+    """The pages spent and time elapsed crawling a single site."""
+
+    def __init__(self, site: str):
+        self.site = site
+        self.started = time.monotonic()
+        self.pages = 0
+        self.refunded = 0
+        self.skipped = 0
+        self.exhausted_by: Optional[str] = None
+        # Links refused by the page limit: (priority, url, depth)
+        self.deferred: Dict[str, Tuple[int, str, int]] = {}
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "site": self.site,
+            "pages": self.pages,
+            "refunded": self.refunded,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "exhausted": self.exhausted_by is not None,
+            "exhausted_by": self.exhausted_by,
+        }
+
+
+class CrawlBudget:
+    """
+    Bounds the cost of crawling each site by a number of pages, wall time, and
+    link depth.
+
+    Parameters
+    ----------
+    max_pages_per_site: Optional[int]
+        The maximum number of pages to schedule per site. Links which are never
+        audited are refunded (see `refund`) so the limit is on audited pages.
+        Links refused by the page limit are kept (see `defer`) and scheduled in
+        priority order as pages are refunded.
+        Default: None (no page limit)
+    max_seconds_per_site: Optional[float]
+        The maximum number of seconds after a site's first page was scheduled
+        during which more of its pages may be scheduled and rendered.
+        Default: None (no time limit)
+    max_depth: Optional[int]
+        The maximum number of links followed from a site's start page.
+        Depth is tracked by the spider (not scrapy's DepthMiddleware) because
+        pre-flight and sitemap requests sit between a page and its links.
+        Default: None (no depth limit)
+    stats: Optional[StatsCollector]
+        A scrapy stats collector to record exhausted budgets and skipped pages to.
+        Default: None (do not record stats)
+    """
+
+    def __init__(
+        self,
+        max_pages_per_site: Optional[int] = None,
+        max_seconds_per_site: Optional[float] = None,
+        max_depth: Optional[int] = None,
+        stats: Optional["StatsCollector"] = None,
+    ):
+        self.max_pages_per_site = max_pages_per_site
+        self.max_seconds_per_site = max_seconds_per_site
+        self.max_depth = max_depth
+        self.stats = stats
+        self.sites: Dict[str, SiteBudget] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "CrawlBudget":
+        return cls(
+            max_pages_per_site=(
+                crawler.settings.getint("CRAWL_BUDGET_MAX_PAGES_PER_SITE") or None
+            ),
+            max_seconds_per_site=(
+                crawler.settings.getfloat("CRAWL_BUDGET_MAX_SECONDS_PER_SITE") or None
+            ),
+            max_depth=crawler.settings.getint("CRAWL_BUDGET_MAX_DEPTH") or None,
+            stats=crawler.stats,
+        )
+
+    def _site(self, site: str) -> SiteBudget:
+        if site not in self.sites:
+            self.sites[site] = SiteBudget(site)
+
+        return self.sites[site]
+
+    def _exhaust(self, budget: SiteBudget, reason: str) -> None:
+        if budget.exhausted_by is None:
+            budget.exhausted_by = reason
+            if self.stats is not None:
+                self.stats.inc_value(f"budget/exhausted_by/{reason}")
+
+    def out_of_time(self, site: str) -> bool:
+        """
+        Check whether the site's wall time is spent, marking the site's budget
+        exhausted if so.
+        """
+        budget = self._site(site)
+        if (
+            self.max_seconds_per_site is not None
+            and budget.elapsed >= self.max_seconds_per_site
+        ):
+            self._exhaust(budget, "time")
+            return True
+
+        return False
+
+    def allows(self, site: str) -> bool:
+        """
+        Check whether the site has budget left for another page, marking the
+        site's budget exhausted if not. Links refused after a site's budget is
+        exhausted are counted as skipped.
+        """
+        budget = self._site(site)
+        if (
+            not self.out_of_time(site)
+            and self.max_pages_per_site is not None
+            and budget.pages >= self.max_pages_per_site
+        ):
+            self._exhaust(budget, "pages")
+
+        # Once exhausted (by either) a budget stays exhausted
+        if budget.exhausted_by is not None:
+            budget.skipped += 1
+            if self.stats is not None:
+                self.stats.inc_value("budget/skipped")
+            return False
+
+        return True
+
+    def charge(self, site: str) -> None:
+        """Record that a page of the site was scheduled."""
+        self._site(site).pages += 1
+
+    def resume(self, site: str, pages: int, elapsed_seconds: float) -> None:
+        """
+        Restore the pages and wall time a site spent in previous runs of an
+        interrupted crawl (see `Frontier.replayed`) before any of its pages are
+        scheduled again.
+        """
+        budget = self._site(site)
+        budget.pages += pages
+        budget.started -= elapsed_seconds
+
+    def defer(self, site: str, url: str, depth: int, priority: int) -> None:
+        """
+        Keep a link refused because the site's page limit was hit so it can be
+        scheduled if pages are refunded (see `readmit`). Only the
+        `max_pages_per_site` highest priority links are kept, links refused once
+        the site is out of time are never scheduled.
+        """
+        budget = self._site(site)
+        if (
+            budget.exhausted_by != "pages"
+            or self.max_pages_per_site is None
+            or url in budget.deferred
+        ):
+            return
+
+        budget.deferred[url] = (priority, url, depth)
+        if len(budget.deferred) > self.max_pages_per_site:
+            del budget.deferred[min(budget.deferred.values())[1]]
+
+    def readmit(self, site: str) -> Optional[Tuple[str, int, int]]:
+        """
+        Take the highest priority deferred link (its url, depth, and priority) of
+        a site which has pages left again, or None if it has none.
+        """
+        budget = self._site(site)
+        if (
+            len(budget.deferred) == 0
+            or budget.exhausted_by is not None
+            or self.out_of_time(site)
+        ):
+            return None
+
+        priority, url, depth = max(budget.deferred.values())
+        del budget.deferred[url]
+        return url, depth, priority
+
+    def refund(self, site: str) -> None:
+        """
+        Return the page charged for a scheduled link which was never audited
+        (i.e. rejected at pre-flight, redirected off site, or redirected to an
+        already seen page). A site whose budget was only exhausted by its page
+        limit is reopened once it has pages left again so its deferred links can
+        be re-admitted (see `readmit`).
+        """
+        budget = self._site(site)
+        budget.pages = max(0, budget.pages - 1)
+        budget.refunded += 1
+        if self.stats is not None:
+            self.stats.inc_value("budget/refunded")
+
+        if (
+            budget.exhausted_by == "pages"
+            and self.max_pages_per_site is not None
+            and budget.pages < self.max_pages_per_site
+        ):
+            budget.exhausted_by = None
+
+    def write_site_report(self, site: str, path: Union[str, Path]) -> Path:
+        """
+        Store the budget spent crawling the site (and whether it was exhausted)
+        to the provided path as JSON.
+        """
+        path = Path(path)
+        with open(path, "w", encoding="utf8") as open_f:
+            json.dump(self._site(site).to_dict(), open_f, indent=4)
+
+        return path
@@ -5,3 +5,26 @@ SINGLE_PAGE_AXE_RESULTS_FILENAME = "full-axe-results.json"
 SINGLE_PAGE_ENTRY_SCREENSHOT_FILENAME = "entry-screenshot.png"
 SINGLE_PAGE_SIMPLIFIED_AXE_RESULTS_FILENAME = "accessibility-violations-summarized.csv"
 AGGREGATE_AXE_RESULTS_FILENAME = "aggregated-accessibility-violations-summarized.csv"
+AGGREGATE_AXE_TOTALS_FILENAME = "aggregated-accessibility-totals.json"
+SITE_CRAWL_BUDGET_FILENAME = "crawl-budget.json"
+PREFLIGHT_REJECTED_LINKS_FILENAME = "preflight-rejected-links.csv"
+
+# Key added to the aXe results of a page which reused the results of an already
+# audited page with an identical DOM structure (value is that page's URL)
+AXE_RESULTS_REUSED_FROM_KEY = "accessEvalReusedFrom"
+
+# Key added to the aXe results of every page with the version of the axe-core
+# script which was injected
+AXE_SOURCE_VERSION_KEY = "accessEvalAxeVersion"
+
+# Key added to the aXe results of every page with the run options used
+# (see access_eval.audit.AxeRunOptions)
+AXE_RUN_OPTIONS_KEY = "accessEvalAxeOptions"
+
+# Key replacing the nodes of rules of count only result types
+AXE_NODE_COUNT_KEY = "nodeCount"
+
+# Scheduler priority of robots.txt and sitemap requests (fetched without a browser)
+# Above any page priority so a site's sitemap is usually parsed before its start
+# page is rendered
+SITEMAP_REQUEST_PRIORITY = 1000
@@ -0,0 +1,506 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import psutil
+from scrapy.settings import SETTINGS_PRIORITIES
+from selenium import webdriver
+from selenium.webdriver import FirefoxOptions
+
+from .block_policy import NO_BLOCKING, BlockPolicy, get_block_policy
+
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.statscollectors import StatsCollector
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+# Clears the web storage of the page currently loaded (before leaving its origin)
+# and unregisters its service workers, pages without storage access are skipped
+_RESET_STORAGE_SCRIPT = """
+try {
+    window.localStorage.clear();
+    window.sessionStorage.clear();
+} catch (e) {}
+if (navigator.serviceWorker) {
+    navigator.serviceWorker.getRegistrations().then(function (registrations) {
+        registrations.forEach(function (registration) {
+            registration.unregister();
+        });
+    }).catch(function () {});
+}
+"""
+
+###############################################################################
+
+
+def create_driver(
+    executable_path: Optional[str] = None,
+    arguments: Sequence[str] = ("-headless",),
+    block_policy: BlockPolicy = NO_BLOCKING,
+    user_agent: Optional[str] = None,
+) -> "WebDriver":
+    """
+    Spawn a new Firefox webdriver process.
+
+    Parameters
+    ----------
+    executable_path: Optional[str]
+        The path to the geckodriver executable.
+        Default: None (let selenium find geckodriver on the PATH)
+    arguments: Sequence[str]
+        Command line arguments to pass to Firefox.
+        Default: ("-headless",)
+    block_policy: BlockPolicy
+        The resources to prevent the browser from loading.
+        Default: NO_BLOCKING (load everything)
+    user_agent: Optional[str]
+        The User-Agent header the browser sends.
+        Default: None (Firefox's own)
+
+    Returns
+    -------
+    driver: WebDriver
+        The started Firefox webdriver.
+    """
+    opts = FirefoxOptions()
+    for argument in arguments:
+        opts.add_argument(argument)
+    block_policy.apply(opts)
+    if user_agent is not None:
+        opts.set_preference("general.useragent.override", user_agent)
+
+    if executable_path is not None:
+        return webdriver.Firefox(executable_path=executable_path, firefox_options=opts)
+
+    return webdriver.Firefox(firefox_options=opts)
+
+
+def pool_concurrency_settings(size: int) -> Dict[str, int]:
+    """
+    Get the scrapy concurrency settings matching a driver pool of `size` drivers.
+
+    Each in-flight page holds one pooled driver for its entire download and is
+    rendered on a reactor thread, the thread pool leaves room for DNS resolution.
+
+    Examples
+    --------
+    >>> pool_concurrency_settings(4)["REACTOR_THREADPOOL_MAXSIZE"]
+    8
+    """
+    return {
+        "CONCURRENT_REQUESTS": size,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": size,
+        "REACTOR_THREADPOOL_MAXSIZE": size + 4,
+    }
+
+
+class PooledDriver:
+    def __init__(self, driver: "WebDriver"):
+        self.driver = driver
+        self.pages = 0
+        self.killed = False
+
+        # Whether a page holds the driver (guarded by the pool's lock)
+        self.checked_out = False
+
+        # Every process (geckodriver, Firefox, and Firefox content processes)
+        # ever seen in this driver's process tree
+        # Firefox processes are tracked directly so they can still be reaped
+        # if geckodriver dies and they are re-parented
+        self.processes: Dict[int, psutil.Process] = {}
+        if driver is not None:
+            try:
+                pid = driver.service.process.pid
+                self.processes[pid] = psutil.Process(pid)
+            except (AttributeError, psutil.Error):
+                pass
+            self.refresh_processes()
+
+    def refresh_processes(self) -> List[psutil.Process]:
+        """Update (and return) the processes alive in this driver's process tree."""
+        for process in list(self.processes.values()):
+            try:
+                for child in process.children(recursive=True):
+                    self.processes.setdefault(child.pid, child)
+            except psutil.Error:
+                pass
+
+        self.processes = {
+            pid: process
+            for pid, process in self.processes.items()
+            if process.is_running()
+        }
+        return list(self.processes.values())
+
+    def rss_mb(self) -> float:
+        """The resident memory of the whole process tree in megabytes."""
+        rss = 0
+        for process in self.refresh_processes():
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                pass
+
+        return rss / 1e6
+
+    def cpu_percent(self) -> float:
+        """
+        The CPU use of the whole process tree (in percent of one core) since the
+        last call.
+        """
+        cpu = 0.0
+        for process in self.refresh_processes():
+            try:
+                cpu += process.cpu_percent(interval=None)
+            except psutil.Error:
+                pass
+
+        return cpu
+
+    def kill(self) -> int:
+        """Kill the whole process tree, returning the number of processes killed."""
+        n_killed = 0
+        for process in self.refresh_processes():
+            try:
+                process.kill()
+                n_killed += 1
+            except psutil.Error:
+                pass
+
+        return n_killed
+
+
+class DriverPool:
+    """
+    A pool of long-lived Firefox webdrivers.
+
+    Drivers are started lazily (up to `size`), checked out exclusively by a single
+    page at a time, reset after use (the last page's cookies, local and session
+    storage, and service workers are cleared and a blank page loaded), and
+    replaced with a fresh process once they have served `max_pages_per_driver`
+    pages or their process tree uses more than `max_rss_mb` of memory.
+
+    Every checkout is guarded by a watchdog. If a page holds a driver for longer
+    than `page_timeout` seconds the driver's whole process tree is killed (which
+    makes the blocked webdriver call raise) and the driver is replaced.
+
+    Parameters
+    ----------
+    size: int
+        The maximum number of drivers alive at once.
+        Default: 1
+    max_pages_per_driver: int
+        The number of pages a driver may serve before it is quit and replaced.
+        Default: 50
+    max_rss_mb: Optional[float]
+        The resident memory (in megabytes) of a driver's process tree above which
+        it is quit and replaced.
+        Default: None (no memory limit)
+    page_timeout: Optional[float]
+        The number of seconds a single checkout may last before the driver's process
+        tree is killed.
+        Default: None (no watchdog)
+    executable_path: Optional[str]
+        The path to the geckodriver executable.
+        Default: None (let selenium find geckodriver on the PATH)
+    arguments: Optional[Sequence[str]]
+        Command line arguments to pass to Firefox.
+        Default: None (run headless)
+    block_policy: BlockPolicy
+        The resources to prevent every pooled browser from loading.
+        Default: NO_BLOCKING (load everything)
+    user_agent: Optional[str]
+        The User-Agent header every pooled browser sends.
+        Default: None (Firefox's own)
+    stats: Optional[StatsCollector]
+        A scrapy stats collector to record driver starts, recycles, and kills
+        (and whether the block policy was found not to be enforced) to.
+        Default: None (do not record stats)
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        max_pages_per_driver: int = 50,
+        max_rss_mb: Optional[float] = None,
+        page_timeout: Optional[float] = None,
+        executable_path: Optional[str] = None,
+        arguments: Optional[Sequence[str]] = None,
+        block_policy: BlockPolicy = NO_BLOCKING,
+        user_agent: Optional[str] = None,
+        stats: Optional["StatsCollector"] = None,
+    ):
+        if size < 1:
+            raise ValueError(f"Driver pool size must be at least 1, received: {size}")
+
+        self.size = size
+        self.max_pages_per_driver = max_pages_per_driver
+        self.max_rss_mb = max_rss_mb
+        self.page_timeout = page_timeout
+        self.executable_path = executable_path
+        self.arguments = tuple(arguments) if arguments else ("-headless",)
+        self.block_policy = block_policy
+        self.user_agent = user_agent
+        self.stats = stats
+
+        # Most recently returned driver is handed out first so idle drivers
+        # beyond what the crawl actually needs are never touched
+        self._idle: "queue.LifoQueue[PooledDriver]" = queue.LifoQueue()
+        self._alive: List[PooledDriver] = []
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._block_policy_verified = False
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "DriverPool":
+        return cls(
+            size=crawler.settings.getint("DRIVER_POOL_SIZE", 1),
+            max_pages_per_driver=crawler.settings.getint(
+                "DRIVER_POOL_MAX_PAGES_PER_DRIVER", 50
+            ),
+            max_rss_mb=crawler.settings.getfloat("DRIVER_POOL_MAX_RSS_MB") or None,
+            page_timeout=crawler.settings.getfloat("DRIVER_POOL_PAGE_TIMEOUT") or None,
+            executable_path=crawler.settings.get("SELENIUM_DRIVER_EXECUTABLE_PATH"),
+            arguments=crawler.settings.getlist("SELENIUM_DRIVER_ARGUMENTS"),
+            block_policy=get_block_policy(crawler.settings.get("BLOCK_POLICY", "none")),
+            # Only a configured USER_AGENT (not scrapy's default) is shared with
+            # the browsers
+            user_agent=(
+                crawler.settings.get("USER_AGENT")
+                if (crawler.settings.getpriority("USER_AGENT") or 0)
+                > SETTINGS_PRIORITIES["default"]
+                else None
+            ),
+            stats=crawler.stats,
+        )
+
+    def _inc_stat(self, key: str, count: int = 1) -> None:
+        # Drivers are released from many threads at once
+        if self.stats is not None:
+            with self._stats_lock:
+                self.stats.inc_value(f"driver_pool/{key}", count)
+
+    def _start(self) -> PooledDriver:
+        driver = create_driver(
+            self.executable_path, self.arguments, self.block_policy, self.user_agent
+        )
+        if self.page_timeout is not None:
+            driver.set_page_load_timeout(self.page_timeout)
+
+        # Check once per pool that the browser actually enforces the block policy
+        if not self._block_policy_verified:
+            self._block_policy_verified = True
+            self._verify_block_policy(driver)
+
+        pooled = PooledDriver(driver)
+        self._inc_stat("started")
+        return pooled
+
+    def _verify_block_policy(self, driver: "WebDriver") -> None:
+        try:
+            enforced = self.block_policy.verify(driver)
+        except Exception as e:
+            log.warning(
+                f"Failed to verify block policy '{self.block_policy.name}' -- {e}"
+            )
+            return
+
+        if not enforced:
+            log.warning(
+                f"Block policy '{self.block_policy.name}' is not enforced, "
+                f"a blocked host loaded: '{self.block_policy.blocked_hosts[0]}'"
+            )
+            self._inc_stat("block_policy_not_enforced")
+
+    def _retire(self, pooled: PooledDriver, reason: str) -> None:
+        with self._lock:
+            if pooled in self._alive:
+                self._alive.remove(pooled)
+
+        if not pooled.killed:
+            try:
+                pooled.driver.quit()
+            except Exception as e:
+                log.warning(f"Failed to cleanly quit retired webdriver -- {e}")
+
+        # Reap anything quitting left behind (or that outlived a kill)
+        n_reaped = pooled.kill()
+        if n_reaped > 0:
+            self._inc_stat("reaped_processes", n_reaped)
+
+        self._inc_stat("retired")
+        self._inc_stat(f"retired/{reason}")
+
+    def _expire(self, pooled: PooledDriver) -> None:
+        # The watchdog can fire while its page is releasing the driver, drivers
+        # already returned to the pool are never killed
+        with self._lock:
+            if not pooled.checked_out:
+                return
+            pooled.killed = True
+
+        log.warning(
+            f"Webdriver exceeded page timeout of {self.page_timeout} seconds, "
+            f"killing its process tree"
+        )
+        pooled.kill()
+        self._inc_stat("killed")
+
+    def acquire(self) -> PooledDriver:
+        """
+        Check out a driver, starting a new one if the pool is not yet full
+        and blocking until one is returned otherwise.
+        """
+        while True:
+            if self._closed:
+                raise RuntimeError("Driver pool has been closed")
+
+            # Prefer an already warm driver
+            try:
+                return self._check_out(self._idle.get_nowait())
+            except queue.Empty:
+                pass
+
+            # Reserve a slot for a new driver under the lock but start it outside
+            with self._lock:
+                if len(self._alive) < self.size:
+                    placeholder = PooledDriver(None)  # type: ignore
+                    self._alive.append(placeholder)
+                    break
+
+            # Pool is full, wait for a driver to be returned
+            # Retired drivers free their slot without returning so we poll
+            try:
+                return self._check_out(self._idle.get(timeout=1))
+            except queue.Empty:
+                continue
+
+        try:
+            pooled = self._start()
+        except Exception:
+            with self._lock:
+                self._alive.remove(placeholder)
+            raise
+
+        with self._lock:
+            self._alive[self._alive.index(placeholder)] = pooled
+
+        return self._check_out(pooled)
+
+    def _check_out(self, pooled: PooledDriver) -> PooledDriver:
+        with self._lock:
+            pooled.checked_out = True
+
+        return pooled
+
+    def release(self, pooled: PooledDriver, healthy: bool = True) -> None:
+        """
+        Return a driver to the pool, resetting it for the next page or replacing it
+        if it is unhealthy or has served its page limit.
+        """
+        pooled.pages += 1
+
+        # From here on the watchdog leaves the driver alone
+        with self._lock:
+            pooled.checked_out = False
+
+        # Drivers that errored, were killed, or hit their limits are replaced
+        if self._closed:
+            self._retire(pooled, "closed")
+            return
+        if pooled.killed:
+            self._retire(pooled, "killed")
+            return
+        if not healthy:
+            self._retire(pooled, "unhealthy")
+            return
+        if pooled.pages >= self.max_pages_per_driver:
+            self._retire(pooled, "page_limit")
+            return
+        if self.max_rss_mb is not None and pooled.rss_mb() > self.max_rss_mb:
+            self._retire(pooled, "rss_limit")
+            return
+
+        # Reset state so the next page starts clean
+        # Storage and cookies are only reachable from the page's own origin
+        try:
+            pooled.driver.execute_script(_RESET_STORAGE_SCRIPT)
+            pooled.driver.delete_all_cookies()
+            pooled.driver.get("about:blank")
+        except Exception as e:
+            log.warning(f"Failed to reset pooled webdriver, replacing it -- {e}")
+            self._retire(pooled, "unhealthy")
+            return
+
+        self._idle.put(pooled)
+
+    @contextmanager
+    def driver(self) -> Iterator["WebDriver"]:
+        """
+        Check out a driver for the duration of the context.
+
+        The driver is returned to the pool on exit and replaced if the
+        context raised or the watchdog killed it.
+        """
+        pooled = self.acquire()
+
+        # Start the watchdog
+        watchdog = None
+        if self.page_timeout is not None:
+            watchdog = threading.Timer(self.page_timeout, self._expire, (pooled,))
+            watchdog.daemon = True
+            watchdog.start()
+
+        healthy = False
+        try:
+            yield pooled.driver
+            healthy = True
+        finally:
+            # Stop the watchdog before the driver can be handed to another page
+            if watchdog is not None:
+                watchdog.cancel()
+            self.release(pooled, healthy=healthy)
+
+    def resource_usage(self) -> Tuple[int, float, float]:
+        """
+        Sample the drivers alive in the pool.
+
+        Returns
+        -------
+        n_drivers: int
+            The number of drivers alive.
+        rss_mb: float
+            The resident memory of every driver's process tree in megabytes.
+        cpu_percent: float
+            The CPU use of every driver's process tree (in percent of one core)
+            since the last sample.
+        """
+        with self._lock:
+            alive = [pooled for pooled in self._alive if pooled.driver is not None]
+
+        rss_mb = 0.0
+        cpu_percent = 0.0
+        for pooled in alive:
+            rss_mb += pooled.rss_mb()
+            cpu_percent += pooled.cpu_percent()
+
+        return len(alive), rss_mb, cpu_percent
+
+    def close(self) -> None:
+        """Quit every driver in the pool and reap any processes left behind."""
+        self._closed = True
+        with self._lock:
+            alive = [pooled for pooled in self._alive if pooled.driver is not None]
+
+        for pooled in alive:
+            self._retire(pooled, "closed")
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from weakref import WeakKeyDictionary
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet.task import LoopingCall
+from twisted.internet.threads import deferToThread
+
+from .pipelines import page_stored
+
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.http import Request
+    from twisted.internet.defer import Deferred
+
+    from .items import AxeResultItem
+    from .spiders.access_eval_spider import AccessEvalSpider
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+# Where each stage of the crawl records the seconds a page spent in each phase
+PHASE_TIMINGS_KEY = "phase_timings"
+
+# The phases of a page in crawl order (others are reported after these)
+PAGE_PHASES = (
+    "queue_wait",
+    "driver_acquire",
+    "navigation",
+    "page_ready",
+    "audit_driver_acquire",
+    "audit_navigation",
+    "axe_inject",
+    "axe_run",
+    "serialize",
+    "write",
+)
+
+SUMMARY_QUANTILES = (0.5, 0.95)
+
+# Upper bounds (in seconds) of the Prometheus phase duration histogram buckets
+PROMETHEUS_PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+###############################################################################
+
+
+def phase_timings(meta: Dict[str, Any]) -> Dict[str, float]:
+    """Get (or create) the phase timings of a page from its request meta."""
+    return meta.setdefault(PHASE_TIMINGS_KEY, {})
+
+
+def _quantile(sorted_values: List[float], q: float) -> float:
+    # Nearest rank
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize_durations(durations: List[float]) -> Dict[str, float]:
+    """
+    Summarize the durations of a phase.
+
+    Examples
+    --------
+    >>> summarize_durations([1.0, 2.0, 3.0, 4.0])
+    {'count': 4, 'total': 10.0, 'mean': 2.5, 'p50': 2.0, 'p95': 4.0, 'max': 4.0}
+    """
+    sorted_values = sorted(durations)
+    summary: Dict[str, float] = {
+        "count": len(sorted_values),
+        "total": sum(sorted_values),
+    }
+    summary["mean"] = summary["total"] / len(sorted_values)
+    for q in SUMMARY_QUANTILES:
+        summary[f"p{round(q * 100)}"] = _quantile(sorted_values, q)
+    summary["max"] = sorted_values[-1]
+
+    return summary
+
+
+class PhaseHistogram:
+    """
+    Cumulative counts of phase durations per PROMETHEUS_PHASE_BUCKETS bucket,
+    updated as pages are stored so metrics never re-read every duration.
+
+    Examples
+    --------
+    >>> histogram = PhaseHistogram()
+    >>> for seconds in [0.2, 0.3, 4.0]:
+    ...     histogram.observe(seconds)
+    >>> histogram.buckets[PROMETHEUS_PHASE_BUCKETS.index(0.5)], histogram.count
+    (2, 3)
+    """
+
+    def __init__(self) -> None:
+        self.buckets = [0] * len(PROMETHEUS_PHASE_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        for i, upper_bound in enumerate(PROMETHEUS_PHASE_BUCKETS):
+            if seconds <= upper_bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.total += seconds
+
+
+def _ordered_phases(phases: Any) -> List[str]:
+    known = [phase for phase in PAGE_PHASES if phase in phases]
+    return known + sorted(phase for phase in phases if phase not in PAGE_PHASES)
+
+
+def _prometheus_labels(**labels: str) -> str:
+    escaped = [
+        '{}="{}"'.format(
+            key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for key, value in labels.items()
+    ]
+    return "{" + ",".join(escaped) + "}"
+
+
+class CrawlTelemetry:
+    """
+    Record where crawl time goes: the seconds every stored page spent in each
+    phase of the crawl (see PAGE_PHASES) and samples of the memory and CPU used
+    by the driver pool's browsers.
+
+    Page timings and resource samples are appended to a JSONL log as they happen
+    and a per site and per run summary of each phase is appended (and logged)
+    when the spider closes. The current state is also written in the Prometheus
+    text format (i.e. for the node_exporter textfile collector) on every sample,
+    with phase durations as histograms kept up to date as pages are stored.
+
+    Pages are recorded once their results are stored (see AxeResultsPipeline).
+
+    Parameters
+    ----------
+    log_path: Union[str, Path]
+        The JSONL file to append page timings, resource samples, and summaries to.
+    prometheus_path: Optional[Union[str, Path]]
+        The file to write Prometheus metrics to.
+        Default: None (do not write Prometheus metrics)
+    sample_interval: float
+        Seconds between browser resource samples.
+        Default: 5.0
+    """
+
+    def __init__(
+        self,
+        log_path: Union[str, Path],
+        prometheus_path: Optional[Union[str, Path]] = None,
+        sample_interval: float = 5.0,
+    ):
+        self.log_path = Path(log_path)
+        self.prometheus_path = (
+            Path(prometheus_path) if prometheus_path is not None else None
+        )
+        self.sample_interval = sample_interval
+
+        # Page timings and samples arrive from the reactor and the results writer
+        self._lock = threading.Lock()
+        self._log: Optional[IO[str]] = None
+        self._scheduled_at: "WeakKeyDictionary[Request, float]" = WeakKeyDictionary()
+        self._sampler: Optional[LoopingCall] = None
+        self.durations: Dict[str, Dict[str, List[float]]] = {}
+        self.histograms: Dict[str, Dict[str, PhaseHistogram]] = {}
+        self.resources: Dict[str, float] = {}
+        self.peak_resources: Dict[str, float] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "CrawlTelemetry":
+        if not crawler.settings.getbool("TELEMETRY_ENABLED", False):
+            raise NotConfigured()
+
+        # Crawler processes of a batch share their working directory
+        pid = os.getpid()
+        prometheus_file = crawler.settings.get("TELEMETRY_PROMETHEUS_FILE")
+        ext = cls(
+            log_path=crawler.settings.get(
+                "TELEMETRY_LOG_FILE", "access-eval-telemetry-{pid}.jsonl"
+            ).format(pid=pid),
+            prometheus_path=(
+                prometheus_file.format(pid=pid) if prometheus_file else None
+            ),
+            sample_interval=crawler.settings.getfloat("TELEMETRY_SAMPLE_INTERVAL", 5.0),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(
+            ext.request_reached_downloader, signal=signals.request_reached_downloader
+        )
+        crawler.signals.connect(ext.page_stored, signal=page_stored)
+        return ext
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        # Must hold the lock
+        if self._log is not None:
+            self._log.write(json.dumps({"time": time.time(), **event}) + "\n")
+
+    def spider_opened(self, spider: "AccessEvalSpider") -> None:
+        # Line buffered so the log can be followed during the crawl
+        self._log = open(self.log_path, "a", buffering=1)
+        self._sampler = LoopingCall(self._sample, spider)
+        self._sampler.start(self.sample_interval, now=True)
+
+    def request_scheduled(self, request: "Request", spider: "AccessEvalSpider") -> None:
+        self._scheduled_at[request] = time.monotonic()
+
+    def request_reached_downloader(
+        self, request: "Request", spider: "AccessEvalSpider"
+    ) -> None:
+        # Requests restored from a JOBDIR queue were scheduled by another run
+        scheduled_at = self._scheduled_at.pop(request, None)
+        if scheduled_at is not None:
+            phase_timings(request.meta)["queue_wait"] = time.monotonic() - scheduled_at
+
+    def page_stored(self, item: "AxeResultItem", spider: "AccessEvalSpider") -> None:
+        with self._lock:
+            site_durations = self.durations.setdefault(item.site, {})
+            site_histograms = self.histograms.setdefault(item.site, {})
+            for phase, seconds in item.timings.items():
+                site_durations.setdefault(phase, []).append(seconds)
+                site_histograms.setdefault(phase, PhaseHistogram()).observe(seconds)
+
+            self._write(
+                {
+                    "event": "page",
+                    "url": item.url,
+                    "site": item.site,
+                    "depth": item.depth,
+                    "timings": item.timings,
+                }
+            )
+
+    def _sample(self, spider: "AccessEvalSpider") -> "Deferred":
+        # Walking the browsers' process trees runs off the reactor thread
+        d = deferToThread(spider.driver_pool.resource_usage)
+        d.addCallback(self._record_sample)
+        d.addErrback(
+            lambda failure: log.warning(
+                f"Failed to sample browser resources -- {failure.value}"
+            )
+        )
+        return d
+
+    def _record_sample(self, usage: Tuple[int, float, float]) -> None:
+        n_drivers, rss_mb, cpu_percent = usage
+        with self._lock:
+            self.resources = {
+                "drivers": n_drivers,
+                "rss_mb": rss_mb,
+                "cpu_percent": cpu_percent,
+            }
+            for key, value in self.resources.items():
+                self.peak_resources[key] = max(self.peak_resources.get(key, 0), value)
+
+            self._write({"event": "resources", **self.resources})
+            metrics = self._prometheus_metrics()
+
+        self._write_prometheus(metrics)
+
+    def summarize(
+        self,
+    ) -> Tuple[Dict[str, Dict[str, Dict[str, float]]], Dict[str, Dict[str, float]]]:
+        """
+        Summarize the phase durations of every page per site and for the whole run.
+
+        Returns
+        -------
+        site_summaries: Dict[str, Dict[str, Dict[str, float]]]
+            The summary (see `summarize_durations`) of each phase of each site.
+        run_summary: Dict[str, Dict[str, float]]
+            The summary of each phase of every page of the run.
+        """
+        run_durations: Dict[str, List[float]] = {}
+        site_summaries = {}
+        for site, site_durations in sorted(self.durations.items()):
+            site_summaries[site] = {
+                phase: summarize_durations(site_durations[phase])
+                for phase in _ordered_phases(site_durations)
+            }
+            for phase, durations in site_durations.items():
+                run_durations.setdefault(phase, []).extend(durations)
+
+        run_summary = {
+            phase: summarize_durations(run_durations[phase])
+            for phase in _ordered_phases(run_durations)
+        }
+        return site_summaries, run_summary
+
+    def _prometheus_metrics(self) -> List[str]:
+        # Must hold the lock
+        lines = [
+            "# HELP access_eval_page_phase_seconds "
+            "Seconds stored pages spent in each phase of the crawl.",
+            "# TYPE access_eval_page_phase_seconds histogram",
+        ]
+        for site, site_histograms in sorted(self.histograms.items()):
+            for phase in _ordered_phases(site_histograms):
+                histogram = site_histograms[phase]
+                for upper_bound, count in zip(
+                    PROMETHEUS_PHASE_BUCKETS, histogram.buckets
+                ):
+                    labels = _prometheus_labels(
+                        site=site, phase=phase, le=str(upper_bound)
+                    )
+                    lines.append(
+                        f"access_eval_page_phase_seconds_bucket{labels} {count}"
+                    )
+                labels = _prometheus_labels(site=site, phase=phase, le="+Inf")
+                lines.append(
+                    f"access_eval_page_phase_seconds_bucket{labels} {histogram.count}"
+                )
+                labels = _prometheus_labels(site=site, phase=phase)
+                lines.append(
+                    f"access_eval_page_phase_seconds_sum{labels} {histogram.total}"
+                )
+                lines.append(
+                    f"access_eval_page_phase_seconds_count{labels} {histogram.count}"
+                )
+
+        if len(self.resources) > 0:
+            lines += [
+                "# HELP access_eval_browser_drivers Browsers alive in the driver pool.",
+                "# TYPE access_eval_browser_drivers gauge",
+                f"access_eval_browser_drivers {self.resources['drivers']}",
+                "# HELP access_eval_browser_rss_bytes "
+                "Resident memory of the driver pool's browser process trees.",
+                "# TYPE access_eval_browser_rss_bytes gauge",
+                f"access_eval_browser_rss_bytes {self.resources['rss_mb'] * 1e6:.0f}",
+                "# HELP access_eval_browser_cpu_percent "
+                "CPU use of the driver pool's browser process trees "
+                "(percent of one core).",
+                "# TYPE access_eval_browser_cpu_percent gauge",
+                f"access_eval_browser_cpu_percent {self.resources['cpu_percent']}",
+            ]
+
+        return lines
+
+    def _write_prometheus(self, metrics: List[str]) -> None:
+        if self.prometheus_path is None:
+            return
+
+        # Replace atomically so collectors never read a partial file
+        tmp_path = self.prometheus_path.with_name(f"{self.prometheus_path.name}.tmp")
+        with open(tmp_path, "w") as open_f:
+            open_f.write("\n".join(metrics) + "\n")
+        os.replace(tmp_path, self.prometheus_path)
+
+    def spider_closed(self, spider: "AccessEvalSpider") -> None:
+        if self._sampler is not None and self._sampler.running:
+            self._sampler.stop()
+
+        with self._lock:
+            site_summaries, run_summary = self.summarize()
+            for site, site_summary in site_summaries.items():
+                self._write(
+                    {"event": "site_summary", "site": site, "phases": site_summary}
+                )
+            self._write(
+                {
+                    "event": "run_summary",
+                    "phases": run_summary,
+                    "peak_resources": self.peak_resources,
+                }
+            )
+            metrics = self._prometheus_metrics()
+
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+        self._write_prometheus(metrics)
+
+        # Report where the run's time went
+        for phase, summary in run_summary.items():
+            log.info(
+                f"Phase '{phase}': {summary['count']} pages, "
+                f"{summary['total']:.1f}s total, {summary['mean']:.3f}s mean, "
+                f"{summary['p95']:.3f}s p95, {summary['max']:.3f}s max"
+            )
+        if len(self.peak_resources) > 0:
+            log.info(
+                f"Peak browser resources: {self.peak_resources['drivers']:.0f} "
+                f"drivers, {self.peak_resources['rss_mb']:.0f} MB RSS, "
+                f"{self.peak_resources['cpu_percent']:.0f}% CPU"
+            )
+        log.info(f"Stored crawl telemetry to: '{self.log_path}'")
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import math
+import time
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from w3lib.url import safe_url_string
+
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.statscollectors import StatsCollector
+
+###############################################################################
+
+TRACKING_QUERY_PARAM_PREFIXES = ("utm_", "mc_", "_hs")
+TRACKING_QUERY_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "_ga",
+    "_gl",
+    "ref",
+}
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+FRONTIER_JOURNAL_FILENAME = "access-eval-frontier.jsonl"
+
+###############################################################################
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Reduce a URL to the canonical form used to decide whether a page was seen.
+
+    The host is lowercased, default ports, fragments, tracking query parameters,
+    and trailing slashes are dropped, and the remaining query parameters are sorted.
+
+    Parameters
+    ----------
+    url: str
+        The URL to canonicalize.
+
+    Returns
+    -------
+    canonical: str
+        The canonical URL.
+
+    Examples
+    --------
+    >>> canonicalize_url("https://Example.com/about/?utm_source=x#team")
+    'https://example.com/about'
+    """
+    parts = urlsplit(safe_url_string(url.strip()))
+    scheme = parts.scheme.lower()
+
+    # Lowercase host and drop default port
+    netloc = (parts.hostname or "").lower()
+    if parts.port is not None and DEFAULT_PORTS.get(scheme) != parts.port:
+        netloc = f"{netloc}:{parts.port}"
+
+    # Trailing slash variants are the same page
+    path = parts.path.rstrip("/") or "/"
+
+    # Drop tracking params and sort the rest
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in TRACKING_QUERY_PARAMS
+            and not key.lower().startswith(TRACKING_QUERY_PARAM_PREFIXES)
+        )
+    )
+
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def _digest(url: str) -> bytes:
+    return hashlib.blake2b(url.encode("utf-8"), digest_size=16).digest()
+
+
+class SeenSet:
+    """
+    A set of seen URLs storing a compact 8 byte (blake2b) digest per URL.
+
+    Not exact: two distinct URLs whose digests collide are treated as the same
+    URL (skipping the second page). For n URLs this happens with probability
+    around n^2 / 2^65, roughly one in 36 million for a million URLs.
+    """
+
+    def __init__(self) -> None:
+        self._seen: Set[bytes] = set()
+
+    def add(self, url: str) -> bool:
+        """Add the URL, returning True if it was not already seen."""
+        digest = _digest(url)[:8]
+        if digest in self._seen:
+            return False
+
+        self._seen.add(digest)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return _digest(url)[:8] in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+class BloomFilter:
+    """
+    A fixed memory probabilistic set of seen URLs for very large crawls.
+
+    Never reports a seen URL as unseen. Reports an unseen URL as seen
+    (skipping the page) with probability `error_rate` once `capacity`
+    URLs have been added.
+
+    Parameters
+    ----------
+    capacity: int
+        The expected number of URLs to add.
+        Default: 1,000,000
+    error_rate: float
+        The acceptable false positive rate at capacity.
+        Default: 0.0001
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.0001):
+        self.n_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.n_hashes = max(1, round(self.n_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.n_bits + 7) // 8)
+        self._count = 0
+
+    def _positions(self, url: str) -> List[int]:
+        # Double hashing from a single digest
+        digest = _digest(url)
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.n_bits for i in range(self.n_hashes)]
+
+    def add(self, url: str) -> bool:
+        """Add the URL, returning True if it was (probably) not already seen."""
+        new = False
+        for position in self._positions(url):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                self._bits[byte] |= 1 << bit
+                new = True
+
+        if new:
+            self._count += 1
+        return new
+
+    def __contains__(self, url: str) -> bool:
+        return all(
+            self._bits[position // 8] & (1 << (position % 8))
+            for position in self._positions(url)
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class Frontier:
+    """
+    Tracks every canonical URL the spider has scheduled so duplicate pages
+    (i.e. `/about`, `/about/`, `/about#team`, and `/about?utm_source=x`) are
+    never rendered more than once.
+
+    Canonical URLs are only used as keys, pages are always requested at the URL
+    they were discovered at (which is not guaranteed to serve the same resource
+    as its canonical form).
+
+    Optionally journals every scheduled and completed URL to disk so an
+    interrupted crawl can resume exactly where it stopped (see `open_journal`).
+
+    Parameters
+    ----------
+    seen: Optional[Union[SeenSet, BloomFilter]]
+        The seen set implementation to use.
+        Default: None (a SeenSet of URL digests, see SeenSet for its collision
+        probability)
+    stats: Optional[StatsCollector]
+        A scrapy stats collector to record per site deduplication counts to.
+        Default: None (do not record stats)
+    """
+
+    def __init__(
+        self,
+        seen: Optional[Union[SeenSet, BloomFilter]] = None,
+        stats: Optional["StatsCollector"] = None,
+    ):
+        self.seen = seen if seen is not None else SeenSet()
+        self.stats = stats
+        self.deduplicated: Dict[str, int] = {}
+        self.completed = SeenSet()
+        self.claimed = SeenSet()
+        self.replayed: Dict[str, Dict[str, Any]] = {}
+        self._journal: Optional[IO[str]] = None
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "Frontier":
+        seen_set = crawler.settings.get("FRONTIER_SEEN_SET", "set")
+        seen: Union[SeenSet, BloomFilter]
+        if seen_set == "set":
+            seen = SeenSet()
+        elif seen_set == "bloom":
+            seen = BloomFilter(
+                capacity=crawler.settings.getint("FRONTIER_BLOOM_CAPACITY", 1_000_000),
+                error_rate=crawler.settings.getfloat(
+                    "FRONTIER_BLOOM_ERROR_RATE", 0.0001
+                ),
+            )
+        else:
+            raise ValueError(
+                f"Unknown FRONTIER_SEEN_SET: '{seen_set}'. Expected 'set' or 'bloom'."
+            )
+
+        return cls(seen=seen, stats=crawler.stats)
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        if self._journal is not None:
+            self._journal.write(
+                json.dumps({**event, "time": round(time.time(), 3)}) + "\n"
+            )
+
+    def open_journal(self, state_dir: Union[str, Path]) -> List[Dict[str, Any]]:
+        """
+        Replay (and then continue appending to) the frontier journal stored in the
+        state directory.
+
+        Parameters
+        ----------
+        state_dir: Union[str, Path]
+            The directory to store the journal in (i.e. the scrapy JOBDIR).
+
+        Returns
+        -------
+        pending: List[Dict[str, Any]]
+            Every URL scheduled by a previous run which never completed
+            (the canonical "url", the "request_url" it was discovered at, and its
+            "site" and "depth"), in the order they were scheduled.
+
+        Notes
+        -----
+        The pages and wall time each site spent in previous runs are stored in
+        `replayed` (the "pages" completed without a refund and the
+        "elapsed_seconds" between the site's first and last event of each run)
+        so its crawl budget can be restored before anything is scheduled.
+        """
+        state_dir = Path(state_dir)
+        state_dir.mkdir(parents=True, exist_ok=True)
+        journal_path = state_dir / FRONTIER_JOURNAL_FILENAME
+
+        # Replay
+        scheduled: Dict[str, Dict[str, Any]] = {}
+        url_sites: Dict[str, str] = {}
+        spans: Dict[Tuple[int, str], Tuple[float, float]] = {}
+        run = 0
+        needs_newline = False
+        if journal_path.exists():
+            with open(journal_path, "r") as open_f:
+                for line in open_f:
+                    needs_newline = not line.endswith("\n")
+                    try:
+                        event = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written line from a crash
+                        continue
+
+                    event_time = event.pop("time", None)
+                    site: Optional[str] = None
+                    if event["event"] == "opened":
+                        run += 1
+                        continue
+
+                    if event["event"] == "scheduled":
+                        self.seen.add(event["url"])
+                        scheduled[event["url"]] = event
+                        site = event["site"]
+                        # Aliases (redirect targets) never cost their site a page
+                        if not event.get("alias", False):
+                            url_sites[event["url"]] = site
+                    elif event["event"] == "completed":
+                        scheduled.pop(event["url"], None)
+                        site = url_sites.pop(event["url"], None)
+                        if (
+                            self.completed.add(event["url"])
+                            and site is not None
+                            and not event.get("refunded", False)
+                        ):
+                            self._replayed_site(site)["pages"] += 1
+
+                    # Journals written before events were timed have no spans
+                    if site is not None and event_time is not None:
+                        first, _ = spans.get((run, site), (event_time, event_time))
+                        spans[(run, site)] = (first, event_time)
+
+        for (_, site), (first, last) in spans.items():
+            self._replayed_site(site)["elapsed_seconds"] += last - first
+
+        # Line buffered so every event reaches disk as soon as it happens
+        self._journal = open(journal_path, "a", buffering=1)
+        if needs_newline:
+            self._journal.write("\n")
+        self._write({"event": "opened"})
+
+        return list(scheduled.values())
+
+    def _replayed_site(self, site: str) -> Dict[str, Any]:
+        if site not in self.replayed:
+            self.replayed[site] = {"pages": 0, "elapsed_seconds": 0.0}
+
+        return self.replayed[site]
+
+    def close(self) -> None:
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def add(
+        self, url: str, site: str, depth: int = 0, alias: bool = False
+    ) -> Optional[str]:
+        """
+        Add the URL to the frontier.
+
+        Parameters
+        ----------
+        url: str
+            The URL to add.
+        site: str
+            The site the URL belongs to (for deduplication reporting).
+        depth: int
+            The crawl depth the URL will be requested at.
+            Default: 0
+        alias: bool
+            The URL is another address of an already scheduled page (i.e. the
+            page it redirected to) so it is not a page of its own when replayed.
+            Default: False
+
+        Returns
+        -------
+        canonical: Optional[str]
+            The canonical URL (the key to claim and complete the page with) or None
+            if it was already seen.
+        """
+        canonical = canonicalize_url(url)
+        if self.seen.add(canonical):
+            event: Dict[str, Any] = {
+                "event": "scheduled",
+                "url": canonical,
+                "request_url": url,
+                "site": site,
+                "depth": depth,
+            }
+            if alias:
+                event["alias"] = True
+            self._write(event)
+            return canonical
+
+        self.deduplicated[site] = self.deduplicated.get(site, 0) + 1
+        if self.stats is not None:
+            self.stats.inc_value("frontier/deduplicated")
+            self.stats.inc_value(f"frontier/deduplicated/{site}")
+
+        return None
+
+    def claim(self, url: str) -> bool:
+        """
+        Claim a (canonical) URL for rendering, returning False if it was already
+        claimed in this run or completed in a previous run.
+        """
+        if url in self.completed:
+            return False
+
+        return self.claimed.add(url)
+
+    def complete(self, url: str, refunded: bool = False) -> None:
+        """
+        Record that the (canonical) URL was fully processed, or that it was never
+        audited and the page charged for it was refunded.
+        """
+        if self.completed.add(url):
+            event: Dict[str, Any] = {"event": "completed", "url": url}
+            if refunded:
+                event["refunded"] = True
+            self._write(event)
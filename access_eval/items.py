@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+###############################################################################
+
+
+@dataclass
+class AxeResultItem:
+    """
+    The aXe audit of a single page, yielded by the spider for the item pipelines.
+
+    Parameters
+    ----------
+    url: str
+        The URL the page was requested at.
+    site: str
+        The site the page belongs to.
+    depth: int
+        The number of links followed from the site's start page to the page.
+    download_seconds: Optional[float]
+        The seconds spent downloading and rendering the page.
+    page_ready_seconds: Optional[float]
+        The seconds waited for the rendered page to settle.
+    audit_seconds: Optional[float]
+        The seconds spent running aXe on the page.
+    violations: List[Dict[str, Any]]
+        The aXe violations found on the page.
+    n_passes: int
+        The number of rules the page passed.
+    n_incomplete: int
+        The number of rules aXe could not decide for the page.
+    results: Dict[str, Any]
+        The full aXe results of the page (as stored by the results backend).
+    timings: Dict[str, float]
+        The seconds the page spent in each phase of the crawl
+        (see access_eval.extensions.PAGE_PHASES).
+    frontier_urls: List[str]
+        The frontier keys (canonical URLs) the spider completes once the page's
+        results are stored (see access_eval.pipelines.page_stored).
+    """
+
+    url: str
+    site: str
+    depth: int
+    download_seconds: Optional[float]
+    page_ready_seconds: Optional[float]
+    audit_seconds: Optional[float]
+    violations: List[Dict[str, Any]]
+    n_passes: int
+    n_incomplete: int
+    results: Dict[str, Any] = field(repr=False)
+    timings: Dict[str, float] = field(default_factory=dict)
+    frontier_urls: List[str] = field(default_factory=list)
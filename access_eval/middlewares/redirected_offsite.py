@@ -1,23 +1,150 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from typing import TYPE_CHECKING
+import re
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Pattern, Set
+from urllib.parse import urlparse
+from weakref import WeakKeyDictionary
 
 from scrapy.exceptions import IgnoreRequest
-from scrapy.spidermiddlewares.offsite import (
-    OffsiteMiddleware as OffsiteSpiderMiddleware,
-)
+from scrapy.utils.httpobj import urlparse_cached
 
 if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.http import Request
     from scrapy.spiders import Spider
-    from scrapy_selenium import SeleniumRequest
+    from scrapy.statscollectors import StatsCollector
 
 ###############################################################################
 
 
-class OffsiteDownloaderMiddleware(OffsiteSpiderMiddleware):
-    def process_request(self, request: "SeleniumRequest", spider: "Spider") -> None:
-        result = list(self.process_spider_output(None, [request], spider))
-        if not result:
-            raise IgnoreRequest()
-        return None
+class OffsiteRedirect(IgnoreRequest):
+    """A page which the browser was redirected off of the allowed domains to."""
+
+
+class HostMatcher:
+    """
+    A precompiled matcher for the hosts a crawl is allowed to visit.
+
+    Parameters
+    ----------
+    allowed_domains: Iterable[str]
+        The domains (and their subdomains) to allow.
+    allow_www_variants: bool
+        Also allow the "www." prefixed (or unprefixed) variant of each domain.
+        Default: True
+    """
+
+    def __init__(self, allowed_domains: Iterable[str], allow_www_variants: bool = True):
+        domains: Set[str] = set()
+        for domain in allowed_domains:
+            domain = domain.lower().strip(".")
+            if len(domain) == 0:
+                continue
+
+            domains.add(domain)
+            if allow_www_variants:
+                if domain.startswith("www."):
+                    domains.add(domain[4:])
+                else:
+                    domains.add(f"www.{domain}")
+
+        self.domains = frozenset(domains)
+        self._regex: Optional[Pattern] = None
+        if len(domains) > 0:
+            self._regex = re.compile(
+                r"^(.*\.)?({})$".format("|".join(re.escape(d) for d in domains))
+            )
+
+    def matches_host(self, host: Optional[str]) -> bool:
+        # Crawls without allowed domains are unrestricted
+        if self._regex is None:
+            return True
+        if not host:
+            return False
+
+        return self._regex.match(host.lower()) is not None
+
+    def matches(self, url: str) -> bool:
+        return self.matches_host(urlparse(url).hostname)
+
+
+_host_matchers: "WeakKeyDictionary[Spider, Dict[Optional[str], HostMatcher]]" = (
+    WeakKeyDictionary()
+)
+
+
+def get_host_matcher(
+    spider: "Spider", allow_www_variants: bool = True, site: Optional[str] = None
+) -> HostMatcher:
+    """
+    Get the host matcher for the spider's allowed domains (or for a single site
+    of them), built once per spider and site.
+
+    Every offsite check (pre-flights, sitemap pages, extracted links, and
+    rendered URLs) should use these matchers so they all agree on which hosts
+    (i.e. "www." variants) belong to a site.
+    """
+    spider_matchers = _host_matchers.setdefault(spider, {})
+    if site not in spider_matchers:
+        domains = (
+            [site]
+            if site is not None
+            else getattr(spider, "allowed_domains", None) or []
+        )
+        spider_matchers[site] = HostMatcher(
+            domains, allow_www_variants=allow_www_variants
+        )
+
+    return spider_matchers[site]
+
+
+class OffsiteDownloaderMiddleware:
+    """
+    Drop requests (including redirects) to hosts outside of the spider's
+    allowed domains before they are downloaded.
+
+    Requests are checked against a host matcher compiled once per spider
+    (see `get_host_matcher`). Pages the browser is redirected off site from are
+    additionally dropped by `AxeSeleniumMiddleware` after rendering
+    (see OFFSITE_CHECK_RENDERED_URL).
+
+    Parameters
+    ----------
+    allow_www_variants: bool
+        Also allow the "www." prefixed (or unprefixed) variant of each
+        allowed domain.
+        Default: True
+    stats: Optional[StatsCollector]
+        A scrapy stats collector to record filtered requests to.
+        Default: None (do not record stats)
+    """
+
+    def __init__(
+        self,
+        allow_www_variants: bool = True,
+        stats: Optional["StatsCollector"] = None,
+    ):
+        self.allow_www_variants = allow_www_variants
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "OffsiteDownloaderMiddleware":
+        return cls(
+            allow_www_variants=crawler.settings.getbool(
+                "OFFSITE_ALLOW_WWW_VARIANTS", True
+            ),
+            stats=crawler.stats,
+        )
+
+    def process_request(self, request: "Request", spider: "Spider") -> None:
+        if request.dont_filter:
+            return None
+
+        host = urlparse_cached(request).hostname
+        if get_host_matcher(spider, self.allow_www_variants).matches_host(host):
+            return None
+
+        if self.stats is not None:
+            self.stats.inc_value("offsite/filtered")
+        raise IgnoreRequest(f"Filtered offsite request to: {host}")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from typing import TYPE_CHECKING, Optional
+
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import HtmlResponse
+from scrapy_selenium import SeleniumRequest
+from selenium.webdriver.support.ui import WebDriverWait
+from twisted.internet.threads import deferToThread
+
+from ..audit import audit_page
+from ..extensions import phase_timings
+from ..frontier import canonicalize_url
+from ..readiness import wait_for_page_ready
+from .redirected_offsite import OffsiteRedirect, get_host_matcher
+
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.statscollectors import StatsCollector
+    from selenium.webdriver.remote.webdriver import WebDriver
+    from twisted.internet.defer import Deferred
+    from twisted.python.failure import Failure
+
+    from ..spiders.access_eval_spider import AccessEvalSpider
+
+###############################################################################
+
+
+def _canonical_url(request: SeleniumRequest) -> str:
+    # The frontier key the spider scheduled the page under
+    return request.meta.get("canonical_url") or canonicalize_url(request.url)
+
+
+class AxeSeleniumMiddleware:
+    """
+    Drop-in replacement for `scrapy_selenium.SeleniumMiddleware` which renders
+    each `SeleniumRequest` on a driver checked out from the spider's driver pool.
+
+    When `AXE_SINGLE_RENDER` is enabled, aXe is also injected and run on that same
+    driver while it still holds the rendered DOM. This avoids loading every page
+    a second time just to audit it. Otherwise the rendering driver is released and
+    the page is loaded again and audited on a second pooled driver. Either way the
+    results are attached to the request meta under the "axe_results" key.
+
+    Rendering happens on a reactor thread so up to `DRIVER_POOL_SIZE` pages are
+    rendered in parallel, each on its own browser. A driver is held by a single
+    request from navigation until its response (and aXe results) are built so no
+    callback ever sees another page's DOM.
+
+    When `OFFSITE_CHECK_RENDERED_URL` is enabled, pages whose rendered URL
+    (i.e. after HTTP, meta refresh, and JavaScript redirects) is outside of the
+    site they were found on are dropped before aXe runs.
+    """
+
+    def __init__(
+        self,
+        single_render: bool = True,
+        page_ready_max_wait: float = 5.0,
+        page_ready_quiet_period: float = 0.5,
+        check_rendered_url: bool = True,
+        allow_www_variants: bool = True,
+        stats: Optional["StatsCollector"] = None,
+    ):
+        self.single_render = single_render
+        self.page_ready_max_wait = page_ready_max_wait
+        self.page_ready_quiet_period = page_ready_quiet_period
+        self.check_rendered_url = check_rendered_url
+        self.allow_www_variants = allow_www_variants
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "AxeSeleniumMiddleware":
+        if not crawler.settings.get("SELENIUM_DRIVER_EXECUTABLE_PATH"):
+            raise NotConfigured("SELENIUM_DRIVER_EXECUTABLE_PATH must be set")
+
+        return cls(
+            single_render=crawler.settings.getbool("AXE_SINGLE_RENDER", True),
+            page_ready_max_wait=crawler.settings.getfloat("PAGE_READY_MAX_WAIT", 5.0),
+            page_ready_quiet_period=crawler.settings.getfloat(
+                "PAGE_READY_QUIET_PERIOD", 0.5
+            ),
+            check_rendered_url=crawler.settings.getbool(
+                "OFFSITE_CHECK_RENDERED_URL", True
+            ),
+            allow_www_variants=crawler.settings.getbool(
+                "OFFSITE_ALLOW_WWW_VARIANTS", True
+            ),
+            stats=crawler.stats,
+        )
+
+    def _render(self, driver: "WebDriver", request: SeleniumRequest) -> HtmlResponse:
+        start = time.perf_counter()
+        driver.get(request.url)
+        phase_timings(request.meta)["navigation"] = time.perf_counter() - start
+
+        for cookie_name, cookie_value in request.cookies.items():
+            driver.add_cookie({"name": cookie_name, "value": cookie_value})
+
+        if request.wait_until:
+            WebDriverWait(driver, request.wait_time).until(request.wait_until)
+
+        # Wait only as long as the page needs to settle
+        # A request's own wait time overrides the configured ceiling
+        max_wait = request.wait_time or self.page_ready_max_wait
+        request.meta["page_ready_seconds"] = wait_for_page_ready(
+            driver,
+            max_wait=max_wait,
+            quiet_period=self.page_ready_quiet_period,
+        )
+        request.meta["page_ready_timed_out"] = (
+            request.meta["page_ready_seconds"] >= max_wait
+        )
+        phase_timings(request.meta)["page_ready"] = request.meta["page_ready_seconds"]
+
+        if request.screenshot:
+            request.meta["screenshot"] = driver.get_screenshot_as_png()
+
+        if request.script:
+            driver.execute_script(request.script)
+
+        return HtmlResponse(
+            driver.current_url,
+            body=str.encode(driver.page_source),
+            encoding="utf-8",
+            request=request,
+        )
+
+    def _process(
+        self, request: SeleniumRequest, spider: "AccessEvalSpider"
+    ) -> HtmlResponse:
+        # Includes starting a new browser when no warm driver is idle
+        start = time.perf_counter()
+        with spider.driver_pool.driver() as driver:
+            phase_timings(request.meta)["driver_acquire"] = time.perf_counter() - start
+            response = self._render(driver, request)
+
+            # Pages the browser was redirected off site from are only dropped
+            # once the (healthy) driver is back in the pool
+            offsite = self.check_rendered_url and not get_host_matcher(
+                spider, self.allow_www_variants, site=request.meta["site"]
+            ).matches(response.url)
+
+            if not offsite:
+                request.meta[
+                    "blocked_resources_estimate"
+                ] = spider.driver_pool.block_policy.estimate_blocked(driver)
+
+                # Audit while the driver still holds the rendered page
+                if self.single_render and not request.meta.get("skip_audit", False):
+                    start = time.perf_counter()
+                    request.meta["axe_results"] = audit_page(
+                        driver,
+                        site=request.meta["site"],
+                        cache=spider.audit_cache,
+                        axe_script=spider.axe_script,
+                        options=spider.axe_options,
+                        timings=phase_timings(request.meta),
+                    )
+                    request.meta["audit_seconds"] = time.perf_counter() - start
+
+        if offsite:
+            raise OffsiteRedirect(
+                f"Redirected offsite: {request.url} -> {response.url}"
+            )
+
+        if not self.single_render and not request.meta.get("skip_audit", False):
+            self._audit_on_fresh_driver(request, spider)
+
+        return response
+
+    def _audit_on_fresh_driver(
+        self, request: SeleniumRequest, spider: "AccessEvalSpider"
+    ) -> None:
+        # Load the page again on another pooled driver (still off the reactor
+        # thread) so the audit never sees state left by rendering
+        timings = phase_timings(request.meta)
+        start = time.perf_counter()
+        with spider.driver_pool.driver() as driver:
+            timings["audit_driver_acquire"] = time.perf_counter() - start
+            start = time.perf_counter()
+            driver.get(request.url)
+            timings["audit_navigation"] = time.perf_counter() - start
+            start = time.perf_counter()
+            request.meta["axe_results"] = audit_page(
+                driver,
+                site=request.meta["site"],
+                cache=spider.audit_cache,
+                axe_script=spider.axe_script,
+                options=spider.axe_options,
+                timings=timings,
+            )
+            request.meta["audit_seconds"] = time.perf_counter() - start
+
+    def process_request(
+        self, request: SeleniumRequest, spider: "AccessEvalSpider"
+    ) -> Optional["Deferred"]:
+        # Let the normal downloader handle plain requests
+        if not isinstance(request, SeleniumRequest):
+            return None
+
+        # Pages scheduled before a site ran out of time are dropped
+        if spider.budget.out_of_time(request.meta["site"]):
+            raise IgnoreRequest(f"Crawl budget exhausted: {request.url}")
+
+        # Never render a page twice in one run or a page a previous run of this
+        # job already completed (i.e. one also restored from the JOBDIR queue)
+        if not spider.frontier.claim(_canonical_url(request)):
+            raise IgnoreRequest(f"Already rendered: {request.url}")
+
+        # Blocking webdriver calls run off the reactor thread
+        d = deferToThread(self._process, request, spider)
+        d.addCallback(self._record_stats)
+        d.addErrback(self._record_offsite_redirect, request, spider)
+        return d
+
+    def _record_offsite_redirect(
+        self,
+        failure: "Failure",
+        request: SeleniumRequest,
+        spider: "AccessEvalSpider",
+    ) -> "Failure":
+        # The page will never be audited so it is done (and not charged to the
+        # site's budget)
+        if failure.check(OffsiteRedirect):
+            spider.frontier.complete(_canonical_url(request))
+            spider.budget.refund(request.meta["site"])
+            if self.stats is not None:
+                self.stats.inc_value("offsite/rendered_redirects")
+
+        return failure
+
+    def _record_stats(self, response: HtmlResponse) -> HtmlResponse:
+        # Stats are only touched back on the reactor thread
+        if self.stats is not None:
+            self.stats.inc_value(
+                "page_ready/seconds_total",
+                response.meta["page_ready_seconds"],
+            )
+            self.stats.max_value(
+                "page_ready/seconds_max",
+                response.meta["page_ready_seconds"],
+            )
+            if response.meta["page_ready_timed_out"]:
+                self.stats.inc_value("page_ready/timed_out")
+            self.stats.inc_value(
+                "block_policy/blocked_resources_estimate",
+                response.meta["blocked_resources_estimate"],
+            )
+            self.stats.max_value(
+                "block_policy/blocked_resources_estimate_max_per_page",
+                response.meta["blocked_resources_estimate"],
+            )
+
+        return response
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple
+
+from scrapy import signals
+from twisted.internet.defer import DeferredList
+from twisted.internet.threads import deferToThread
+
+from .analysis.parse_axe_results import (
+    AxeViolationAggregator,
+    write_page_violations_summary,
+)
+from .items import AxeResultItem
+from .storage import (
+    axe_results_filename,
+    encode_axe_results,
+    remove_other_axe_results,
+)
+from .utils import clean_url
+
+if TYPE_CHECKING:
+    from scrapy.crawler import Crawler
+    from scrapy.signalmanager import SignalManager
+    from scrapy.statscollectors import StatsCollector
+    from twisted.internet.defer import Deferred
+
+    from .spiders.access_eval_spider import AccessEvalSpider
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+# Queued to tell the writer thread to flush and exit
+_STOP = object()
+
+# Sent (on the reactor thread) with every AxeResultItem once it is stored
+page_stored = object()
+
+###############################################################################
+
+
+class AxeResultsPipeline:
+    """
+    Store the results of every audited page (`AxeResultItem`) with the spider's
+    results backend (see AXE_RESULTS_BACKEND and AXE_RESULTS_FORMAT) from a
+    background thread so disk I/O never blocks the reactor.
+
+    Items are passed on to later pipelines as soon as they are queued. The writer
+    thread stores every item queued since its last write as one batch (a single
+    transaction for the "sqlite" backend), so batches grow with the crawl rate.
+    The seconds spent serializing and writing each page are added to the item's
+    timings ("serialize" and "write") and the `page_stored` signal is sent (back
+    on the reactor thread) once it is stored. The spider only completes a page
+    in its frontier on that signal.
+
+    When a batch fails to store, its pages are stored again one at a time. Pages
+    which still fail are logged and never signalled, so they stay pending in the
+    frontier and a resumed job (JOBDIR) audits them again.
+
+    Parameters
+    ----------
+    batch_size: int
+        The maximum number of pages stored per batch.
+        Default: 64
+    max_pending: int
+        The maximum number of pages queued and not yet stored. Once reached, each
+        further item waits (off the reactor thread) for the writer to catch up
+        before it is passed on, which holds back the scraper.
+        Default: 1024
+    stats: Optional[StatsCollector]
+        A scrapy stats collector to record batches and written pages to.
+        Default: None (do not record stats)
+    signals: Optional[SignalManager]
+        The crawler's signal manager to send `page_stored` with.
+        Default: None (do not send signals)
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 64,
+        max_pending: int = 1024,
+        stats: Optional["StatsCollector"] = None,
+        signals: Optional["SignalManager"] = None,
+    ):
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.stats = stats
+        self.signals = signals
+        self._stats_lock = threading.Lock()
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._writer: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "AxeResultsPipeline":
+        return cls(
+            batch_size=crawler.settings.getint("AXE_RESULTS_PIPELINE_BATCH_SIZE", 64),
+            max_pending=crawler.settings.getint(
+                "AXE_RESULTS_PIPELINE_MAX_PENDING", 1024
+            ),
+            stats=crawler.stats,
+            signals=crawler.signals,
+        )
+
+    def _inc_stat(self, key: str, count: int = 1) -> None:
+        # Written from the writer thread
+        if self.stats is not None:
+            with self._stats_lock:
+                self.stats.inc_value(f"results_pipeline/{key}", count)
+
+    def open_spider(self, spider: "AccessEvalSpider") -> None:
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            args=(spider,),
+            name="axe-results-writer",
+            daemon=True,
+        )
+        self._writer.start()
+
+    def close_spider(self, spider: "AccessEvalSpider") -> Optional["Deferred"]:
+        # Flush everything queued before the spider's own resources are closed
+        # The join fires back on the reactor after every `page_stored` signal
+        if self._writer is None:
+            return None
+
+        writer = self._writer
+        self._writer = None
+        return deferToThread(self._stop_writer, writer)
+
+    def _stop_writer(self, writer: threading.Thread) -> None:
+        self._queue.put(_STOP)
+        writer.join()
+
+    def process_item(self, item: Any, spider: "AccessEvalSpider") -> Any:
+        if not isinstance(item, AxeResultItem):
+            return item
+
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Wait for the writer off the reactor thread
+            self._inc_stat("backpressure_waits")
+            d = deferToThread(self._queue.put, item)
+            d.addCallback(lambda _: item)
+            return d
+
+        return item
+
+    def _write_loop(self, spider: "AccessEvalSpider") -> None:
+        stopping = False
+        while not stopping:
+            # Wait for the next item then take whatever else is already queued
+            batch: List[AxeResultItem] = []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                    break
+
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if len(batch) > 0:
+                self._write_batch(batch, spider)
+
+    def _write_batch(
+        self, batch: List[AxeResultItem], spider: "AccessEvalSpider"
+    ) -> None:
+        try:
+            self._store(batch, spider)
+        except Exception as e:
+            log.warning(
+                f"Failed to store aXe results of {len(batch)} pages, "
+                f"storing them one at a time -- {e}"
+            )
+            self._inc_stat("failed_batches")
+            stored, failed = self._store_each(batch, spider)
+        else:
+            self._inc_stat("batches")
+            stored, failed = batch, []
+
+        self._inc_stat("stored_pages", len(stored))
+        if len(failed) > 0:
+            self._inc_stat("failed_pages", len(failed))
+
+        # Signals (and so frontier completion) are handled on the reactor thread
+        if self.signals is not None and len(stored) > 0:
+            from twisted.internet import reactor
+
+            for item in stored:
+                reactor.callFromThread(  # type: ignore
+                    self.signals.send_catch_log, page_stored, item=item, spider=spider
+                )
+
+    def _store_each(
+        self, batch: List[AxeResultItem], spider: "AccessEvalSpider"
+    ) -> Tuple[List[AxeResultItem], List[AxeResultItem]]:
+        stored: List[AxeResultItem] = []
+        failed: List[AxeResultItem] = []
+        for item in batch:
+            try:
+                self._store([item], spider)
+                stored.append(item)
+            except Exception as e:
+                # Left pending in the frontier so a resumed job audits it again
+                log.error(f"Failed to store aXe results of: {item.url} -- {e}")
+                failed.append(item)
+
+        return stored, failed
+
+    def _store(self, batch: List[AxeResultItem], spider: "AccessEvalSpider") -> None:
+        encoded = []
+        for item in batch:
+            start = time.perf_counter()
+            encoded.append(encode_axe_results(item.results, spider.results_format))
+            item.timings["serialize"] = time.perf_counter() - start
+
+        if spider.result_store is not None:
+            # One transaction for the batch, shared evenly between its pages
+            start = time.perf_counter()
+            spider.result_store.put_encoded_many(
+                [(item.site, item.url, data) for item, data in zip(batch, encoded)]
+            )
+            write_seconds = (time.perf_counter() - start) / len(batch)
+            for item in batch:
+                item.timings["write"] = write_seconds
+        else:
+            filename = axe_results_filename(spider.results_format)
+            for item, data in zip(batch, encoded):
+                start = time.perf_counter()
+                page_results_dir = Path(clean_url(item.url))
+                page_results_dir.mkdir(exist_ok=True, parents=True)
+                with open(page_results_dir / filename, "wb") as open_f:
+                    open_f.write(data)
+                remove_other_axe_results(page_results_dir, spider.results_format)
+                item.timings["write"] = time.perf_counter() - start
+
+
+class AxeAggregationPipeline:
+    """
+    Aggregate the results of every stored page (`AxeResultItem`, on the
+    `page_stored` signal) per site as the crawl runs and store the same summaries
+    `process-access-eval-results` would (see `generate_high_level_statistics`) so
+    no stored result is read back. Pages which failed to store are never
+    aggregated.
+
+    Each page's simplified violations are written (off the reactor thread) as soon
+    as the page is stored so only the running aggregates are held in memory. The
+    aggregated violations of each site are stored to the site's start page
+    results directory once every page is stored (on `spider_closed`). Jobs
+    resumed from a JOBDIR only see the pages stored by the current run so their
+    summaries are left to `process-access-eval-results`.
+
+    Parameters
+    ----------
+    write_page_summaries: bool
+        Also store the simplified violations of each page to the page's results
+        directory (creating the directory for the "sqlite" results backend).
+        Default: True
+    """
+
+    def __init__(self, write_page_summaries: bool = True):
+        self.write_page_summaries = write_page_summaries
+        self.aggregators: Dict[str, AxeViolationAggregator] = {}
+        self.resumed = False
+        self._pending_writes: Set["Deferred"] = set()
+
+    @classmethod
+    def from_crawler(cls, crawler: "Crawler") -> "AxeAggregationPipeline":
+        pipeline = cls(
+            write_page_summaries=crawler.settings.getbool(
+                "AXE_AGGREGATE_PAGE_SUMMARIES", True
+            ),
+        )
+        crawler.signals.connect(pipeline._page_stored, signal=page_stored)
+        crawler.signals.connect(pipeline._spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider: "AccessEvalSpider") -> None:
+        self.resumed = len(spider.resumed) > 0 or len(spider.frontier.completed) > 0
+
+    def process_item(self, item: Any, spider: "AccessEvalSpider") -> Any:
+        # Pages are aggregated once they are stored (see `_page_stored`)
+        return item
+
+    def _page_stored(self, item: AxeResultItem, spider: "AccessEvalSpider") -> None:
+        if self.resumed:
+            return
+
+        if item.site not in self.aggregators:
+            self.aggregators[item.site] = AxeViolationAggregator()
+
+        simplified_violations = self.aggregators[item.site].add_page(
+            item.violations,
+            n_passes=item.n_passes,
+            n_incomplete=item.n_incomplete,
+        )
+        if self.write_page_summaries:
+            d = deferToThread(
+                write_page_violations_summary,
+                simplified_violations,
+                clean_url(item.url),
+            )
+            self._pending_writes.add(d)
+            d.addErrback(
+                lambda failure: log.error(
+                    f"Failed to store the violations summary of: {item.url} "
+                    f"-- {failure.value}"
+                )
+            )
+            d.addBoth(lambda _: self._pending_writes.discard(d))
+
+    def _spider_closed(self, spider: "AccessEvalSpider") -> "Deferred":
+        # Sent after every pipeline closed, so every page is stored and signalled
+        d = DeferredList(list(self._pending_writes))
+        d.addCallback(lambda _: self._write_site_aggregates(spider))
+        return d
+
+    def _write_site_aggregates(self, spider: "AccessEvalSpider") -> None:
+        if self.resumed:
+            log.info(
+                "Skipping inline aggregation for a resumed job, "
+                "run `process-access-eval-results` for each site instead"
+            )
+            return
+
+        for start_url, site in spider.site_domains.items():
+            if site in self.aggregators:
+                self.aggregators[site].write(clean_url(start_url))
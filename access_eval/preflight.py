@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import csv
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from .middlewares.redirected_offsite import HostMatcher
+
+if TYPE_CHECKING:
+    from scrapy.http import Request, Response
+
+###############################################################################
+
+# Content types worth rendering and auditing
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Statuses servers answer HEAD requests with when they only support GET
+HEAD_UNSUPPORTED_STATUSES = {403, 405, 501}
+
+# Statuses which say more about the request than the page (i.e. bot protection
+# refusing non browser clients or rate limiting), links answered with these are
+# rendered anyway and left for the browser to decide
+INCONCLUSIVE_STATUSES = {401, 403, 429}
+
+###############################################################################
+
+
+@dataclass
+class PreflightRejection:
+    """
+    A link which was never sent to the browser.
+
+    Parameters
+    ----------
+    url: str
+        The URL of the link (as discovered).
+    site: str
+        The site the link was found on.
+    kind: str
+        Why the link was rejected: "non-html", "offsite-redirect", or "dead".
+    detail: str
+        The content type, redirect target, or status / error of the link.
+    """
+
+    url: str
+    site: str
+    kind: str
+    detail: str
+
+
+def original_url(request_or_response: Union["Request", "Response"]) -> str:
+    """Get the URL a (possibly redirected) request was originally made for."""
+    return request_or_response.meta.get("redirect_urls", [request_or_response.url])[0]
+
+
+def is_inconclusive_status(status: int) -> bool:
+    """
+    Check whether a pre-flight status is inconclusive (the link should be
+    rendered anyway) rather than a dead link.
+
+    Examples
+    --------
+    >>> is_inconclusive_status(503), is_inconclusive_status(404)
+    (True, False)
+    """
+    return status in INCONCLUSIVE_STATUSES or status >= 500
+
+
+def check_preflight_response(
+    response: "Response", site: str, host_matcher: Optional[HostMatcher] = None
+) -> Optional[PreflightRejection]:
+    """
+    Decide whether a pre-flight (HEAD or headers only GET) response is an HTML
+    page of the site and so worth rendering.
+
+    Parameters
+    ----------
+    response: Response
+        The pre-flight response (after redirects).
+    site: str
+        The site the link was found on.
+    host_matcher: Optional[HostMatcher]
+        The matcher for the site's hosts (see `get_host_matcher`).
+        Default: None (the site and its "www." variant)
+
+    Returns
+    -------
+    rejection: Optional[PreflightRejection]
+        Why the link should not be rendered or None if it should be.
+    """
+    url = original_url(response)
+    if host_matcher is None:
+        host_matcher = HostMatcher([site])
+
+    # Redirected off the site (i.e. to a donation platform)
+    if not host_matcher.matches(response.url):
+        return PreflightRejection(url, site, "offsite-redirect", response.url)
+
+    # Documents, images, calendar files, ...
+    # Responses without a content type are left for the browser to decide
+    content_type_header = response.headers.get("Content-Type")
+    content_type = (
+        (content_type_header or b"").decode("latin-1").split(";")[0].strip().lower()
+    )
+    if len(content_type) > 0 and content_type not in HTML_CONTENT_TYPES:
+        return PreflightRejection(url, site, "non-html", content_type)
+
+    return None
+
+
+def write_preflight_rejections(
+    rejections: List[PreflightRejection], path: Union[str, Path]
+) -> Path:
+    """
+    Store pre-flight rejections to the provided path as CSV.
+    """
+    path = Path(path)
+    with open(path, "w", newline="") as open_f:
+        writer = csv.DictWriter(open_f, fieldnames=["url", "site", "kind", "detail"])
+        writer.writeheader()
+        for rejection in rejections:
+            writer.writerow(asdict(rejection))
+
+    return path
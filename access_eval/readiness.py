@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+
+###############################################################################
+
+# Installs (once per document) a MutationObserver which records the last time the
+# DOM changed and treats any newly finished network resource as a change as well
+# Returns the document ready state and how long the page has been quiet for
+READINESS_PROBE_SCRIPT = """
+var state = window.__accessEvalReadiness;
+if (!state) {
+    state = {lastChange: performance.now(), resources: 0};
+    window.__accessEvalReadiness = state;
+    new MutationObserver(function () {
+        state.lastChange = performance.now();
+    }).observe(document, {
+        childList: true,
+        subtree: true,
+        attributes: true,
+        characterData: true
+    });
+}
+var resources = performance.getEntriesByType("resource").length;
+if (resources !== state.resources) {
+    state.resources = resources;
+    state.lastChange = performance.now();
+}
+return {
+    readyState: document.readyState,
+    quietFor: (performance.now() - state.lastChange) / 1000
+};
+"""
+
+###############################################################################
+
+
+def wait_for_page_ready(
+    driver: "WebDriver",
+    max_wait: float = 5.0,
+    quiet_period: float = 0.5,
+    poll_interval: float = 0.1,
+) -> float:
+    """
+    Wait until the page loaded by the driver is stable or the ceiling is reached.
+
+    A page is considered stable once `document.readyState` is "complete" and
+    neither the DOM has mutated nor a new network resource has finished loading
+    for `quiet_period` seconds.
+
+    Parameters
+    ----------
+    driver: WebDriver
+        The driver which has navigated to the page.
+    max_wait: float
+        The maximum number of seconds to wait for the page to become stable.
+        Default: 5.0
+    quiet_period: float
+        The number of seconds without DOM or network activity required.
+        Default: 0.5
+    poll_interval: float
+        The number of seconds between stability checks.
+        Default: 0.1
+
+    Returns
+    -------
+    waited: float
+        The number of seconds actually waited.
+        Equal to (or just above) `max_wait` if the page never became stable.
+    """
+    start = time.perf_counter()
+    deadline = start + max_wait
+    while True:
+        probe = driver.execute_script(READINESS_PROBE_SCRIPT)
+        if probe["readyState"] == "complete" and probe["quietFor"] >= quiet_period:
+            break
+
+        if time.perf_counter() >= deadline:
+            break
+
+        time.sleep(poll_interval)
+
+    return time.perf_counter() - start
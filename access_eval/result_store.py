@@ -0,0 +1,399 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sqlite3
+import threading
+import time
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .storage import (
+    axe_results_filename,
+    decode_axe_results,
+    decode_axe_summary,
+    encode_axe_results,
+    iter_axe_results_files,
+    read_axe_results,
+    read_axe_summary,
+    remove_other_axe_results,
+    write_axe_results,
+)
+from .utils import clean_url
+
+###############################################################################
+
+RESULT_STORE_FILENAME = "access-eval-results.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS page_results (
+    url TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    page_dir TEXT NOT NULL,
+    format TEXT NOT NULL,
+    results BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_results_site ON page_results (site);
+CREATE INDEX IF NOT EXISTS page_results_page_dir ON page_results (page_dir);
+"""
+
+# Writes still locked out after the busy timeout are retried this many times
+_WRITE_ATTEMPTS = 3
+
+###############################################################################
+
+
+class ResultStore:
+    """
+    A single SQLite database holding the aXe results of every page of a run,
+    one row per page indexed by site, URL, and legacy results directory.
+
+    Each row records the directory the page's results would have been stored in
+    by the directory backend (`clean_url(url)`) so readers can select the pages
+    under any directory of the legacy layout and `export_legacy_layout` can
+    recreate it.
+
+    Every crawler process of a sharded run writes to the same database, so
+    writers wait up to `busy_timeout` seconds for each other (and retry a still
+    locked write after that). The database must be on a local filesystem, SQLite's WAL
+    mode relies on shared memory which network filesystems (NFS, SMB) do not
+    provide.
+
+    Parameters
+    ----------
+    path: Union[str, Path]
+        The database file to open (created if it does not exist).
+    fmt: str
+        The storage format results are serialized with (see access_eval.storage).
+        Default: "json.gz"
+    busy_timeout: float
+        The seconds to wait for another process's write to finish.
+        Default: 30.0
+    """
+
+    def __init__(
+        self, path: Union[str, Path], fmt: str = "json.gz", busy_timeout: float = 30.0
+    ):
+        # Fail on unknown formats before creating the database
+        axe_results_filename(fmt)
+
+        self.path = Path(path)
+        self.fmt = fmt
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=busy_timeout, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self) -> "ResultStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def put(self, site: str, url: str, results: Dict[str, Any]) -> None:
+        """Store (or replace) the results of a page."""
+        self.put_many([(site, url, results)])
+
+    def put_many(self, pages: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """
+        Store (or replace) the results of many pages in a single transaction.
+
+        Parameters
+        ----------
+        pages: Iterable[Tuple[str, str, Dict[str, Any]]]
+            The site, URL, and aXe results of each page.
+        """
+        # Serialize before taking the lock so readers are not held up
+        self.put_encoded_many(
+            [
+                (site, url, encode_axe_results(results, self.fmt))
+                for site, url, results in pages
+            ]
+        )
+
+    def put_encoded_many(self, pages: Iterable[Tuple[str, str, bytes]]) -> None:
+        """
+        Store (or replace) the results of many pages, already serialized in the
+        store's format (see `encode_axe_results`), in a single transaction.
+        """
+        rows = [
+            (url, site, clean_url(url), self.fmt, data) for site, url, data in pages
+        ]
+        with self._lock:
+            for attempt in range(1, _WRITE_ATTEMPTS + 1):
+                try:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO page_results VALUES (?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._conn.commit()
+                    return
+                except sqlite3.OperationalError as e:
+                    # Another shard held the write lock for the whole busy timeout
+                    self._conn.rollback()
+                    if "locked" not in str(e) or attempt == _WRITE_ATTEMPTS:
+                        raise
+
+                    time.sleep(attempt)
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM page_results WHERE url = ?", (url,)
+            ).fetchone()
+
+        return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM page_results").fetchone()
+
+        return row[0]
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Get the results of a page or None if the page has no results."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT format, results FROM page_results WHERE url = ?", (url,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return decode_axe_results(row[1], row[0])
+
+    def sites(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT site FROM page_results ORDER BY site"
+            ).fetchall()
+
+        return [row[0] for row in rows]
+
+    def iter_results(
+        self,
+        site: Optional[str] = None,
+        page_dir: Optional[str] = None,
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Iterate over stored page results.
+
+        Parameters
+        ----------
+        site: Optional[str]
+            Only the pages of this site.
+            Default: None (every site)
+        page_dir: Optional[str]
+            Only the pages stored at or under this legacy results directory
+            (relative to the store, i.e. "example.com/issues").
+            Default: None (every directory)
+
+        Yields
+        ------
+        page_dir: str
+            The legacy results directory of the page.
+        results: Dict[str, Any]
+            The page's aXe results.
+        """
+        for row_page_dir, fmt, data in self.iter_encoded(site=site, page_dir=page_dir):
+            yield row_page_dir, decode_axe_results(data, fmt)
+
+    def iter_encoded(
+        self,
+        site: Optional[str] = None,
+        page_dir: Optional[str] = None,
+    ) -> Iterator[Tuple[str, str, bytes]]:
+        """
+        Iterate over stored page results without deserializing them
+        (see `iter_results`).
+
+        Parameters
+        ----------
+        site: Optional[str]
+            Only the pages of this site.
+            Default: None (every site)
+        page_dir: Optional[str]
+            Only the pages stored at or under this legacy results directory
+            (relative to the store, i.e. "example.com/issues").
+            Default: None (every directory)
+
+        Yields
+        ------
+        page_dir: str
+            The legacy results directory of the page.
+        fmt: str
+            The storage format the page's results are serialized with.
+        data: bytes
+            The page's serialized aXe results.
+        """
+        query = "SELECT page_dir, format, results FROM page_results"
+        conditions: List[str] = []
+        params: List[str] = []
+        if site is not None:
+            conditions.append("site = ?")
+            params.append(site)
+        if page_dir:
+            # Range over the page_dir index instead of a LIKE scan
+            # "0" is the character after "/"
+            page_dir = page_dir.strip("/")
+            conditions.append("(page_dir = ? OR (page_dir >= ? AND page_dir < ?))")
+            params.extend([page_dir, f"{page_dir}/", f"{page_dir}0"])
+        if len(conditions) > 0:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY page_dir"
+
+        # Fetch in batches so the lock is not held while callers process rows
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            rows = cursor.fetchmany(256)
+        while len(rows) > 0:
+            yield from rows
+            with self._lock:
+                rows = cursor.fetchmany(256)
+
+    def export_legacy_layout(
+        self,
+        dest_dir: Union[str, Path],
+        fmt: str = "json",
+        site: Optional[str] = None,
+    ) -> int:
+        """
+        Write the stored results back out to the one directory per page layout.
+
+        Parameters
+        ----------
+        dest_dir: Union[str, Path]
+            The directory to create the page directories in.
+        fmt: str
+            The storage format to write each page's results file in.
+            Default: "json" (the original `full-axe-results.json` layout)
+        site: Optional[str]
+            Only export the pages of this site.
+            Default: None (every site)
+
+        Returns
+        -------
+        n_pages: int
+            The number of pages exported.
+        """
+        dest_dir = Path(dest_dir)
+        filename = axe_results_filename(fmt)
+        n_pages = 0
+        for page_dir, results in self.iter_results(site=site):
+            page_results_dir = dest_dir / page_dir
+            page_results_dir.mkdir(exist_ok=True, parents=True)
+            write_axe_results(results, page_results_dir / filename, fmt=fmt)
+            remove_other_axe_results(page_results_dir, fmt)
+            n_pages += 1
+
+        return n_pages
+
+
+def find_result_store(results_dir: Union[str, Path]) -> Optional[Tuple[Path, str]]:
+    """
+    Find the result store holding the results of a legacy results directory.
+
+    The store is looked for in the directory itself (a run's output directory)
+    and then in its parent (a site's directory in a run's output directory).
+
+    Parameters
+    ----------
+    results_dir: Union[str, Path]
+        The results directory (i.e. a site's directory) to read results for.
+
+    Returns
+    -------
+    store_path_and_page_dir: Optional[Tuple[Path, str]]
+        The path to the store and the directory relative to the store's directory
+        (to pass as `page_dir` to `ResultStore.iter_results`, "" for the store's
+        own directory), or None if no store was found.
+    """
+    results_dir = Path(results_dir).resolve()
+    for store_dir in (results_dir, results_dir.parent):
+        store_path = store_dir / RESULT_STORE_FILENAME
+        if store_path.exists():
+            page_dir = results_dir.relative_to(store_dir).as_posix()
+            return store_path, "" if page_dir == "." else page_dir
+
+    return None
+
+
+def iter_page_result_loaders(
+    results_dir: Union[str, Path],
+    summary: bool = False,
+) -> Iterator[Tuple[Path, Callable[[], Dict[str, Any]]]]:
+    """
+    Iterate over loaders of the aXe results of every page at or under a results
+    directory (see `iter_page_results`) without reading them.
+
+    Loaders can be pickled, so pages can be read and parsed by worker processes.
+
+    Parameters
+    ----------
+    results_dir: Union[str, Path]
+        The results directory (i.e. a site's directory) to read results for.
+    summary: bool
+        Only load the summary of each page's results (see `read_axe_summary`).
+        Default: False (load the full results)
+
+    Yields
+    ------
+    page_results_dir: Path
+        The (legacy layout) results directory of the page.
+    load: Callable[[], Dict[str, Any]]
+        Reads (or deserializes) the page's aXe results when called.
+    """
+    read = read_axe_summary if summary else read_axe_results
+    decode = decode_axe_summary if summary else decode_axe_results
+
+    results_dir = Path(results_dir).resolve()
+    found = find_result_store(results_dir)
+    if found is None:
+        for path in iter_axe_results_files(results_dir):
+            yield path.parent, partial(read, path)
+
+        return
+
+    store_path, page_dir = found
+    with ResultStore(store_path) as store:
+        for row_page_dir, fmt, data in store.iter_encoded(page_dir=page_dir):
+            yield store_path.parent / row_page_dir, partial(decode, data, fmt)
+
+
+def iter_page_results(
+    results_dir: Union[str, Path],
+    summary: bool = False,
+) -> Iterator[Tuple[Path, Dict[str, Any]]]:
+    """
+    Iterate over the aXe results of every page at or under a results directory,
+    read from the run's result store if there is one (see `find_result_store`)
+    and otherwise from the page results files under the directory.
+
+    Parameters
+    ----------
+    results_dir: Union[str, Path]
+        The results directory (i.e. a site's directory) to read results for.
+    summary: bool
+        Only read the summary of each page's results (see `read_axe_summary`).
+        Default: False (read the full results)
+
+    Yields
+    ------
+    page_results_dir: Path
+        The (legacy layout) results directory of the page.
+    results: Dict[str, Any]
+        The page's aXe results (or their summary).
+    """
+    for page_results_dir, load in iter_page_result_loaders(
+        results_dir, summary=summary
+    ):
+        yield page_results_dir, load()
@@ -14,20 +14,35 @@ NEWSPIDER_MODULE = "access_eval.spiders"
 
 
 # Crawl responsibly by identifying yourself (and your website) on the user-agent
-# USER_AGENT = 'access_eval (+http://www.yourdomain.com)'
+# Plain HTTP requests (robots.txt, sitemaps, and pre-flights) and the pooled
+# browsers send the same browser user-agent so bot protection treats the
+# pre-flight of a page like the render of it
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64; rv:102.0) Gecko/20100101 Firefox/102.0"
 
 # Obey robots.txt rules
 ROBOTSTXT_OBEY = False
 
+import os
+
+# Number of pages rendered (and audited) in parallel
+# Each page is rendered on its own isolated headless Firefox from the driver pool
+DRIVER_POOL_SIZE = min(4, os.cpu_count() or 1)
+
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-CONCURRENT_REQUESTS = 1
+# Each in-flight page holds one pooled browser for its entire download so
+# CONCURRENT_REQUESTS and CONCURRENT_REQUESTS_PER_DOMAIN default to the effective
+# DRIVER_POOL_SIZE (including `-s DRIVER_POOL_SIZE=N` overrides), as does
+# REACTOR_THREADPOOL_MAXSIZE (plus room for DNS resolution) because pages are
+# rendered on reactor threads
+# Set any of them here (or with `-s`) to override the derived value
+# CONCURRENT_REQUESTS = 4
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
 # See also autothrottle settings and docs
 # DOWNLOAD_DELAY = 3
 # The download delay setting will honor only one of:
-# CONCURRENT_REQUESTS_PER_DOMAIN = 16
+# CONCURRENT_REQUESTS_PER_DOMAIN = 4
 # CONCURRENT_REQUESTS_PER_IP = 16
 
 # Disable cookies (enabled by default)
@@ -60,26 +75,190 @@ else:
 
 SELENIUM_DRIVER_ARGUMENTS = ["-headless"]
 
+# Long-lived headless Firefox drivers are used to render and run aXe on each page
+# (see DRIVER_POOL_SIZE above for how many are run in parallel)
+# Drivers are reset between pages and replaced after serving the page limit
+# or once their process tree uses more than the memory limit (in megabytes)
+DRIVER_POOL_MAX_PAGES_PER_DRIVER = 50
+DRIVER_POOL_MAX_RSS_MB = 1500
+# Wall-clock budget (in seconds) for rendering and auditing a single page
+# Drivers which exceed it have their whole process tree killed and are replaced
+DRIVER_POOL_PAGE_TIMEOUT = 120
+
+# Resources the pooled browsers refuse to load ("none", "audit", or "text-only")
+# "audit" skips media, web fonts, video embeds, and trackers which do not change
+# which aXe rules fire but dominate page load time and memory
+# See access_eval/block_policy.py for details
+# The first pooled browser checks that a blocked host actually fails to load
+# ("driver_pool/block_policy_not_enforced" stat otherwise) and every page records an
+# estimate of the resources blocked from its rendered DOM
+# ("block_policy/blocked_resources_estimate")
+# Blocking can change what some rules see (i.e. video captions and text rendered
+# in web fonts) so it is opt-in, and the blocked counts are only estimates
+BLOCK_POLICY = "none"
+
+# Run aXe inside the downloader on the same driver that rendered the page
+# instead of loading every page a second time on another pooled driver
+# (both run off the reactor thread)
+AXE_SINGLE_RENDER = True
+
+# Pages are considered rendered once the document is complete and neither the DOM
+# nor the network has changed for the quiet period (in seconds)
+# The max wait is the ceiling for pages that never settle
+PAGE_READY_MAX_WAIT = 5.0
+PAGE_READY_QUIET_PERIOD = 0.5
+
+# The axe-core script is read once per process and injected from memory
+# Firefox (the pooled browser) has no preload API so the script is injected into
+# every audited page, only Chromium drivers preload it once per driver
+# Defaults to the build bundled with axe_selenium_python, set a path to use another
+# build and a version to refuse to crawl with any other version
+# The injected version is stored in every page's results ("accessEvalAxeVersion")
+AXE_SCRIPT_PATH = None
+AXE_CORE_VERSION = "3.1.1"
+
+from typing import List
+
+# Only run the aXe rules with these tags (i.e. ["wcag2a", "wcag2aa"])
+# Empty runs every rule
+AXE_RUN_ONLY_TAGS: List[str] = []
+# Passed to aXe as `resultTypes`, rules of result types not listed are reported
+# with at most one node (so their node counts are lost)
+# Empty keeps full detail for every result type
+AXE_RESULT_TYPES: List[str] = []
+# Result types whose rules are stored with only their node count ("nodeCount")
+# instead of every node, the counts are all the analysis (i.e. the axe-score)
+# needs from them (i.e. ["passes", "inapplicable"] for much smaller results)
+# Empty keeps every node, as described in docs/results_explainer.md
+AXE_COUNT_ONLY_RESULT_TYPES: List[str] = []
+# The options used are stored in every page's results ("accessEvalAxeOptions")
+
+# How each page's aXe results are stored ("json", "json.gz", "json.zst", or "msgpack")
+# "json" is pretty printed, the others are compact and an order of magnitude smaller
+# "json.zst" and "msgpack" require the `compression` extra to be installed
+# The analysis readers detect the format of each page's results from its suffix
+# Defaults to the readable `full-axe-results.json` described in
+# docs/results_explainer.md
+AXE_RESULTS_FORMAT = "json"
+
+# Where each page's aXe results are stored ("directory" or "sqlite")
+# "directory" stores a results file in one directory per page (`clean_url(url)`)
+# "sqlite" stores every page as a row of a single database per run
+# ("access-eval-results.sqlite") indexed by site and URL, which the analysis readers
+# use in place of walking the directories
+# `ResultStore.export_legacy_layout` recreates the directory layout from a database
+# Every shard process of a machine writes to the same database in the results root,
+# which must be on a local filesystem (SQLite locking is unreliable over NFS or SMB)
+AXE_RESULTS_BACKEND = "directory"
+
+# Reuse the aXe results of an already audited page of the same site when a page's
+# rendered DOM has the same structure (tag and attribute names)
+# Reused results are still stored for the page (with the original page's URL
+# stored under the "accessEvalReusedFrom" key) so aggregations remain correct
+AXE_REUSE_TEMPLATE_RESULTS = False
+# Include text content in the structure fingerprint (stricter matching)
+AXE_REUSE_FINGERPRINT_TEXT = False
+# Number of page structures to keep results for
+AXE_REUSE_CACHE_SIZE = 256
+
+# Seen set used to avoid rendering the same (canonical) URL twice ("set" or "bloom")
+# A bloom filter uses fixed memory for very large crawls at the cost of skipping
+# roughly FRONTIER_BLOOM_ERROR_RATE of new pages once capacity is reached
+FRONTIER_SEEN_SET = "set"
+FRONTIER_BLOOM_CAPACITY = 1_000_000
+FRONTIER_BLOOM_ERROR_RATE = 0.0001
+
+# Bound the cost of crawling each site
+# Within a site, navigation links are crawled first and paginated listing pages
+# last so the pages that matter most are audited before the budget runs out
+# Each site's results directory stores whether its budget was exhausted
+# (see crawl-budget.json)
+# Links never audited (i.e. rejected at pre-flight) are refunded and the page is
+# spent on the best link refused while the page limit was hit
+# Depth is enforced by the budget instead of DEPTH_LIMIT because pre-flight and
+# sitemap requests sit between a page and the pages it links to
+CRAWL_BUDGET_MAX_DEPTH = 3
+CRAWL_BUDGET_MAX_PAGES_PER_SITE = 200
+CRAWL_BUDGET_MAX_SECONDS_PER_SITE = 1800
+
+# Fetch each site's robots.txt and sitemaps over plain HTTP and schedule every page
+# they list up front, links are still extracted from every rendered page to find
+# pages missing from the sitemap
+SITEMAP_SEEDING = True
+
+# Check every discovered link with a HEAD (or headers only GET) request before
+# rendering it and only send live HTML pages of the site to the browser
+# Rejected links are stored per site (see preflight-rejected-links.csv)
+# Inconclusive answers (401, 403, 429, and 5xx, i.e. from bot protection or rate
+# limits) are rendered anyway
+PREFLIGHT = True
+
+# Crawls run with a job directory (i.e. `-s JOBDIR=crawls/my-site`) journal every
+# scheduled and completed page to it and, when restarted with the same JOBDIR,
+# resume exactly where they stopped without re-auditing already stored pages
+# Resumed sites keep the pages and time they spent before the interruption
+# JOBDIR = None
+
+# Requests to hosts outside of each site's domain (and the "www." variant of it)
+# are dropped before download, as are rendered pages the browser was redirected
+# off site from (checked before aXe runs)
+OFFSITE_ALLOW_WWW_VARIANTS = True
+OFFSITE_CHECK_RENDERED_URL = True
+
+# Sites are scoped to their registered domain with tldextract
+# Offline mode never fetches the public suffix list over the network and uses the
+# snapshot file (if provided) or the snapshot bundled with tldextract
+# The suffix list is loaded once per process and shared by every site
+TLDEXTRACT_OFFLINE = True
+TLDEXTRACT_SUFFIX_LIST_FILE = None
+TLDEXTRACT_CACHE_DIR = None
+
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
     # Disable middlewares by passing None
     "scrapy.downloadermiddlewares.retry.RetryMiddleware": None,
-    "scrapy_selenium.SeleniumMiddleware": 800,
+    "access_eval.middlewares.selenium_axe.AxeSeleniumMiddleware": 800,
     "access_eval.middlewares.redirected_offsite.OffsiteDownloaderMiddleware": 900,
 }
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    'scrapy.extensions.telnet.TelnetConsole': None,
-# }
+# CrawlTelemetry records the seconds every page spends in each phase of the crawl
+# (queue wait, driver acquire, navigation, readiness wait, aXe inject and run,
+# serialization, and write) and samples the browsers' memory and CPU
+EXTENSIONS = {
+    "access_eval.extensions.CrawlTelemetry": 500,
+}
+# Disabled by default, enable with `-s TELEMETRY_ENABLED=True`
+# The files are written to the crawl's working directory (the results root)
+TELEMETRY_ENABLED = False
+# Page timings, resource samples, and the per site and per run summaries
+# "{pid}" is replaced with the crawler's process ID (batch workers share a directory)
+TELEMETRY_LOG_FILE = "access-eval-telemetry-{pid}.jsonl"
+# Prometheus text format metrics (i.e. for the node_exporter textfile collector)
+# Set to None to disable
+TELEMETRY_PROMETHEUS_FILE = "access-eval-telemetry-{pid}.prom"
+# Seconds between browser memory and CPU samples
+TELEMETRY_SAMPLE_INTERVAL = 5.0
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
-# ITEM_PIPELINES = {
-#    'access_eval.pipelines.AccessEvalPipeline': 300,
-# }
+# Every audited page's results are stored by AxeResultsPipeline from a background
+# thread in batches (see AXE_RESULTS_BACKEND and AXE_RESULTS_FORMAT)
+# AxeAggregationPipeline keeps running per site aggregates of every stored page and
+# stores the summaries otherwise made by `process-access-eval-results` when the
+# crawl closes (jobs resumed from a JOBDIR still need `process-access-eval-results`)
+ITEM_PIPELINES = {
+    "access_eval.pipelines.AxeResultsPipeline": 300,
+    "access_eval.pipelines.AxeAggregationPipeline": 400,
+}
+# Maximum number of pages stored per batch
+AXE_RESULTS_PIPELINE_BATCH_SIZE = 64
+# Maximum number of pages waiting to be stored before the crawl waits on the writer
+AXE_RESULTS_PIPELINE_MAX_PENDING = 1024
+# Also store each page's simplified violations to the page's results directory
+AXE_AGGREGATE_PAGE_SUMMARIES = True
 
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
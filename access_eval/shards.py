@@ -0,0 +1,346 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import os
+import socket
+import statistics
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from dataclasses_json import dataclass_json
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+SHARD_MANIFEST_FILENAME = "manifest.json"
+
+
+class ShardState:
+    pending: str = "pending"
+    running: str = "running"
+    done: str = "done"
+    failed: str = "failed"
+
+
+@dataclass_json
+@dataclass
+class Shard:
+    id: str
+    urls: List[str]
+    expected_cost: float
+
+
+@dataclass_json
+@dataclass
+class ShardManifest:
+    shards: List[Shard]
+
+    @property
+    def total_sites(self) -> int:
+        return sum(len(shard.urls) for shard in self.shards)
+
+
+###############################################################################
+
+
+def plan_shards(
+    urls: List[str],
+    shard_dir: Union[str, Path],
+    sites_per_shard: int = 10,
+    expected_costs: Optional[Dict[str, float]] = None,
+) -> ShardManifest:
+    """
+    Split a list of websites into shards and store them in the shard directory.
+
+    Sites are ordered longest-expected-first before sharding and shards are named so
+    that workers claim them in that order. Shards hold up to `sites_per_shard`
+    sites so the cost of starting a crawler process is shared, but never more
+    than `sites_per_shard` typical (median cost) sites' worth of work, so the
+    expensive sites get small shards (one site each when a single site costs
+    that much). Workers claim a new shard whenever they become idle, so this
+    keeps one large site from leaving the other workers idle at the end of a
+    batch.
+
+    Parameters
+    ----------
+    urls: List[str]
+        The websites to shard.
+    shard_dir: Union[str, Path]
+        The (optionally shared) directory to store the manifest and shard files in.
+    sites_per_shard: int
+        The maximum number of websites to crawl per shard (and crawler process).
+        Default: 10
+    expected_costs: Optional[Dict[str, float]]
+        An optional mapping of website URL to expected crawl cost
+        (i.e. the number of pages found in a prior crawl).
+        Default: None (all sites are assumed to cost the same)
+
+    Returns
+    -------
+    manifest: ShardManifest
+        The planned shards.
+    """
+    shard_dir = Path(shard_dir)
+    if (shard_dir / SHARD_MANIFEST_FILENAME).exists():
+        raise FileExistsError(
+            f"A shard manifest already exists in the shard directory: '{shard_dir}'"
+        )
+
+    # Order sites by expected cost
+    # Sorting is stable so equal cost sites keep their original order
+    costs = expected_costs or {}
+    ordered = sorted(urls, key=lambda url: costs.get(url, 1.0), reverse=True)
+
+    # Chunk by count and by cost
+    max_shard_cost = sites_per_shard * (
+        statistics.median(costs.get(url, 1.0) for url in ordered)
+        if len(ordered) > 0
+        else 1.0
+    )
+    chunks: List[List[str]] = []
+    chunk_cost = 0.0
+    for url in ordered:
+        cost = costs.get(url, 1.0)
+        if (
+            len(chunks) == 0
+            or len(chunks[-1]) >= sites_per_shard
+            or chunk_cost + cost > max_shard_cost
+        ):
+            chunks.append([])
+            chunk_cost = 0.0
+
+        chunks[-1].append(url)
+        chunk_cost += cost
+
+    shards = [
+        Shard(
+            id=f"shard-{i:06d}",
+            urls=shard_urls,
+            expected_cost=sum(costs.get(url, 1.0) for url in shard_urls),
+        )
+        for i, shard_urls in enumerate(chunks)
+    ]
+
+    # Store shard files then the manifest
+    # The manifest is written last so a partially planned directory is never used
+    for state in (
+        ShardState.pending,
+        ShardState.running,
+        ShardState.done,
+        ShardState.failed,
+    ):
+        (shard_dir / state).mkdir(parents=True, exist_ok=True)
+    for shard in shards:
+        with open(shard_dir / ShardState.pending / f"{shard.id}.jsonl", "w") as open_f:
+            for url in shard.urls:
+                open_f.write(json.dumps(url) + "\n")
+
+    manifest = ShardManifest(shards=shards)
+    with open(shard_dir / SHARD_MANIFEST_FILENAME, "w") as open_f:
+        open_f.write(manifest.to_json(indent=4))  # type: ignore
+
+    return manifest
+
+
+def load_shard_manifest(shard_dir: Union[str, Path]) -> ShardManifest:
+    """
+    Load the shard manifest stored in the shard directory.
+
+    Parameters
+    ----------
+    shard_dir: Union[str, Path]
+        The directory the shards were planned into.
+
+    Returns
+    -------
+    manifest: ShardManifest
+        The planned shards.
+    """
+    manifest_path = Path(shard_dir).resolve(strict=True) / SHARD_MANIFEST_FILENAME
+    with open(manifest_path, "r") as open_f:
+        return ShardManifest.from_json(open_f.read())  # type: ignore
+
+
+def claim_shard(shard_dir: Union[str, Path]) -> Optional[Path]:
+    """
+    Atomically claim the next pending shard.
+
+    Claims are made by renaming the shard file from the "pending" directory into
+    the "running" directory. Renames are atomic on a single filesystem so two
+    workers (even on different machines sharing the directory) can never claim the
+    same shard.
+
+    Parameters
+    ----------
+    shard_dir: Union[str, Path]
+        The directory the shards were planned into.
+
+    Returns
+    -------
+    claimed: Optional[Path]
+        The path to the claimed shard file or None if no shards remain.
+    """
+    shard_dir = Path(shard_dir)
+    for pending in sorted((shard_dir / ShardState.pending).glob("*.jsonl")):
+        claimed = shard_dir / ShardState.running / pending.name
+        try:
+            os.rename(pending, claimed)
+        except FileNotFoundError:
+            # Another worker got there first
+            continue
+
+        # Record who is working on the shard
+        claimed.with_suffix(".owner").write_text(
+            f"{socket.gethostname()}:{os.getpid()}\n"
+        )
+        return claimed
+
+    return None
+
+
+def finish_shard(claimed: Path, succeeded: bool) -> Path:
+    """Move a claimed shard (and its crawl log) to the "done" or "failed" directory."""
+    state = ShardState.done if succeeded else ShardState.failed
+    finished = claimed.parent.parent / state / claimed.name
+    os.rename(claimed, finished)
+    if claimed.with_suffix(".log").exists():
+        os.rename(claimed.with_suffix(".log"), finished.with_suffix(".log"))
+    claimed.with_suffix(".owner").unlink(missing_ok=True)
+    return finished
+
+
+def requeue_running_shards(shard_dir: Union[str, Path]) -> int:
+    """
+    Move all shards left in the "running" directory (i.e. by a crashed machine)
+    back to "pending". Only call this when no workers are active.
+
+    Returns
+    -------
+    n_requeued: int
+        The number of shards moved back to pending.
+    """
+    shard_dir = Path(shard_dir)
+    n_requeued = 0
+    for running in sorted((shard_dir / ShardState.running).glob("*.jsonl")):
+        os.rename(running, shard_dir / ShardState.pending / running.name)
+        running.with_suffix(".owner").unlink(missing_ok=True)
+        n_requeued += 1
+
+    return n_requeued
+
+
+def _crawl_shard(
+    shard_path: Path,
+    results_dir: Path,
+    browsers_per_worker: int,
+) -> bool:
+    # The crawler writes results relative to its working directory
+    # so every worker shares the same results root
+    env = {**os.environ, "SCRAPY_SETTINGS_MODULE": "access_eval.settings"}
+    log_path = shard_path.with_suffix(".log")
+    with open(log_path, "w") as open_log:
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "scrapy",
+                "crawl",
+                "AccessEvalSpider",
+                "-a",
+                f"urls_file={shard_path.resolve()}",
+                # The crawler derives its request concurrency and reactor thread
+                # pool size from the pool size (see AccessEvalSpider.update_settings)
+                "-s",
+                f"DRIVER_POOL_SIZE={browsers_per_worker}",
+                "-L",
+                "INFO",
+            ],
+            cwd=results_dir,
+            env=env,
+            stdout=open_log,
+            stderr=subprocess.STDOUT,
+        )
+
+    return completed.returncode == 0
+
+
+def _worker(
+    worker_id: int,
+    shard_dir: Path,
+    results_dir: Path,
+    browsers_per_worker: int,
+) -> int:
+    n_crawled = 0
+    while True:
+        claimed = claim_shard(shard_dir)
+        if claimed is None:
+            return n_crawled
+
+        log.info(f"Worker {worker_id} crawling: '{claimed.name}'")
+        succeeded = _crawl_shard(claimed, results_dir, browsers_per_worker)
+        finished = finish_shard(claimed, succeeded)
+        if not succeeded:
+            log.error(
+                f"Worker {worker_id} failed shard: '{claimed.name}' "
+                f"(see '{finished.with_suffix('.log').name}')"
+            )
+        n_crawled += 1
+
+
+def run_shards(
+    shard_dir: Union[str, Path],
+    results_dir: Union[str, Path] = ".",
+    workers: Optional[int] = None,
+    browsers_per_worker: int = 1,
+) -> int:
+    """
+    Crawl pending shards until none remain.
+
+    One crawler process is run per worker at a time, each with its own browser
+    pool. Idle workers claim the next pending shard so work is balanced without
+    any coordination beyond the shard directory. Running this on multiple
+    machines against the same shared shard directory splits the remaining shards
+    between them.
+
+    Parameters
+    ----------
+    shard_dir: Union[str, Path]
+        The directory the shards were planned into.
+    results_dir: Union[str, Path]
+        The results root all crawler processes write to. With the sqlite results
+        backend it must be on a local filesystem (see `ResultStore`).
+        Default: "." (the current working directory)
+    workers: Optional[int]
+        The number of crawler processes to run in parallel.
+        Default: None (one per CPU core)
+    browsers_per_worker: int
+        The size of each crawler process's browser pool.
+        Default: 1
+
+    Returns
+    -------
+    n_crawled: int
+        The number of shards crawled (successfully or not) on this machine.
+    """
+    shard_dir = Path(shard_dir).resolve(strict=True)
+    results_dir = Path(results_dir).resolve()
+    results_dir.mkdir(parents=True, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(
+                _worker, worker_id, shard_dir, results_dir, browsers_per_worker
+            )
+            for worker_id in range(workers)
+        ]
+        return sum(future.result() for future in futures)
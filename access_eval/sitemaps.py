@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from scrapy.http import XmlResponse
+from scrapy.utils.gz import gunzip, gzip_magic_number
+from scrapy.utils.sitemap import Sitemap, sitemap_urls_from_robots
+
+if TYPE_CHECKING:
+    from scrapy.http import Response
+
+###############################################################################
+
+# Sitemap tried when robots.txt does not list any
+DEFAULT_SITEMAP_PATH = "/sitemap.xml"
+
+###############################################################################
+
+
+def robots_url(url: str) -> str:
+    """
+    Get the robots.txt URL for the site of the provided URL.
+
+    Examples
+    --------
+    >>> robots_url("https://example.com/about")
+    'https://example.com/robots.txt'
+    """
+    return urljoin(url, "/robots.txt")
+
+
+def default_sitemap_url(url: str) -> str:
+    """
+    Get the default sitemap URL for the site of the provided URL.
+
+    Examples
+    --------
+    >>> default_sitemap_url("https://example.com/robots.txt")
+    'https://example.com/sitemap.xml'
+    """
+    return urljoin(url, DEFAULT_SITEMAP_PATH)
+
+
+def sitemap_urls_from_robots_response(response: "Response") -> List[str]:
+    """
+    Get the sitemap URLs listed in a robots.txt response, falling back to the
+    site's default sitemap location if none are listed.
+    """
+    urls = list(sitemap_urls_from_robots(response.text, base_url=response.url))
+    if len(urls) == 0:
+        urls = [default_sitemap_url(response.url)]
+
+    return urls
+
+
+def _get_sitemap_body(response: "Response") -> Optional[bytes]:
+    # Mirrors scrapy.spiders.SitemapSpider._get_sitemap_body
+    if isinstance(response, XmlResponse):
+        return response.body
+    if gzip_magic_number(response):
+        return gunzip(response.body)
+    if response.url.endswith(".xml") or response.url.endswith(".xml.gz"):
+        return response.body
+    return None
+
+
+def parse_sitemap(response: "Response") -> Tuple[Optional[str], List[str]]:
+    """
+    Parse a (possibly gzipped) sitemap response.
+
+    Parameters
+    ----------
+    response: Response
+        The downloaded sitemap.
+
+    Returns
+    -------
+    sitemap_type: Optional[str]
+        "urlset" if the sitemap lists pages, "sitemapindex" if it lists other
+        sitemaps, or None if the response is not a valid sitemap.
+    locs: List[str]
+        The page or sitemap URLs listed.
+    """
+    body = _get_sitemap_body(response)
+    if not body:
+        return None, []
+
+    try:
+        sitemap = Sitemap(body)
+    except Exception:
+        return None, []
+
+    if sitemap.type not in ("urlset", "sitemapindex"):
+        return None, []
+
+    return sitemap.type, [entry["loc"] for entry in sitemap if "loc" in entry]
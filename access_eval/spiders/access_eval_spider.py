@@ -2,103 +2,788 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import time
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import tldextract
-from axe_selenium_python import Axe
+from scrapy import Request, signals
+from scrapy.exceptions import IgnoreRequest, StopDownload
 from scrapy.linkextractors import LinkExtractor
+from scrapy.settings import SETTINGS_PRIORITIES
+from scrapy.spidermiddlewares.httperror import HttpError
 from scrapy.spiders import CrawlSpider
+from scrapy.utils.job import job_dir
 from scrapy_selenium import SeleniumRequest
-from selenium import webdriver
-from selenium.webdriver import FirefoxOptions
 
 from .. import constants
-from ..utils import clean_url
+from ..audit import (
+    AxeRunOptions,
+    AxeScript,
+    TemplateResultsCache,
+    get_axe_script,
+)
+from ..budget import CrawlBudget, link_priority
+from ..driver_pool import DriverPool, pool_concurrency_settings
+from ..extensions import phase_timings
+from ..frontier import Frontier, canonicalize_url
+from ..items import AxeResultItem
+from ..middlewares.redirected_offsite import HostMatcher, get_host_matcher
+from ..pipelines import page_stored
+from ..preflight import (
+    HEAD_UNSUPPORTED_STATUSES,
+    PreflightRejection,
+    check_preflight_response,
+    is_inconclusive_status,
+    original_url,
+    write_preflight_rejections,
+)
+from ..result_store import RESULT_STORE_FILENAME, ResultStore
+from ..sitemaps import (
+    default_sitemap_url,
+    parse_sitemap,
+    robots_url,
+    sitemap_urls_from_robots_response,
+)
+from ..storage import axe_results_filename, find_axe_results
+from ..utils import clean_url, is_site_url, read_url_list
 
 if TYPE_CHECKING:
-    from typing import Any
-
+    from scrapy.crawler import Crawler
+    from scrapy.http import Headers, Response
     from scrapy.http.response.html import HtmlResponse
+    from scrapy.settings import BaseSettings
+    from twisted.python.failure import Failure
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+# Public suffix list extractors loaded in this process (by configuration)
+_domain_extractors: Dict[
+    Tuple[bool, Optional[str], Optional[str]], tldextract.TLDExtract
+] = {}
+_domain_extractor: Optional[tldextract.TLDExtract] = None
 
 ###############################################################################
 
 
+def configure_domain_extractor(
+    offline: bool = True,
+    suffix_list_file: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> float:
+    """
+    Load the public suffix list used to scope sites to their domain once per
+    process and use it for every following `get_allowed_domain` call.
+
+    Parameters
+    ----------
+    offline: bool
+        Never fetch the public suffix list over the network. Uses the
+        `suffix_list_file` snapshot if provided, otherwise the snapshot bundled with
+        tldextract.
+        Default: True
+    suffix_list_file: Optional[str]
+        A local public suffix list snapshot to load.
+        Default: None (the bundled snapshot, or the network when not offline)
+    cache_dir: Optional[str]
+        The directory tldextract caches the parsed suffix list to.
+        Default: None (no cache when offline, tldextract's default otherwise)
+
+    Returns
+    -------
+    load_seconds: float
+        The number of seconds taken to load the suffix list
+        (0 if it was already loaded by this process).
+    """
+    global _domain_extractor
+
+    key = (offline, suffix_list_file, cache_dir)
+    if key in _domain_extractors:
+        _domain_extractor = _domain_extractors[key]
+        return 0.0
+
+    start = time.perf_counter()
+    kwargs: Dict[str, Any] = {}
+    if suffix_list_file is not None:
+        kwargs["suffix_list_urls"] = (Path(suffix_list_file).resolve().as_uri(),)
+    elif offline:
+        kwargs["suffix_list_urls"] = ()
+    if cache_dir is not None or offline:
+        kwargs["cache_dir"] = cache_dir
+
+    extractor = tldextract.TLDExtract(fallback_to_snapshot=True, **kwargs)
+
+    # The suffix list is loaded lazily, force it now so the cost is paid (and
+    # measured) once instead of on the first site
+    extractor("example.com")
+    load_seconds = time.perf_counter() - start
+    log.info(
+        f"Loaded public suffix list in {load_seconds:.3f} seconds "
+        f"(offline: {offline}, snapshot: {suffix_list_file or 'bundled'})"
+    )
+
+    _domain_extractors[key] = extractor
+    _domain_extractor = extractor
+    return load_seconds
+
+
+def _get_domain_extractor() -> tldextract.TLDExtract:
+    # Load the bundled (offline) suffix list on first use
+    if _domain_extractor is None:
+        configure_domain_extractor()
+
+    assert _domain_extractor is not None
+    return _domain_extractor
+
+
+def get_allowed_domain(url: str) -> str:
+    # Parse domain
+    parsed_url = _get_domain_extractor()(url)
+
+    # Optionally insert subdomain
+    domain_parts = [parsed_url.domain, parsed_url.suffix]
+    if len(parsed_url.subdomain) > 0:
+        domain_parts.insert(0, parsed_url.subdomain)
+
+    # Generate allowed domain
+    return ".".join(domain_parts)
+
+
 class AccessEvalSpider(CrawlSpider):
-    name = "AccessEvalSpider"
+    """
+    Crawl and evaluate one or many websites with aXe.
 
-    custom_settings = {
-        'DEPTH_LIMIT': 3,
-        }
+    Parameters
+    ----------
+    url: Optional[str]
+        A single website to crawl.
+    urls_file: Optional[str]
+        A CSV or JSONL file of websites to crawl in a single process (batch mode).
+        Each site is scoped to its own domain and depth limit and stored to its own
+        results directory exactly like a single site crawl.
+    url_column: Optional[str]
+        The column (or JSONL key) in `urls_file` which contains the website URLs.
+        Default: None (detect it, i.e. "campaign_website_url" or "Website")
 
-    def __init__(self, url: str, **kwargs: "Any"):
-        # Parse domain
-        parsed_url = tldextract.extract(url)
+    Notes
+    -----
+    The cost of crawling each site is bounded by the CRAWL_BUDGET_* settings
+    (including its depth, CRAWL_BUDGET_MAX_DEPTH). Within a site, navigation
+    links are crawled first and paginated listing pages last so the most
+    important pages are audited before a budget runs out. Whether each site's
+    budget was exhausted is stored in its results directory.
 
-        # Optionally insert subdomain
-        domain_parts = [parsed_url.domain, parsed_url.suffix]
-        if len(parsed_url.subdomain) > 0:
-            domain_parts.insert(0, parsed_url.subdomain)
+    When SITEMAP_SEEDING is enabled, each site's robots.txt and sitemaps are
+    fetched with the plain scrapy downloader (no browser) and every page they
+    list is scheduled directly. Links are still extracted from every rendered
+    page because sitemaps are often incomplete, the frontier keeps pages found
+    both ways from being rendered twice.
 
-        # Generate allowed domain
-        domain = ".".join(domain_parts)
+    When PREFLIGHT is enabled, every discovered page is first requested with a
+    HEAD (or headers only GET) request over the plain scrapy downloader and only
+    promoted to a browser render if it is a live HTML page of the site. Links to
+    documents, dead pages, and pages redirecting off the site are stored in each
+    site's results directory instead. Inconclusive answers (i.e. 403 or 503 from
+    bot protection) are rendered anyway.
+    """
+
+    name = "AccessEvalSpider"
+
+    driver_pool: DriverPool
+    frontier: Frontier
+    budget: CrawlBudget
+    audit_cache: Optional[TemplateResultsCache]
+    axe_script: AxeScript
+    axe_options: AxeRunOptions
+    resumed: List[Dict[str, Any]]
+    sitemap_seeding: bool
+    preflight: bool
+    allow_www_variants: bool
+    results_format: str
+    result_store: Optional[ResultStore]
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        urls_file: Optional[str] = None,
+        url_column: Optional[str] = None,
+        **kwargs: "Any",
+    ):
+        # Gather sites
+        # Invalid rows of a urls file are skipped so one bad row never stops a batch
+        if url is not None:
+            if not is_site_url(url):
+                raise ValueError(f"Not a website URL (http or https): '{url}'")
+            urls = [url]
+        elif urls_file is not None:
+            urls = read_url_list(urls_file, url_column=url_column)
+            if len(urls) == 0:
+                raise ValueError(f"No website URLs found in: '{urls_file}'")
+        else:
+            raise ValueError("One of 'url' or 'urls_file' must be provided.")
+
+        # Map each start url to the domain its crawl is scoped to
+        self.site_domains: Dict[str, str] = {
+            start_url: get_allowed_domain(start_url) for start_url in urls
+        }
 
         # Apply params
-        self.allowed_domains = [domain]
-        self.start_urls = [url]
+        self.allowed_domains = sorted(set(self.site_domains.values()))
+        self.start_urls = urls
+
+        # Sites (and their page counts) whose pages were seeded from a sitemap
+        self.sitemap_seeded: Dict[str, int] = {}
+
+        # Links never sent to the browser
+        self.preflight_rejections: Dict[str, List[PreflightRejection]] = {}
 
         # Super
         super().__init__(**kwargs)
 
-    def parse_result(self, response: "HtmlResponse") -> None:
-        # We spawn a new webdriver process for each page because
-        # scrapy parses pages asynchronously with the same driver
-        # So by the time we are done injecting aXe and processing the page
-        # the driver may have moved on to a new page
-        # This gets around that by just forcing aXe to run on a new driver each time
-        # Expensive but works :shrug:
-        opts = FirefoxOptions()
-        opts.add_argument("--headless")
-        driver = webdriver.Firefox(firefox_options=opts)
-        driver.get(response.request.url)
-
-        # Connect Axe to driver
-        axe = Axe(driver)
-        axe.inject()
-
-        # Run checks and store results
-        results = axe.run()
-        driver.close()
-
-        # Construct storage path
-        url = clean_url(response.request.url)
-        storage_dir = Path(url)
-        storage_dir.mkdir(exist_ok=True, parents=True)
-        axe.write_results(
-            results,
-            str(storage_dir / constants.SINGLE_PAGE_AXE_RESULTS_FILENAME),
+    @classmethod
+    def update_settings(cls, settings: "BaseSettings") -> None:
+        super().update_settings(settings)
+
+        # Size concurrency to the effective DRIVER_POOL_SIZE (including command
+        # line overrides) unless it was set explicitly
+        pool_size = settings.getint("DRIVER_POOL_SIZE", 1)
+        for name, value in pool_concurrency_settings(pool_size).items():
+            priority = settings.getpriority(name)
+            if priority is None or priority <= SETTINGS_PRIORITIES["default"]:
+                settings.set(name, value, priority="spider")
+
+    @classmethod
+    def from_crawler(
+        cls, crawler: "Crawler", *args: "Any", **kwargs: "Any"
+    ) -> "AccessEvalSpider":
+        # Sites are scoped to their domains during init so the suffix list used
+        # must be configured beforehand
+        load_seconds = configure_domain_extractor(
+            offline=crawler.settings.getbool("TLDEXTRACT_OFFLINE", True),
+            suffix_list_file=crawler.settings.get("TLDEXTRACT_SUFFIX_LIST_FILE"),
+            cache_dir=crawler.settings.get("TLDEXTRACT_CACHE_DIR"),
+        )
+        crawler.stats.set_value("tldextract/load_seconds", load_seconds)
+
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        spider.driver_pool = DriverPool.from_crawler(crawler)
+
+        # The crawler process sizes the reactor thread pool from the project
+        # settings when it starts, resize it to this crawl's setting afterwards
+        from twisted.internet import reactor
+
+        reactor.callWhenRunning(  # type: ignore
+            reactor.suggestThreadPoolSize,  # type: ignore
+            crawler.settings.getint("REACTOR_THREADPOOL_MAXSIZE"),
+        )
+        spider.frontier = Frontier.from_crawler(crawler)
+        spider.budget = CrawlBudget.from_crawler(crawler)
+        spider.sitemap_seeding = crawler.settings.getbool("SITEMAP_SEEDING", True)
+        spider.preflight = crawler.settings.getbool("PREFLIGHT", True)
+        spider.allow_www_variants = crawler.settings.getbool(
+            "OFFSITE_ALLOW_WWW_VARIANTS", True
+        )
+        crawler.signals.connect(spider._page_stored, signal=page_stored)
+        if spider.preflight:
+            crawler.signals.connect(
+                spider._stop_headers_only_download, signal=signals.headers_received
+            )
+
+        # When run with a JOBDIR, journal the frontier to it and resume any pages
+        # a previous run of the same job scheduled but never completed
+        spider.resumed = []
+        jobdir = job_dir(crawler.settings)
+        if jobdir is not None:
+            spider.resumed = spider.frontier.open_journal(jobdir)
+
+            # Sites keep the budget they spent before the interruption
+            for site, spent in spider.frontier.replayed.items():
+                spider.budget.resume(site, spent["pages"], spent["elapsed_seconds"])
+
+            if len(spider.resumed) > 0:
+                spider.log(
+                    f"Resuming {len(spider.resumed)} pending pages from: '{jobdir}'",
+                    level=logging.INFO,
+                )
+
+        # Read the (pinned) axe-core source once for every page
+        spider.axe_script = get_axe_script(
+            path=crawler.settings.get("AXE_SCRIPT_PATH"),
+            version=crawler.settings.get("AXE_CORE_VERSION"),
+        )
+        spider.log(
+            f"Using axe-core {spider.axe_script.version} "
+            f"from: '{spider.axe_script.path}'",
+            level=logging.INFO,
+        )
+
+        # Which rules to run and how much detail to keep
+        spider.axe_options = AxeRunOptions(
+            run_only_tags=tuple(crawler.settings.getlist("AXE_RUN_ONLY_TAGS")),
+            result_types=tuple(crawler.settings.getlist("AXE_RESULT_TYPES")),
+            count_only_result_types=tuple(
+                crawler.settings.getlist("AXE_COUNT_ONLY_RESULT_TYPES")
+            ),
+        )
+
+        # How each page's results are stored (see access_eval.storage)
+        # Unknown formats fail here rather than on the first audited page
+        spider.results_format = crawler.settings.get("AXE_RESULTS_FORMAT", "json")
+        axe_results_filename(spider.results_format)
+
+        # Store results in one directory per page ("directory") or
+        # as rows of a single database for the run ("sqlite")
+        backend = crawler.settings.get("AXE_RESULTS_BACKEND", "directory")
+        spider.result_store = None
+        if backend == "sqlite":
+            spider.result_store = ResultStore(
+                RESULT_STORE_FILENAME, fmt=spider.results_format
+            )
+        elif backend != "directory":
+            raise ValueError(
+                f"Unknown AXE_RESULTS_BACKEND: '{backend}'. "
+                "Available backends: ['directory', 'sqlite']"
+            )
+
+        # Optionally reuse aXe results between pages with identical DOM structure
+        spider.audit_cache = None
+        if crawler.settings.getbool("AXE_REUSE_TEMPLATE_RESULTS", False):
+            spider.audit_cache = TemplateResultsCache(
+                include_text=crawler.settings.getbool(
+                    "AXE_REUSE_FINGERPRINT_TEXT", False
+                ),
+                max_entries=crawler.settings.getint("AXE_REUSE_CACHE_SIZE", 256),
+            )
+
+        return spider
+
+    def closed(self, reason: str) -> None:
+        self.driver_pool.close()
+        self.frontier.close()
+        if self.result_store is not None:
+            self.result_store.close()
+
+        # Report duplicate URLs which were never rendered
+        for site, n_deduplicated in sorted(self.frontier.deduplicated.items()):
+            self.log(
+                f"Skipped {n_deduplicated} duplicate URLs for site: '{site}'",
+                level=logging.INFO,
+            )
+
+        # Report sites crawled from their sitemap
+        for site, n_pages in sorted(self.sitemap_seeded.items()):
+            self.log(
+                f"Seeded {n_pages} pages from the sitemap of site: '{site}'",
+                level=logging.INFO,
+            )
+
+        # Store the budget spent on each site (and the links never rendered)
+        # next to its start page results
+        for start_url, site in self.site_domains.items():
+            site_dir = Path(clean_url(start_url))
+            if site in self.budget.sites:
+                site_dir.mkdir(exist_ok=True, parents=True)
+                self.budget.write_site_report(
+                    site, site_dir / constants.SITE_CRAWL_BUDGET_FILENAME
+                )
+                if self.budget.sites[site].exhausted_by is not None:
+                    self.log(
+                        f"Crawl budget ({self.budget.sites[site].exhausted_by}) "
+                        f"exhausted for site: '{site}'",
+                        level=logging.INFO,
+                    )
+
+            if site in self.preflight_rejections:
+                site_dir.mkdir(exist_ok=True, parents=True)
+                write_preflight_rejections(
+                    self.preflight_rejections[site],
+                    site_dir / constants.PREFLIGHT_REJECTED_LINKS_FILENAME,
+                )
+
+    def _has_results(self, url: str) -> bool:
+        if self.result_store is not None:
+            return url in self.result_store
+
+        return find_axe_results(Path(clean_url(url))) is not None
+
+    def parse_result(self, response: "HtmlResponse") -> Optional[AxeResultItem]:
+        # Pages audited by a previous run of this job keep their existing results
+        if response.meta.get("skip_audit", False):
+            return None
+
+        # The downloader already ran aXe (off the reactor thread), either on the
+        # driver that rendered this response or on a second pooled driver
+        # (see AxeSeleniumMiddleware)
+        results = response.meta["axe_results"]
+        if constants.AXE_RESULTS_REUSED_FROM_KEY in results:
+            self.crawler.stats.inc_value("audit/reused_template_results")
+
+        # Stored by the AxeResultsPipeline
+        return AxeResultItem(
+            url=response.request.url,
+            site=response.meta["site"],
+            depth=response.meta.get("page_depth", 0),
+            download_seconds=response.meta.get("download_latency"),
+            page_ready_seconds=response.meta.get("page_ready_seconds"),
+            audit_seconds=response.meta.get("audit_seconds"),
+            violations=results.get("violations", []),
+            n_passes=len(results.get("passes", [])),
+            n_incomplete=len(results.get("incomplete", [])),
+            results=results,
+            timings=dict(phase_timings(response.meta)),
         )
 
     def start_requests(self) -> SeleniumRequest:
-        # Spawn Selenium requests for each link
-        # (should just be just the provided URL though)
-        for url in self.start_urls:
+        # Resume pages left pending by a previous run of this job
+        # These were already seen by the persisted dupefilter so must not be filtered
+        # Pages whose results were stored before the interruption passed
+        # pre-flight and are only rendered again to discover their links,
+        # every other page is checked again like a newly discovered link
+        for entry in self.resumed:
+            # Journals written before discovered URLs were recorded only have the
+            # canonical URL
+            url = entry.get("request_url", entry["url"])
+            if not entry.get("alias", False):
+                self.budget.charge(entry["site"])
+            has_results = self._has_results(url)
+            if self.preflight and not has_results:
+                yield self._preflight_request(
+                    url, entry["site"], entry["depth"], priority=0, resumed=True
+                )
+                continue
+
             yield SeleniumRequest(
                 url=url,
-                wait_time=5,
                 callback=self.parse,
+                dont_filter=True,
+                meta={
+                    "site": entry["site"],
+                    "page_depth": entry["depth"],
+                    "canonical_url": entry["url"],
+                    "skip_audit": has_results,
+                },
             )
 
-    def parse(self, response: "HtmlResponse", **kwargs: "Any") -> SeleniumRequest:
+        # Spawn Selenium requests for each site
+        for url in self.start_urls:
+            site = self.site_domains[url]
+
+            # Discover the rest of the site over plain HTTP
+            # Sitemaps are prioritized so their pages are usually scheduled before
+            # the start page is rendered and its links are extracted
+            if self.sitemap_seeding:
+                yield Request(
+                    url=robots_url(url),
+                    callback=self.parse_robots,
+                    errback=self.sitemap_failed,
+                    dont_filter=True,
+                    priority=constants.SITEMAP_REQUEST_PRIORITY,
+                    meta={"site": site},
+                )
+
+            if self.frontier.add(url, site) is not None:
+                self.budget.charge(site)
+                yield self._page_request(url, site, depth=0)
+
+    def _page_request(
+        self,
+        url: str,
+        site: str,
+        depth: int,
+        priority: int = 0,
+        resumed: bool = False,
+    ) -> SeleniumRequest:
+        # Pages are requested at the URL they were discovered at
+        # The canonical URL is only the frontier's key for the page
+        return SeleniumRequest(
+            url=url,
+            callback=self.parse,
+            priority=priority,
+            dont_filter=resumed,
+            meta={
+                "site": site,
+                "page_depth": depth,
+                "canonical_url": canonicalize_url(url),
+            },
+        )
+
+    def _preflight_request(
+        self,
+        url: str,
+        site: str,
+        depth: int,
+        priority: int,
+        method: str = "HEAD",
+        resumed: bool = False,
+    ) -> Request:
+        # Pages resumed from a JOBDIR (and the renders they are promoted to) may
+        # already be in the persisted dupefilter
+        return Request(
+            url=url,
+            method=method,
+            callback=self.parse_preflight,
+            errback=self.preflight_failed,
+            priority=priority,
+            dont_filter=resumed or method != "HEAD",
+            meta={
+                "site": site,
+                "page_depth": depth,
+                "canonical_url": canonicalize_url(url),
+                "preflight_headers_only": method != "HEAD",
+                "resumed": resumed,
+            },
+        )
+
+    def _schedule_page(
+        self, url: str, site: str, depth: int, priority: int
+    ) -> Optional[Request]:
+        # Stop scheduling pages once the site's budget is spent
+        # Links refused by the page limit wait for pages to be refunded
+        if not self.budget.allows(site):
+            if canonicalize_url(url) not in self.frontier.seen:
+                self.budget.defer(site, url, depth, priority)
+            return None
+
+        # Only request pages never seen before (in canonical form)
+        if self.frontier.add(url, site, depth) is None:
+            return None
+
+        self.budget.charge(site)
+        if self.preflight:
+            return self._preflight_request(url, site, depth, priority)
+
+        return self._page_request(url, site, depth, priority)
+
+    def _stop_headers_only_download(
+        self,
+        headers: "Headers",
+        body_length: int,
+        request: Request,
+        spider: "AccessEvalSpider",
+    ) -> None:
+        # Headers only GET pre-flights never download the body
+        if request.meta.get("preflight_headers_only", False):
+            raise StopDownload(fail=False)
+
+    def _site_matcher(self, site: str) -> HostMatcher:
+        # The same hosts belong to a site for every offsite check
+        return get_host_matcher(self, self.allow_www_variants, site=site)
+
+    def _refund(self, url: str, site: str) -> Iterator[Request]:
+        # The page was never audited, spend its budget on the best deferred link
+        self.frontier.complete(url, refunded=True)
+        self.budget.refund(site)
+        while True:
+            link = self.budget.readmit(site)
+            if link is None:
+                return
+
+            request = self._schedule_page(link[0], site, link[1], link[2])
+            if request is not None:
+                yield request
+                return
+
+    def _reject(self, rejection: PreflightRejection) -> Iterator[Request]:
+        self.log(
+            f"Not rendering: {rejection.url} ({rejection.kind}: {rejection.detail})",
+            level=logging.INFO,
+        )
+        self.preflight_rejections.setdefault(rejection.site, []).append(rejection)
+        self.crawler.stats.inc_value(f"preflight/rejected/{rejection.kind}")
+        yield from self._refund(canonicalize_url(rejection.url), rejection.site)
+
+    def parse_preflight(self, response: "Response") -> Iterator[Request]:
+        site = response.meta["site"]
+        rejection = check_preflight_response(response, site, self._site_matcher(site))
+        if rejection is not None:
+            yield from self._reject(rejection)
+            return
+
+        # Promote to a browser render
+        self.crawler.stats.inc_value("preflight/passed")
+        yield self._page_request(
+            original_url(response),
+            site,
+            response.meta["page_depth"],
+            response.request.priority,
+            resumed=response.meta.get("resumed", False),
+        )
+
+    def preflight_failed(
+        self, failure: "Failure"
+    ) -> Iterator[Union[Request, SeleniumRequest]]:
+        request = failure.request  # type: ignore
+        site = request.meta["site"]
+        url = original_url(request)
+
+        if failure.check(HttpError):
+            status = failure.value.response.status
+
+            # Some servers refuse HEAD requests but serve the page to GET
+            if request.method == "HEAD" and status in HEAD_UNSUPPORTED_STATUSES:
+                yield self._preflight_request(
+                    url,
+                    site,
+                    request.meta["page_depth"],
+                    request.priority,
+                    method="GET",
+                    resumed=request.meta.get("resumed", False),
+                )
+                return
+
+            # Bot protection and rate limits answer plain HTTP clients differently
+            # than browsers so let the browser decide
+            if is_inconclusive_status(status):
+                self.crawler.stats.inc_value("preflight/inconclusive")
+                yield self._page_request(
+                    url,
+                    site,
+                    request.meta["page_depth"],
+                    request.priority,
+                    resumed=request.meta.get("resumed", False),
+                )
+                return
+
+            rejection = PreflightRejection(url, site, "dead", str(status))
+
+        # Dropped by the offsite middleware after a redirect
+        elif failure.check(IgnoreRequest):
+            rejection = PreflightRejection(url, site, "offsite-redirect", request.url)
+
+        else:
+            rejection = PreflightRejection(url, site, "dead", failure.type.__name__)
+
+        yield from self._reject(rejection)
+
+    def _sitemap_request(self, url: str, site: str) -> Request:
+        return Request(
+            url=url,
+            callback=self.parse_sitemap,
+            errback=self.sitemap_failed,
+            priority=constants.SITEMAP_REQUEST_PRIORITY,
+            meta={"site": site},
+        )
+
+    def parse_robots(self, response: "Response") -> Iterator[Request]:
+        # Sitemaps listed in robots.txt (or the default sitemap location)
+        for sitemap_url in sitemap_urls_from_robots_response(response):
+            yield self._sitemap_request(sitemap_url, response.meta["site"])
+
+    def sitemap_failed(self, failure: "Failure") -> Iterator[Request]:
+        # Without a robots.txt the default sitemap location may still exist
+        # Otherwise the site is only discovered by link extraction
+        request = failure.request  # type: ignore
+        if request.callback == self.parse_robots:
+            yield self._sitemap_request(
+                default_sitemap_url(request.url), request.meta["site"]
+            )
+        else:
+            self.log(
+                f"Failed to fetch sitemap: {request.url} ({failure.value!r})",
+                level=logging.INFO,
+            )
+
+    def parse_sitemap(
+        self, response: "Response"
+    ) -> Iterator[Union[Request, SeleniumRequest]]:
+        site = response.meta["site"]
+        sitemap_type, locs = parse_sitemap(response)
+        if sitemap_type is None:
+            self.log(f"Ignoring invalid sitemap: {response.url}", level=logging.INFO)
+            return
+
+        # Only pages (and nested sitemaps) of this site are followed
+        site_matcher = self._site_matcher(site)
+        locs = [loc for loc in locs if site_matcher.matches(loc)]
+        if sitemap_type == "sitemapindex":
+            for loc in locs:
+                yield self._sitemap_request(loc, site)
+            return
+
+        # Empty sitemaps leave the site to link extraction alone
+        if len(locs) == 0:
+            return
+
+        # Schedule every listed page for auditing in priority order
+        self.sitemap_seeded[site] = self.sitemap_seeded.get(site, 0) + len(locs)
+        self.crawler.stats.inc_value("sitemap/pages", len(locs))
+        for loc in sorted(locs, key=lambda loc: link_priority(loc, 1), reverse=True):
+            request = self._schedule_page(loc, site, 1, link_priority(loc, 1))
+            if request is not None:
+                yield request
+
+    def parse(
+        self, response: "HtmlResponse", **kwargs: "Any"
+    ) -> Iterator[Union[Request, AxeResultItem]]:
         self.log(f"Parsing: {response.request.url}", level=logging.INFO)
+        site = response.meta["site"]
+
+        depth = response.meta.get("page_depth", 0)
+
+        # If the page redirected, the page we landed on may already be known
+        canonical_url = response.meta.get(
+            "canonical_url", canonicalize_url(response.request.url)
+        )
+        final_url = canonicalize_url(response.url)
+        if final_url != canonical_url:
+            if self.frontier.add(response.url, site, depth, alias=True) is None:
+                self.log(
+                    f"Skipping: {response.request.url} "
+                    f"(redirected to already seen {response.url})",
+                    level=logging.INFO,
+                )
+                yield from self._refund(canonical_url, site)
+                return
+
         # Process with axe
-        self.parse_result(response)
+        item = self.parse_result(response)
 
+        # Sitemaps are often incomplete so links are extracted from every page
+        # (the frontier drops those already scheduled from the sitemap)
+        # Pages at the maximum depth have no links worth following
+        if self.budget.max_depth is None or depth < self.budget.max_depth:
+            yield from self._schedule_links(response, site, depth)
+
+        # Every link of the page is journaled by now
+        # Audited pages are only complete once their results are stored
+        # (see `_page_stored`)
+        if item is not None:
+            item.frontier_urls = [canonical_url, final_url]
+            yield item
+        else:
+            self.frontier.complete(canonical_url)
+            self.frontier.complete(final_url)
+
+    def _schedule_links(
+        self, response: "HtmlResponse", site: str, depth: int
+    ) -> Iterator[Request]:
         # Recurse down links
-        le = LinkExtractor()
-        for link in le.extract_links(response):
-            yield SeleniumRequest(
-                url=link.url,
-                wait_time=5,
-                callback=self.parse,
-            )
\ No newline at end of file
+        # Only follow links on the same site so batch crawls never wander
+        # from one site into another site that is also in the batch
+        site_matcher = self._site_matcher(site)
+        navigation_urls = {
+            link.url
+            for link in LinkExtractor(
+                restrict_xpaths=("//nav", "//header")
+            ).extract_links(response)
+        }
+        prioritized_links = sorted(
+            (
+                (link_priority(link.url, depth + 1, link.url in navigation_urls), link)
+                for link in LinkExtractor().extract_links(response)
+                if site_matcher.matches(link.url)
+            ),
+            key=lambda priority_and_link: priority_and_link[0],
+            reverse=True,
+        )
+        for priority, link in prioritized_links:
+            request = self._schedule_page(link.url, site, depth + 1, priority)
+            if request is not None:
+                yield request
+
+    def _page_stored(self, item: AxeResultItem, spider: "AccessEvalSpider") -> None:
+        # The page's results and links will not be lost if the job is resumed
+        for url in item.frontier_urls:
+            self.frontier.complete(url)
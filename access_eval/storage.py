@@ -0,0 +1,435 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import io
+import json
+import logging
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, Optional, Union
+
+from .constants import AXE_NODE_COUNT_KEY, SINGLE_PAGE_AXE_RESULTS_FILENAME
+from .utils import count_axe_nodes
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+# Storage format name -> file suffix appended to the base results filename
+# (i.e. "full-axe-results" + ".json.gz")
+AXE_RESULTS_FORMATS = {
+    "json": ".json",
+    "json.gz": ".json.gz",
+    "json.zst": ".json.zst",
+    "msgpack": ".msgpack",
+}
+
+# The base results filename without the ".json" suffix
+_AXE_RESULTS_STEM = SINGLE_PAGE_AXE_RESULTS_FILENAME[: -len(".json")]
+
+# The result types and rule fields kept by aXe results summaries
+# (see `summarize_axe_results`), every rule also keeps its node count
+AXE_SUMMARY_RESULT_TYPES = ("violations", "passes", "incomplete")
+AXE_SUMMARY_RULE_FIELDS = ("id", "impact", "help", "helpUrl")
+
+# ijson backends parsing in C, the pure python backend is slower than json.load
+_IJSON_FAST_BACKENDS = ("yajl2_c", "yajl2_cffi", "yajl2")
+
+# Whether this process already logged that summaries are not streamed
+_logged_ijson_fallback = False
+
+###############################################################################
+
+
+def _import_zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading or writing '.json.zst' results requires the 'zstandard' "
+            "package. Install it with `pip install access-eval[compression]`."
+        )
+
+    return zstandard
+
+
+def _import_msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError:
+        raise ImportError(
+            "Reading or writing '.msgpack' results requires the 'msgpack' "
+            "package. Install it with `pip install access-eval[compression]`."
+        )
+
+    return msgpack
+
+
+def _log_ijson_fallback(reason: str) -> None:
+    global _logged_ijson_fallback
+
+    if not _logged_ijson_fallback:
+        _logged_ijson_fallback = True
+        log.warning(
+            f"Reading aXe results summaries without streaming ({reason}), every "
+            "page's full results are loaded. Install the C backed parser with "
+            "`pip install access-eval[streaming]`."
+        )
+
+
+def _import_ijson() -> Any:
+    # Summaries are streamed when ijson (with a C backend) is installed
+    # and fully loaded then reduced otherwise
+    try:
+        import ijson
+    except ImportError:
+        _log_ijson_fallback("ijson is not installed")
+        return None
+
+    if ijson.backend not in _IJSON_FAST_BACKENDS:
+        _log_ijson_fallback(f"ijson has no C backend, only '{ijson.backend}'")
+        return None
+
+    return ijson
+
+
+def _check_format(fmt: str) -> None:
+    if fmt not in AXE_RESULTS_FORMATS:
+        raise ValueError(
+            f"Unknown axe results format: '{fmt}'. "
+            f"Available formats: {list(AXE_RESULTS_FORMATS.keys())}"
+        )
+
+
+def axe_results_filename(fmt: str = "json") -> str:
+    """
+    Get the single page axe results filename for a storage format.
+
+    Examples
+    --------
+    >>> axe_results_filename("json.gz")
+    'full-axe-results.json.gz'
+    """
+    _check_format(fmt)
+    return f"{_AXE_RESULTS_STEM}{AXE_RESULTS_FORMATS[fmt]}"
+
+
+def encode_axe_results(results: Dict[str, Any], fmt: str = "json") -> bytes:
+    """
+    Serialize aXe results to bytes in the requested storage format.
+
+    Parameters
+    ----------
+    results: Dict[str, Any]
+        The aXe results to serialize.
+    fmt: str
+        The storage format: "json" (pretty printed), "json.gz", "json.zst",
+        or "msgpack".
+        Default: "json"
+
+    Returns
+    -------
+    data: bytes
+        The serialized results.
+    """
+    _check_format(fmt)
+
+    if fmt == "json":
+        return json.dumps(results, indent=4).encode("utf8")
+
+    if fmt == "msgpack":
+        return _import_msgpack().packb(results, use_bin_type=True)
+
+    # Compressed formats store compact JSON
+    compact = json.dumps(results, separators=(",", ":")).encode("utf8")
+    if fmt == "json.gz":
+        return gzip.compress(compact)
+
+    return _import_zstandard().ZstdCompressor().compress(compact)
+
+
+def decode_axe_results(data: bytes, fmt: str = "json") -> Dict[str, Any]:
+    """
+    Deserialize aXe results stored as bytes in the provided storage format.
+    """
+    _check_format(fmt)
+
+    if fmt == "json":
+        return json.loads(data.decode("utf8"))
+
+    if fmt == "msgpack":
+        return _import_msgpack().unpackb(data, raw=False)
+
+    if fmt == "json.gz":
+        return json.loads(gzip.decompress(data).decode("utf8"))
+
+    # Frames written by streaming compressors may not record their content size
+    with _import_zstandard().ZstdDecompressor().stream_reader(data) as reader:
+        return json.load(reader)
+
+
+def axe_results_format(path: Union[str, Path]) -> str:
+    """
+    Detect the storage format of an aXe results file from its suffix.
+
+    Examples
+    --------
+    >>> axe_results_format("example.com/about/full-axe-results.json.zst")
+    'json.zst'
+    """
+    name = Path(path).name
+    for fmt, suffix in AXE_RESULTS_FORMATS.items():
+        if fmt != "json" and name.endswith(suffix):
+            return fmt
+
+    return "json"
+
+
+def write_axe_results(
+    results: Dict[str, Any],
+    path: Union[str, Path],
+    fmt: str = "json",
+) -> Path:
+    """
+    Store aXe results to the provided path in the requested format.
+
+    Parameters
+    ----------
+    results: Dict[str, Any]
+        The aXe results to store.
+    path: Union[str, Path]
+        The file path to store the results to.
+    fmt: str
+        The storage format: "json" (pretty printed), "json.gz", "json.zst",
+        or "msgpack".
+        Default: "json"
+
+    Returns
+    -------
+    path: Path
+        The path the results were stored to.
+    """
+    path = Path(path)
+    with open(path, "wb") as open_f:
+        open_f.write(encode_axe_results(results, fmt))
+
+    return path
+
+
+def remove_other_axe_results(results_dir: Union[str, Path], fmt: str) -> None:
+    """
+    Remove the single page axe results files of every other storage format from
+    a page's results directory so readers only ever find the one just written
+    (i.e. after re-crawling a page with another AXE_RESULTS_FORMAT).
+    """
+    results_dir = Path(results_dir)
+    for other_fmt in AXE_RESULTS_FORMATS:
+        if other_fmt != fmt:
+            (results_dir / axe_results_filename(other_fmt)).unlink(missing_ok=True)
+
+
+def read_axe_results(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read aXe results stored in any storage format (detected from the file suffix).
+
+    Parameters
+    ----------
+    path: Union[str, Path]
+        The file path to read the results from.
+
+    Returns
+    -------
+    results: Dict[str, Any]
+        The stored aXe results.
+    """
+    with open(path, "rb") as open_f:
+        return decode_axe_results(open_f.read(), axe_results_format(path))
+
+
+def find_axe_results(results_dir: Union[str, Path]) -> Optional[Path]:
+    """
+    Find the single page axe results file (in any storage format) stored in a
+    directory.
+
+    Parameters
+    ----------
+    results_dir: Union[str, Path]
+        The page's results directory.
+
+    Returns
+    -------
+    path: Optional[Path]
+        The path to the results file or None if the directory has no results.
+    """
+    results_dir = Path(results_dir)
+    for fmt in AXE_RESULTS_FORMATS:
+        path = results_dir / axe_results_filename(fmt)
+        if path.exists():
+            return path
+
+    return None
+
+
+def iter_axe_results_files(head_dir: Union[str, Path]) -> Iterator[Path]:
+    """
+    Recursively find the single page axe results file (in any storage format) of
+    every page directory under a directory.
+
+    Directories holding results files in more than one format yield only the
+    one `find_axe_results` picks, so every page is read exactly once.
+    """
+    head_dir = Path(head_dir)
+    page_dirs = {
+        path.parent
+        for fmt in AXE_RESULTS_FORMATS
+        for path in head_dir.glob(f"**/{axe_results_filename(fmt)}")
+    }
+    for page_dir in sorted(page_dirs):
+        path = find_axe_results(page_dir)
+        if path is not None:
+            yield path
+
+
+###############################################################################
+
+
+def summarize_axe_results(results: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reduce aXe results to the page URL and the id, impact, help, helpUrl, and node
+    count (AXE_NODE_COUNT_KEY) of each rule of the AXE_SUMMARY_RESULT_TYPES.
+
+    Summaries can be used in place of the full results by everything that only
+    reads those fields (i.e. `count_axe_nodes`).
+
+    Examples
+    --------
+    >>> summary = summarize_axe_results(
+    ...     {
+    ...         "url": "https://example.com",
+    ...         "violations": [
+    ...             {"id": "image-alt", "impact": "critical", "nodes": [{}, {}]},
+    ...         ],
+    ...     }
+    ... )
+    >>> [(rule["id"], rule["nodeCount"]) for rule in summary["violations"]]
+    [('image-alt', 2)]
+    """
+    summary: Dict[str, Any] = {"url": results.get("url")}
+    for result_type in AXE_SUMMARY_RESULT_TYPES:
+        if result_type in results:
+            summary[result_type] = [
+                {
+                    **{field: rule.get(field) for field in AXE_SUMMARY_RULE_FIELDS},
+                    AXE_NODE_COUNT_KEY: count_axe_nodes(rule),
+                }
+                for rule in results[result_type]
+            ]
+
+    return summary
+
+
+def _stream_axe_summary(open_f: IO[bytes], ijson: Any) -> Dict[str, Any]:
+    # Only the events of the summarized fields are acted on, every other value
+    # (nodes, checks, html snippets) is parsed and dropped without being built
+    result_type_prefixes = {
+        result_type: result_type for result_type in AXE_SUMMARY_RESULT_TYPES
+    }
+    rule_prefixes = {
+        f"{result_type}.item": result_type for result_type in AXE_SUMMARY_RESULT_TYPES
+    }
+    field_prefixes = {
+        f"{result_type}.item.{field}": field
+        for result_type in AXE_SUMMARY_RESULT_TYPES
+        for field in AXE_SUMMARY_RULE_FIELDS
+    }
+    node_count_prefixes = {
+        f"{result_type}.item.{AXE_NODE_COUNT_KEY}"
+        for result_type in AXE_SUMMARY_RESULT_TYPES
+    }
+    node_prefixes = {
+        f"{result_type}.item.nodes.item" for result_type in AXE_SUMMARY_RESULT_TYPES
+    }
+
+    summary: Dict[str, Any] = {"url": None}
+    rule: Dict[str, Any] = {}
+    n_nodes = 0
+    for prefix, event, value in ijson.parse(open_f):
+        if prefix in node_prefixes:
+            if event == "start_map":
+                n_nodes += 1
+        elif prefix in field_prefixes:
+            rule[field_prefixes[prefix]] = value
+        elif prefix in rule_prefixes:
+            if event == "start_map":
+                rule = {field: None for field in AXE_SUMMARY_RULE_FIELDS}
+                n_nodes = 0
+            elif event == "end_map":
+                rule.setdefault(AXE_NODE_COUNT_KEY, n_nodes)
+                summary[rule_prefixes[prefix]].append(rule)
+        elif prefix in node_count_prefixes:
+            rule[AXE_NODE_COUNT_KEY] = int(value)
+        elif prefix in result_type_prefixes:
+            if event == "start_array":
+                summary[prefix] = []
+        elif prefix == "url" and event == "string":
+            summary["url"] = value
+
+    return summary
+
+
+def _open_axe_results_stream(open_f: IO[bytes], fmt: str) -> Any:
+    # Decompress while parsing so the decompressed JSON is never held in memory
+    if fmt == "json.gz":
+        return gzip.GzipFile(fileobj=open_f, mode="rb")
+    if fmt == "json.zst":
+        return _import_zstandard().ZstdDecompressor().stream_reader(open_f)
+
+    return open_f
+
+
+def decode_axe_summary(data: bytes, fmt: str = "json") -> Dict[str, Any]:
+    """
+    Deserialize only the summary of aXe results stored as bytes in the provided
+    storage format (see `summarize_axe_results` and `read_axe_summary`).
+    """
+    _check_format(fmt)
+
+    ijson = _import_ijson()
+    if ijson is None or fmt == "msgpack":
+        return summarize_axe_results(decode_axe_results(data, fmt))
+
+    with _open_axe_results_stream(io.BytesIO(data), fmt) as open_stream:
+        return _stream_axe_summary(open_stream, ijson)
+
+
+def read_axe_summary(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Read only the summary of aXe results stored in any storage format (detected
+    from the file suffix).
+
+    When the optional `ijson` package is installed the file is parsed
+    incrementally and only the summarized fields are kept, so the full results
+    (every node's html, target, and checks) are never loaded. Otherwise the
+    results are fully read and then summarized.
+
+    Parameters
+    ----------
+    path: Union[str, Path]
+        The file path to read the results from.
+
+    Returns
+    -------
+    summary: Dict[str, Any]
+        The summarized aXe results (see `summarize_axe_results`).
+    """
+    fmt = axe_results_format(path)
+
+    ijson = _import_ijson()
+    if ijson is None or fmt == "msgpack":
+        return summarize_axe_results(read_axe_results(path))
+
+    with open(path, "rb") as open_f:
+        with _open_axe_results_stream(open_f, fmt) as open_stream:
+            return _stream_axe_summary(open_stream, ijson)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+from pathlib import Path
+
+from access_eval.budget import CrawlBudget, link_priority
+
+###############################################################################
+
+
+def test_link_priority_order() -> None:
+    links = [
+        link_priority("https://example.com/blog/page/2", depth=1),
+        link_priority("https://example.com/news/2021/post", depth=1),
+        link_priority("https://example.com/news", depth=1),
+        link_priority("https://example.com/news", depth=2),
+        link_priority("https://example.com/donate", depth=1, navigation=True),
+    ]
+
+    # Navigation first, then shallower pages and paths, pagination last
+    assert links[4] > links[2] > links[1] > links[0]
+    assert links[2] > links[3]
+    assert link_priority("https://example.com/events?page=3", depth=1) < links[1]
+
+
+def test_budget_max_pages_and_refund() -> None:
+    budget = CrawlBudget(max_pages_per_site=2)
+    for _ in range(2):
+        assert budget.allows("example.com")
+        budget.charge("example.com")
+
+    assert not budget.allows("example.com")
+    assert budget.sites["example.com"].exhausted_by == "pages"
+    assert budget.sites["example.com"].skipped == 1
+
+    # Other sites have their own budget
+    assert budget.allows("other.org")
+
+    # Pages which are never audited are given back
+    budget.refund("example.com")
+    assert budget.allows("example.com")
+    assert budget.sites["example.com"].to_dict()["refunded"] == 1
+
+
+def test_budget_readmits_deferred_links() -> None:
+    budget = CrawlBudget(max_pages_per_site=2)
+    for _ in range(2):
+        budget.charge("example.com")
+
+    # Nothing is deferred while the site has pages left
+    assert budget.readmit("example.com") is None
+
+    links = [
+        ("https://example.com/blog/page/2", 1, -112),
+        ("https://example.com/donate", 1, 89),
+        ("https://example.com/news", 2, -21),
+    ]
+    for url, depth, priority in links:
+        assert not budget.allows("example.com")
+        budget.defer("example.com", url, depth, priority)
+
+    # Only the highest priority links that could ever be scheduled are kept
+    assert len(budget.sites["example.com"].deferred) == 2
+    assert budget.readmit("example.com") is None
+
+    # Refunded pages are spent on deferred links in priority order
+    budget.refund("example.com")
+    assert budget.readmit("example.com") == ("https://example.com/donate", 1, 89)
+    assert budget.allows("example.com")
+    budget.charge("example.com")
+
+    budget.refund("example.com")
+    assert budget.readmit("example.com") == ("https://example.com/news", 2, -21)
+    assert budget.readmit("example.com") is None
+
+
+def test_budget_resume() -> None:
+    budget = CrawlBudget(max_pages_per_site=2, max_seconds_per_site=60)
+    budget.resume("example.com", pages=1, elapsed_seconds=30)
+    assert budget.sites["example.com"].elapsed >= 30
+    assert budget.allows("example.com")
+    budget.charge("example.com")
+    assert not budget.allows("example.com")
+
+    budget.resume("other.org", pages=0, elapsed_seconds=60)
+    assert not budget.allows("other.org")
+    assert budget.sites["other.org"].exhausted_by == "time"
+
+
+def test_budget_max_seconds() -> None:
+    budget = CrawlBudget(max_seconds_per_site=0.0)
+    assert budget.out_of_time("example.com")
+    assert not budget.allows("example.com")
+
+    # Budgets exhausted by time are never reopened
+    budget.refund("example.com")
+    assert not budget.allows("example.com")
+    assert budget.sites["example.com"].exhausted_by == "time"
+
+
+def test_budget_site_report(tmp_path: Path) -> None:
+    budget = CrawlBudget()
+    budget.charge("example.com")
+    path = budget.write_site_report("example.com", tmp_path / "budget.json")
+
+    with open(path, "r") as open_f:
+        report = json.load(open_f)
+
+    assert report["pages"] == 1
+    assert not report["exhausted"]
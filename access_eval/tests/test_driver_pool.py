@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import threading
+from typing import Any, List
+
+import pytest
+
+from access_eval import driver_pool
+from access_eval.driver_pool import DriverPool
+
+###############################################################################
+
+
+class FakeDriver:
+    """Records the webdriver calls the pool makes instead of running Firefox."""
+
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+        self.quit_called = False
+
+    def set_page_load_timeout(self, seconds: float) -> None:
+        self.calls.append("set_page_load_timeout")
+
+    def execute_script(self, script: str, *args: Any) -> None:
+        self.calls.append("execute_script")
+
+    def delete_all_cookies(self) -> None:
+        self.calls.append("delete_all_cookies")
+
+    def get(self, url: str) -> None:
+        self.calls.append(f"get {url}")
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+@pytest.fixture
+def started(monkeypatch: pytest.MonkeyPatch) -> List[FakeDriver]:
+    drivers: List[FakeDriver] = []
+
+    def create_driver(*args: Any, **kwargs: Any) -> FakeDriver:
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    monkeypatch.setattr(driver_pool, "create_driver", create_driver)
+    return drivers
+
+
+def test_drivers_are_reused_and_reset(started: List[FakeDriver]) -> None:
+    pool = DriverPool(size=2)
+    for _ in range(3):
+        with pool.driver() as driver:
+            driver.get("https://example.com")
+
+    # One warm driver served every page
+    assert len(started) == 1
+    assert started[0].calls[-4:] == [
+        "get https://example.com",
+        "execute_script",
+        "delete_all_cookies",
+        "get about:blank",
+    ]
+
+    pool.close()
+    assert started[0].quit_called
+
+
+def test_drivers_are_replaced_at_page_limit(started: List[FakeDriver]) -> None:
+    pool = DriverPool(size=1, max_pages_per_driver=2)
+    for _ in range(3):
+        with pool.driver():
+            pass
+
+    assert len(started) == 2
+    assert started[0].quit_called
+    assert not started[1].quit_called
+
+
+def test_unhealthy_drivers_are_replaced(started: List[FakeDriver]) -> None:
+    pool = DriverPool(size=1)
+    with pytest.raises(RuntimeError):
+        with pool.driver():
+            raise RuntimeError("page crashed the browser")
+
+    assert started[0].quit_called
+    with pool.driver() as driver:
+        assert driver is started[1]
+
+
+def test_pool_size_is_enforced(started: List[FakeDriver]) -> None:
+    pool = DriverPool(size=2)
+    held = [pool.acquire(), pool.acquire()]
+
+    # A third checkout waits for a driver to be returned
+    acquired: List[Any] = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    waiter.join(timeout=0.2)
+    assert len(acquired) == 0
+
+    pool.release(held[0])
+    waiter.join(timeout=5)
+    assert acquired == [held[0]]
+    assert len(started) == 2
+
+
+def test_watchdog_kills_hung_pages(started: List[FakeDriver]) -> None:
+    pool = DriverPool(size=1, page_timeout=0.05)
+    hung = threading.Event()
+    with pool.driver():
+        hung.wait(timeout=0.5)
+
+    # The killed driver is replaced rather than reused
+    with pool.driver() as driver:
+        assert driver is started[1]
+    assert len(pool._alive) == 1
+
+
+def test_late_watchdog_spares_returned_drivers(started: List[FakeDriver]) -> None:
+    pool = DriverPool(size=1, page_timeout=60)
+    pooled = pool.acquire()
+    pool.release(pooled)
+
+    # A watchdog firing after its page released the driver does nothing
+    pool._expire(pooled)
+    assert not pooled.killed
+    with pool.driver() as driver:
+        assert driver is started[0]
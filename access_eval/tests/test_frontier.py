@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+from typing import Union
+
+import pytest
+
+from access_eval.frontier import (
+    FRONTIER_JOURNAL_FILENAME,
+    BloomFilter,
+    Frontier,
+    SeenSet,
+    canonicalize_url,
+)
+
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("https://example.com/about", "https://example.com/about"),
+        ("https://example.com/about/", "https://example.com/about"),
+        ("https://example.com/about#team", "https://example.com/about"),
+        ("https://EXAMPLE.com:443/about", "https://example.com/about"),
+        ("http://example.com:8080/about", "http://example.com:8080/about"),
+        ("https://example.com", "https://example.com/"),
+        ("https://example.com/?utm_source=x&fbclid=y", "https://example.com/"),
+        ("https://example.com/search?q=b&a=1", "https://example.com/search?a=1&q=b"),
+        ("  https://example.com/issues  ", "https://example.com/issues"),
+    ],
+)
+def test_canonicalize_url(url: str, expected: str) -> None:
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize("seen_set", [SeenSet(), BloomFilter(capacity=1000)])
+def test_seen_sets(seen_set: Union[SeenSet, BloomFilter]) -> None:
+    assert seen_set.add("https://example.com/a")
+    assert seen_set.add("https://example.com/b")
+    assert not seen_set.add("https://example.com/a")
+
+    assert "https://example.com/a" in seen_set
+    assert "https://example.com/c" not in seen_set
+    assert len(seen_set) == 2
+
+
+def test_bloom_filter_error_rate() -> None:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    for i in range(1000):
+        bloom.add(f"https://example.com/{i}")
+
+    # Never misses a seen URL and rarely reports an unseen one
+    assert all(f"https://example.com/{i}" in bloom for i in range(1000))
+    false_positives = sum(f"https://other.org/{i}" in bloom for i in range(1000))
+    assert false_positives < 50
+
+
+def test_frontier_deduplicates() -> None:
+    frontier = Frontier()
+    assert frontier.add("https://example.com/about/", "example.com") == (
+        "https://example.com/about"
+    )
+    assert frontier.add("https://example.com/about#team", "example.com") is None
+    assert frontier.deduplicated == {"example.com": 1}
+
+    assert frontier.claim("https://example.com/about")
+    assert not frontier.claim("https://example.com/about")
+
+
+def test_frontier_journal_resume(tmp_path: Path) -> None:
+    frontier = Frontier()
+    assert frontier.open_journal(tmp_path) == []
+    frontier.add("https://example.com", "example.com", 0)
+    frontier.add("https://example.com/Issues/?utm_source=x", "example.com", 1)
+    frontier.complete("https://example.com/")
+    frontier.close()
+
+    # Crashes can leave a partially written line at the end of the journal
+    with open(tmp_path / FRONTIER_JOURNAL_FILENAME, "a") as open_f:
+        open_f.write('{"event": "sched')
+
+    resumed = Frontier()
+    pending = resumed.open_journal(tmp_path)
+    assert resumed.replayed["example.com"]["pages"] == 1
+    assert pending == [
+        {
+            "event": "scheduled",
+            "url": "https://example.com/Issues",
+            "request_url": "https://example.com/Issues/?utm_source=x",
+            "site": "example.com",
+            "depth": 1,
+        }
+    ]
+
+    # Completed pages are never rendered again and scheduled pages never re-added
+    assert not resumed.claim("https://example.com/")
+    assert resumed.claim("https://example.com/Issues")
+    assert resumed.add("https://example.com/Issues", "example.com", 1) is None
+    resumed.complete("https://example.com/Issues")
+    resumed.close()
+
+    assert Frontier().open_journal(tmp_path) == []
+
+
+def test_frontier_journal_replays_site_budgets(tmp_path: Path) -> None:
+    frontier = Frontier()
+    frontier.open_journal(tmp_path)
+    for page in ["", "about", "contact", "old"]:
+        frontier.add(f"https://example.com/{page}", "example.com", 1)
+    frontier.add("https://example.com/new", "example.com", 1, alias=True)
+    frontier.add("https://other.org", "other.org")
+
+    # Audited pages (and their redirect targets) and refunded pages
+    frontier.complete("https://example.com/")
+    frontier.complete("https://example.com/about", refunded=True)
+    frontier.complete("https://example.com/old")
+    frontier.complete("https://example.com/new")
+    frontier.close()
+
+    resumed = Frontier()
+    pending = resumed.open_journal(tmp_path)
+    assert [entry["url"] for entry in pending] == [
+        "https://example.com/contact",
+        "https://other.org/",
+    ]
+
+    # Pending pages are charged again when they are rescheduled
+    assert resumed.replayed["example.com"]["pages"] == 2
+    assert resumed.replayed["example.com"]["elapsed_seconds"] >= 0
+    assert resumed.replayed["other.org"]["pages"] == 0
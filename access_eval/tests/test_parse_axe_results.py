@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+import pytest
+
+from access_eval import constants
+from access_eval.analysis.parse_axe_results import (
+    _summarize_pages_in_pool,
+    generate_high_level_statistics,
+)
+from access_eval.frontier import Frontier
+from access_eval.items import AxeResultItem
+from access_eval.pipelines import AxeAggregationPipeline
+from access_eval.result_store import RESULT_STORE_FILENAME, ResultStore
+from access_eval.storage import write_axe_results
+
+###############################################################################
+
+
+def _violation(rule_id: str, impact: str, n_nodes: int) -> Dict[str, Any]:
+    return {
+        "id": rule_id,
+        "impact": impact,
+        "help": f"{rule_id} help",
+        "helpUrl": f"https://dequeuniversity.com/rules/axe/3.1/{rule_id}",
+        "nodes": [{"html": f"<p>{i}</p>"} for i in range(n_nodes)],
+    }
+
+
+PAGES: Dict[str, Dict[str, Any]] = {
+    "example.com": {
+        "violations": [
+            _violation("image-alt", "critical", 3),
+            _violation("color-contrast", "serious", 5),
+        ],
+        "passes": [{"id": "html-has-lang", "nodes": [{}]}],
+        "incomplete": [],
+    },
+    "example.com/issues": {
+        "violations": [_violation("image-alt", "critical", 1)],
+        "passes": [
+            {"id": "html-has-lang", "nodes": [{}]},
+            {"id": "title", "nodes": []},
+        ],
+        "incomplete": [{"id": "video-caption", "nodes": [{}]}],
+    },
+    "example.com/contact": {
+        "violations": [_violation("label", "minor", 2)],
+        "passes": [],
+        "incomplete": [],
+    },
+}
+
+
+def _read_outputs(head_dir: Path) -> Tuple[str, Dict[str, Any]]:
+    with open(head_dir / constants.AGGREGATE_AXE_RESULTS_FILENAME, "r") as open_f:
+        aggregate = open_f.read()
+    with open(head_dir / constants.AGGREGATE_AXE_TOTALS_FILENAME, "r") as open_f:
+        totals = json.load(open_f)
+
+    return aggregate, totals
+
+
+def _aggregate_inline(inline_dir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Results are stored relative to the crawl's working directory
+    inline_dir.mkdir(parents=True)
+    monkeypatch.chdir(inline_dir)
+
+    pipeline = AxeAggregationPipeline(write_page_summaries=False)
+    spider = SimpleNamespace(
+        resumed=[],
+        frontier=Frontier(),
+        site_domains={"https://example.com": "example.com"},
+    )
+    pipeline.open_spider(spider)  # type: ignore
+    for page_dir, results in PAGES.items():
+        item = AxeResultItem(
+            url=f"https://{page_dir}",
+            site="example.com",
+            depth=0,
+            download_seconds=None,
+            page_ready_seconds=None,
+            audit_seconds=None,
+            violations=results["violations"],
+            n_passes=len(results["passes"]),
+            n_incomplete=len(results["incomplete"]),
+            results=results,
+        )
+
+        # Queued pages are only aggregated once they are stored
+        assert pipeline.process_item(item, spider) is item  # type: ignore
+        pipeline._page_stored(item, spider)  # type: ignore
+
+    pipeline._spider_closed(spider)  # type: ignore
+
+
+@pytest.mark.parametrize("backend", ["directory", "sqlite"])
+@pytest.mark.parametrize("workers", [1, 2])
+def test_inline_aggregation_matches_post_processing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, backend: str, workers: int
+) -> None:
+    _aggregate_inline(tmp_path / "inline", monkeypatch)
+    inline_dir = tmp_path / "inline" / "example.com"
+
+    stored_dir = tmp_path / "stored"
+    if backend == "directory":
+        for page_dir, results in PAGES.items():
+            (stored_dir / page_dir).mkdir(parents=True)
+            write_axe_results(
+                results, stored_dir / page_dir / "full-axe-results.json.gz", "json.gz"
+            )
+    else:
+        (stored_dir / "example.com").mkdir(parents=True)
+        with ResultStore(stored_dir / RESULT_STORE_FILENAME) as store:
+            store.put_many(
+                [
+                    ("example.com", f"https://{page_dir}", results)
+                    for page_dir, results in PAGES.items()
+                ]
+            )
+
+    generate_high_level_statistics(stored_dir / "example.com", workers=workers)
+
+    assert _read_outputs(stored_dir / "example.com") == _read_outputs(inline_dir)
+    totals = _read_outputs(inline_dir)[1]
+    assert totals["pages"] == 3
+    assert totals["passed_rules"] == 3
+    assert totals["elements_in_violation_by_impact"]["critical"] == 4
+
+
+def test_pool_summaries_are_submitted_in_bounded_chunks(tmp_path: Path) -> None:
+    consumed = []
+
+    def tasks() -> Iterator[Tuple[Path, Callable[[], Dict[str, Any]]]]:
+        for i in range(20):
+            consumed.append(i)
+            yield tmp_path / str(i), partial(dict, violations=[], passes=[{}] * i)
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        summaries = _summarize_pages_in_pool(
+            executor, tasks(), chunk_size=3, max_pending_chunks=2
+        )
+
+        # Only the chunks in flight have been read when the first page is merged
+        assert next(summaries) == ([], 0, 0)
+        assert len(consumed) == 6
+        assert [n_passes for _, n_passes, _ in summaries] == list(range(1, 20))
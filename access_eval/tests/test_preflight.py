@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from typing import Dict, Optional
+
+import pytest
+from scrapy.http import Request, Response
+
+from access_eval.middlewares.redirected_offsite import HostMatcher
+from access_eval.preflight import check_preflight_response, is_inconclusive_status
+
+###############################################################################
+
+
+def _response(
+    url: str,
+    content_type: Optional[str] = "text/html; charset=utf-8",
+    redirected_from: Optional[str] = None,
+) -> Response:
+    meta = {"redirect_urls": [redirected_from]} if redirected_from else {}
+    headers: Dict[str, str] = {}
+    if content_type is not None:
+        headers["Content-Type"] = content_type
+
+    return Response(url, headers=headers, request=Request(url, meta=meta))
+
+
+@pytest.mark.parametrize(
+    "response",
+    [
+        _response("https://example.com/about"),
+        _response("https://example.com/about", content_type="application/xhtml+xml"),
+        _response("https://example.com/about", content_type=None),
+        _response(
+            "https://www.example.com/about", redirected_from="https://example.com/a"
+        ),
+    ],
+)
+def test_check_preflight_response_passes(response: Response) -> None:
+    assert check_preflight_response(response, "example.com") is None
+
+
+@pytest.mark.parametrize(
+    "response, kind, detail",
+    [
+        (
+            _response("https://example.com/flyer.pdf", content_type="application/pdf"),
+            "non-html",
+            "application/pdf",
+        ),
+        (
+            _response(
+                "https://secure.actblue.com/donate",
+                redirected_from="https://example.com/donate",
+            ),
+            "offsite-redirect",
+            "https://secure.actblue.com/donate",
+        ),
+    ],
+)
+def test_check_preflight_response_rejects(
+    response: Response, kind: str, detail: str
+) -> None:
+    rejection = check_preflight_response(response, "example.com")
+    assert rejection is not None
+    assert rejection.kind == kind
+    assert rejection.detail == detail
+
+    # Rejections are reported for the link as discovered
+    assert rejection.url == response.meta.get("redirect_urls", [response.url])[0]
+
+
+def test_check_preflight_response_host_matcher() -> None:
+    response = _response("https://www.example.com/about")
+    assert (
+        check_preflight_response(
+            response, "example.com", HostMatcher(["example.com"], False)
+        )
+        is None
+    )
+
+    rejection = check_preflight_response(
+        response, "example.com", HostMatcher(["shop.example.com"])
+    )
+    assert rejection is not None
+    assert rejection.kind == "offsite-redirect"
+
+
+@pytest.mark.parametrize(
+    "status, expected",
+    [(401, True), (403, True), (429, True), (500, True), (503, True), (404, False)],
+)
+def test_is_inconclusive_status(status: int, expected: bool) -> None:
+    assert is_inconclusive_status(status) == expected
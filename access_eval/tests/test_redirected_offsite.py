@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import pytest
+from scrapy import Spider
+
+from access_eval.middlewares.redirected_offsite import HostMatcher, get_host_matcher
+
+###############################################################################
+
+
+@pytest.mark.parametrize(
+    "url, allow_www_variants, expected",
+    [
+        ("https://example.com/about", True, True),
+        ("https://EXAMPLE.com/about", True, True),
+        ("https://www.example.com/about", True, True),
+        ("https://www.example.com/about", False, True),
+        ("https://shop.example.com", True, True),
+        ("https://notexample.com", True, False),
+        ("https://example.com.evil.org", True, False),
+        ("https://candidate.org", True, True),
+        ("https://candidate.org", False, False),
+        ("mailto:someone@example.com", True, False),
+    ],
+)
+def test_host_matcher(url: str, allow_www_variants: bool, expected: bool) -> None:
+    matcher = HostMatcher(
+        ["example.com", "www.candidate.org"], allow_www_variants=allow_www_variants
+    )
+    assert matcher.matches(url) == expected
+
+
+def test_host_matcher_unrestricted() -> None:
+    assert HostMatcher([]).matches("https://anything.org")
+
+
+class BatchSpider(Spider):
+    name = "batch"
+    allowed_domains = ["example.com", "candidate.org"]
+
+
+def test_get_host_matcher_per_site() -> None:
+    spider = BatchSpider()
+
+    assert get_host_matcher(spider).matches("https://candidate.org")
+    site_matcher = get_host_matcher(spider, site="example.com")
+    assert site_matcher.matches("https://www.example.com")
+    assert not site_matcher.matches("https://candidate.org")
+
+    # Built once per spider and site
+    assert get_host_matcher(spider, site="example.com") is site_matcher
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+
+from access_eval.result_store import (
+    RESULT_STORE_FILENAME,
+    ResultStore,
+    find_result_store,
+    iter_page_results,
+)
+from access_eval.storage import read_axe_results
+
+###############################################################################
+
+PAGE_URLS = [
+    "https://example.com",
+    "https://example.com/issues",
+    "https://example.com/issues/healthcare",
+    "https://example.com/issues-archive",
+    "https://example.com0.org",
+]
+
+
+def _results(url: str) -> dict:
+    return {"url": url, "violations": [], "passes": []}
+
+
+def test_put_and_get(tmp_path: Path) -> None:
+    with ResultStore(tmp_path / RESULT_STORE_FILENAME) as store:
+        store.put_many([("example.com", url, _results(url)) for url in PAGE_URLS])
+
+        # Pages are replaced, not duplicated
+        store.put("example.com", PAGE_URLS[0], _results(PAGE_URLS[0]))
+        assert len(store) == len(PAGE_URLS)
+        assert PAGE_URLS[1] in store
+        assert store.get(PAGE_URLS[1]) == _results(PAGE_URLS[1])
+        assert store.get("https://example.com/missing") is None
+        assert store.sites() == ["example.com"]
+
+
+def test_iter_results_page_dir_range(tmp_path: Path) -> None:
+    with ResultStore(tmp_path / RESULT_STORE_FILENAME) as store:
+        store.put_many([("example.com", url, _results(url)) for url in PAGE_URLS])
+
+        # Only the directory and its subdirectories, not siblings sharing a prefix
+        assert [
+            page_dir for page_dir, _ in store.iter_results(page_dir="example.com")
+        ] == [
+            "example.com",
+            "example.com/issues",
+            "example.com/issues-archive",
+            "example.com/issues/healthcare",
+        ]
+        assert [
+            page_dir
+            for page_dir, _ in store.iter_results(page_dir="example.com/issues/")
+        ] == ["example.com/issues", "example.com/issues/healthcare"]
+        assert len(list(store.iter_results())) == len(PAGE_URLS)
+
+
+def test_find_result_store(tmp_path: Path) -> None:
+    assert find_result_store(tmp_path) is None
+
+    store_path = tmp_path / RESULT_STORE_FILENAME
+    with ResultStore(store_path) as store:
+        store.put_many([("example.com", url, _results(url)) for url in PAGE_URLS])
+
+    assert find_result_store(tmp_path) == (store_path, "")
+    assert find_result_store(tmp_path / "example.com") == (store_path, "example.com")
+
+    # Readers select the pages under the directory
+    page_dirs = [
+        page_dir for page_dir, _ in iter_page_results(tmp_path / "example.com")
+    ]
+    assert len(page_dirs) == 4
+    assert page_dirs[0] == tmp_path / "example.com"
+
+
+def test_export_legacy_layout(tmp_path: Path) -> None:
+    with ResultStore(tmp_path / RESULT_STORE_FILENAME) as store:
+        store.put_many([("example.com", url, _results(url)) for url in PAGE_URLS])
+        assert store.export_legacy_layout(tmp_path / "export") == len(PAGE_URLS)
+
+    assert read_axe_results(
+        tmp_path / "export" / "example.com" / "issues" / "full-axe-results.json"
+    ) == _results(PAGE_URLS[1])
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+from pathlib import Path
+
+import pytest
+
+from access_eval.shards import (
+    ShardState,
+    claim_shard,
+    finish_shard,
+    load_shard_manifest,
+    plan_shards,
+    requeue_running_shards,
+)
+
+###############################################################################
+
+SITES = ["https://a.com", "https://b.com", "https://c.com"]
+
+
+def test_plan_shards(tmp_path: Path) -> None:
+    manifest = plan_shards(
+        SITES, tmp_path, sites_per_shard=2, expected_costs={"https://c.com": 10}
+    )
+
+    # Most expensive sites first, alone when they cost more than a full shard
+    assert [shard.urls for shard in manifest.shards] == [
+        ["https://c.com"],
+        ["https://a.com", "https://b.com"],
+    ]
+    assert [shard.expected_cost for shard in manifest.shards] == [10, 2]
+    assert manifest.total_sites == 3
+    assert load_shard_manifest(tmp_path) == manifest
+
+    with open(tmp_path / ShardState.pending / "shard-000000.jsonl", "r") as open_f:
+        assert [json.loads(line) for line in open_f] == manifest.shards[0].urls
+
+    # Planning twice into the same directory is refused
+    with pytest.raises(FileExistsError):
+        plan_shards(SITES, tmp_path)
+
+
+def test_plan_shards_by_cost(tmp_path: Path) -> None:
+    urls = [f"https://site-{i}.com" for i in range(25)]
+    costs = {url: 1.0 for url in urls}
+    costs.update({urls[0]: 30.0, urls[1]: 6.0, urls[2]: 5.0})
+    manifest = plan_shards(urls, tmp_path, expected_costs=costs)
+
+    # The expensive tail gets small shards, the typical sites are grouped
+    # and no shard costs more than ten typical sites unless it holds one site
+    assert [len(shard.urls) for shard in manifest.shards] == [1, 1, 6, 10, 7]
+    assert [shard.expected_cost for shard in manifest.shards] == [30, 6, 10, 10, 7]
+    assert manifest.total_sites == 25
+
+
+def test_claim_and_finish_shards(tmp_path: Path) -> None:
+    plan_shards(SITES, tmp_path, sites_per_shard=1)
+
+    first = claim_shard(tmp_path)
+    second = claim_shard(tmp_path)
+    assert first is not None and second is not None
+    assert first.name == "shard-000000.jsonl"
+    assert second.name == "shard-000001.jsonl"
+    assert first.parent.name == ShardState.running
+    assert first.with_suffix(".owner").exists()
+
+    first.with_suffix(".log").write_text("crawl log\n")
+    finished = finish_shard(first, succeeded=True)
+    assert finished == tmp_path / ShardState.done / first.name
+    assert finished.with_suffix(".log").exists()
+    assert not first.with_suffix(".owner").exists()
+    assert finish_shard(second, succeeded=False).parent.name == ShardState.failed
+
+    third = claim_shard(tmp_path)
+    assert third is not None
+    assert claim_shard(tmp_path) is None
+
+    # Shards left running by a crashed worker are claimed again
+    assert requeue_running_shards(tmp_path) == 1
+    assert claim_shard(tmp_path) == third
@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from access_eval import storage
+from access_eval.storage import (
+    AXE_RESULTS_FORMATS,
+    axe_results_format,
+    decode_axe_results,
+    decode_axe_summary,
+    encode_axe_results,
+    find_axe_results,
+    iter_axe_results_files,
+    read_axe_results,
+    read_axe_summary,
+    remove_other_axe_results,
+    summarize_axe_results,
+    write_axe_results,
+)
+
+###############################################################################
+
+EXAMPLE_RESULTS: Dict[str, Any] = {
+    "url": "https://example.com/about",
+    "testEngine": {"name": "axe-core", "version": "3.1.1"},
+    "violations": [
+        {
+            "id": "image-alt",
+            "impact": "critical",
+            "help": "Images must have alternate text",
+            "helpUrl": "https://dequeuniversity.com/rules/axe/3.1/image-alt",
+            "tags": ["wcag2a"],
+            "nodes": [
+                {"html": "<img src='a.png'>", "target": ["img"], "any": []},
+                {"html": "<img src='b.png'>", "target": ["img:nth-child(2)"]},
+            ],
+        },
+        {
+            "id": "color-contrast",
+            "impact": "serious",
+            "help": "Elements must have sufficient color contrast",
+            "helpUrl": "https://dequeuniversity.com/rules/axe/3.1/color-contrast",
+            "nodes": [{"html": "<p>Vote</p>", "target": ["p"]}],
+        },
+    ],
+    # Stored with only a node count (AXE_COUNT_ONLY_RESULT_TYPES)
+    "passes": [
+        {
+            "id": "html-has-lang",
+            "impact": None,
+            "help": "<html> element must have a lang attribute",
+            "helpUrl": "https://dequeuniversity.com/rules/axe/3.1/html-has-lang",
+            "nodeCount": 1,
+            "nodes": [],
+        },
+    ],
+    "incomplete": [],
+    "inapplicable": [{"id": "audio-caption", "nodes": []}],
+}
+
+###############################################################################
+
+
+@pytest.mark.parametrize("fmt", AXE_RESULTS_FORMATS)
+def test_round_trip(tmp_path: Path, fmt: str) -> None:
+    assert decode_axe_results(encode_axe_results(EXAMPLE_RESULTS, fmt), fmt) == (
+        EXAMPLE_RESULTS
+    )
+
+    # Files are read back in the format detected from their suffix
+    path = write_axe_results(
+        EXAMPLE_RESULTS, tmp_path / f"full-axe-results{AXE_RESULTS_FORMATS[fmt]}", fmt
+    )
+    assert axe_results_format(path) == fmt
+    assert find_axe_results(tmp_path) == path
+    assert read_axe_results(path) == EXAMPLE_RESULTS
+
+
+def test_unknown_format() -> None:
+    with pytest.raises(ValueError):
+        encode_axe_results(EXAMPLE_RESULTS, "xml")
+
+
+def test_mixed_formats_are_read_once(tmp_path: Path) -> None:
+    # A page re-crawled with another AXE_RESULTS_FORMAT holds both files
+    page_dir = tmp_path / "example.com" / "about"
+    page_dir.mkdir(parents=True)
+    for fmt, suffix in AXE_RESULTS_FORMATS.items():
+        write_axe_results(EXAMPLE_RESULTS, page_dir / f"full-axe-results{suffix}", fmt)
+
+    assert list(iter_axe_results_files(tmp_path)) == [find_axe_results(page_dir)]
+
+    # Storing a page removes the results files of every other format
+    remove_other_axe_results(page_dir, "json.gz")
+    assert [path.name for path in page_dir.iterdir()] == ["full-axe-results.json.gz"]
+    assert list(iter_axe_results_files(tmp_path)) == [
+        page_dir / "full-axe-results.json.gz"
+    ]
+
+
+def test_summarize_axe_results() -> None:
+    summary = summarize_axe_results(EXAMPLE_RESULTS)
+    assert summary["url"] == EXAMPLE_RESULTS["url"]
+    assert "inapplicable" not in summary
+    assert [(rule["id"], rule["nodeCount"]) for rule in summary["violations"]] == [
+        ("image-alt", 2),
+        ("color-contrast", 1),
+    ]
+    assert summary["passes"][0]["nodeCount"] == 1
+    assert summary["incomplete"] == []
+
+
+@pytest.mark.parametrize("fmt", AXE_RESULTS_FORMATS)
+def test_streaming_summary_matches_full_summary(tmp_path: Path, fmt: str) -> None:
+    # Streamed with ijson when installed, summarized after a full read otherwise
+    expected = summarize_axe_results(EXAMPLE_RESULTS)
+    data = encode_axe_results(EXAMPLE_RESULTS, fmt)
+    assert decode_axe_summary(data, fmt) == expected
+
+    path = write_axe_results(
+        EXAMPLE_RESULTS, tmp_path / f"full-axe-results{AXE_RESULTS_FORMATS[fmt]}", fmt
+    )
+    assert read_axe_summary(path) == expected
+
+
+def test_summary_fallback_is_logged_once(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    monkeypatch.setitem(sys.modules, "ijson", None)
+    monkeypatch.setattr(storage, "_logged_ijson_fallback", False)
+
+    data = encode_axe_results(EXAMPLE_RESULTS, "json")
+    with caplog.at_level(logging.WARNING, logger="access_eval.storage"):
+        for _ in range(3):
+            assert decode_axe_summary(data, "json") == (
+                summarize_axe_results(EXAMPLE_RESULTS)
+            )
+
+    assert len(caplog.records) == 1
+    assert "ijson is not installed" in caplog.records[0].getMessage()
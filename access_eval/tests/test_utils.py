@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+from pathlib import Path
+
+import pytest
+
+from access_eval.utils import read_url_list
+
+###############################################################################
+
+
+def test_read_url_list_skips_invalid_urls(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    urls_file = tmp_path / "sites.csv"
+    urls_file.write_text(
+        "Name,Website\n"
+        "A,https://a.com\n"
+        "B,b.com\n"
+        "C,\n"
+        "D,http://[::1\n"
+        "E,mailto:someone@e.com\n"
+        "F,http://a.com/\n"
+        "G, https://g.org \n"
+    )
+
+    with caplog.at_level(logging.WARNING, logger="access_eval.utils"):
+        assert read_url_list(urls_file) == ["https://a.com", "https://g.org"]
+
+    # Empty and duplicate rows are dropped without a warning
+    assert len(caplog.records) == 3
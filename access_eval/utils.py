@@ -1,6 +1,25 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import csv
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from .constants import AXE_NODE_COUNT_KEY
+
+###############################################################################
+
+log = logging.getLogger(__name__)
+
+###############################################################################
+
+# Columns (or JSONL keys) checked in order for website URLs when none is provided
+# (the study datasets and the candidates list)
+URL_COLUMN_CANDIDATES = ("campaign_website_url", "Website", "website", "url", "URL")
+
 
 def clean_url(url: str) -> str:
     url = url.replace("https://", "").replace("http://", "")
@@ -8,3 +27,163 @@ def clean_url(url: str) -> str:
         url = url[:-1]
 
     return url
+
+
+def is_site_url(url: str) -> bool:
+    """
+    Check whether a value is a crawlable website URL (an http or https URL with
+    a host).
+
+    Examples
+    --------
+    >>> is_site_url("https://example.com/about")
+    True
+    >>> is_site_url("example.com")
+    False
+    """
+    try:
+        parts = urlsplit(url)
+        return parts.scheme in ("http", "https") and parts.hostname is not None
+    except ValueError:
+        return False
+
+
+def find_url_column(
+    columns: Sequence[str],
+    url_column: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Find the column (or JSONL key) which contains website URLs.
+
+    Parameters
+    ----------
+    columns: Sequence[str]
+        The available columns.
+    url_column: Optional[str]
+        The column to use if present.
+        Default: None (the first of URL_COLUMN_CANDIDATES present)
+
+    Returns
+    -------
+    url_column: Optional[str]
+        The URL column or None if it is not present.
+
+    Examples
+    --------
+    >>> find_url_column(["Location", "Name", "Website"])
+    'Website'
+    """
+    if url_column is not None:
+        return url_column if url_column in columns else None
+
+    for candidate in URL_COLUMN_CANDIDATES:
+        if candidate in columns:
+            return candidate
+
+    return None
+
+
+def read_url_records(
+    path: Union[str, Path],
+    url_column: Optional[str] = None,
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Read every website URL (and the rest of its row) from a CSV or JSONL file.
+
+    Parameters
+    ----------
+    path: Union[str, Path]
+        The path to the CSV or JSONL file to read.
+        JSONL lines may either be a JSON string (the URL) or an object containing
+        the URL under the `url_column` key.
+    url_column: Optional[str]
+        The CSV column (or JSONL object key) which contains the website URLs.
+        Default: None (detect it, see URL_COLUMN_CANDIDATES)
+
+    Returns
+    -------
+    records: List[Tuple[str, Dict[str, Any]]]
+        The stripped URL and the full row (empty for JSONL string lines) of every
+        row in file order, including rows with empty URLs.
+    """
+    path = Path(path).resolve(strict=True)
+
+    records: List[Tuple[str, Dict[str, Any]]] = []
+    with open(path, "r", newline="") as open_f:
+        if path.suffix in (".jsonl", ".ndjson"):
+            for line in open_f:
+                if len(line.strip()) == 0:
+                    continue
+                record = json.loads(line)
+                if isinstance(record, str):
+                    records.append((record.strip(), {}))
+                else:
+                    record_column = find_url_column(list(record), url_column)
+                    value = record.get(record_column or "") or ""
+                    records.append((value.strip(), record))
+        else:
+            reader = csv.DictReader(open_f)
+            column = find_url_column(reader.fieldnames or [], url_column)
+            if column is None:
+                raise KeyError(
+                    f"URL column '{url_column or URL_COLUMN_CANDIDATES}' "
+                    f"not found in provided file: '{path}'"
+                )
+            for row in reader:
+                records.append(((row[column] or "").strip(), row))
+
+    return records
+
+
+def read_url_list(
+    path: Union[str, Path],
+    url_column: Optional[str] = None,
+) -> List[str]:
+    """
+    Read a list of website URLs from a CSV or JSONL file
+    (see `read_url_records`).
+
+    Parameters
+    ----------
+    path: Union[str, Path]
+        The path to the CSV or JSONL file to read.
+    url_column: Optional[str]
+        The CSV column (or JSONL object key) which contains the website URLs.
+        Default: None (detect it, see URL_COLUMN_CANDIDATES)
+
+    Returns
+    -------
+    urls: List[str]
+        The URLs in file order with empty values and duplicates
+        (ignoring the `https://` or `http://` prefix) removed.
+        Values which are not website URLs (see `is_site_url`) are skipped with a
+        warning.
+    """
+    # Drop empty, invalid, and duplicate sites
+    urls = []
+    seen = set()
+    for row, (url, _) in enumerate(read_url_records(path, url_column=url_column)):
+        if len(url) == 0 or clean_url(url) in seen:
+            continue
+        if not is_site_url(url):
+            log.warning(
+                f"Skipping invalid website URL (entry {row + 1}) of '{path}': {url!r}"
+            )
+            continue
+        seen.add(clean_url(url))
+        urls.append(url)
+
+    return urls
+
+
+def count_axe_nodes(rule_result: Dict[str, Any]) -> int:
+    """
+    Get the number of nodes (elements) an aXe rule result applies to.
+
+    Works for both full results and results stored with only a node count
+    (see `AxeRunOptions.count_only_result_types`).
+    """
+    if AXE_NODE_COUNT_KEY in rule_result:
+        return rule_result[AXE_NODE_COUNT_KEY]
+
+    return len(rule_result["nodes"])
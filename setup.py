@@ -46,6 +46,7 @@ requirements = [
     "dataclasses-json==0.5.6",
     "numpy==1.22.1",
     "pandas==1.3.4",
+    "psutil==5.9.0",
     "requests==2.26.0",
     "scipy==1.7.3",
     "scrapy==2.5.1",
@@ -58,13 +59,26 @@ requirements = [
     "w3lib",  # no pin, pulled in with scrapy
 ]
 
+compression_requirements = [
+    "msgpack==1.0.3",
+    "zstandard==0.17.0",
+]
+
+streaming_requirements = [
+    "ijson==3.1.4",
+]
+
 extra_requirements = {
     "setup": setup_requirements,
     "test": test_requirements,
     "dev": dev_requirements,
+    "compression": compression_requirements,
+    "streaming": streaming_requirements,
     "all": [
         *requirements,
         *dev_requirements,
+        *compression_requirements,
+        *streaming_requirements,
     ],
 }
 
@@ -94,6 +108,10 @@ setup(
                 "access_eval.bin.analyze_access_eval_2021_dataset:main",
                 "get-sentiment-for-landing-page-content="
                 "access_eval.bin.get_sentiment_for_landing_content:main",
+                "crawl-access-eval-sites="
+                "access_eval.bin.crawl_access_eval_sites:main",
+                "export-access-eval-results="
+                "access_eval.bin.export_access_eval_results:main",
             ),
         ],
     },